@@ -4,7 +4,7 @@ from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
 from alembic import context
-from app.database import Base
+from app.database import Base, DATABASE_URL
 from app import models
 
 
@@ -12,6 +12,10 @@ from app import models
 # access to the values within the .ini file in use.
 config = context.config
 
+# Use the same database as the app (DATABASE_URL from env/.env).
+# Escape % because of configparser interpolation.
+config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
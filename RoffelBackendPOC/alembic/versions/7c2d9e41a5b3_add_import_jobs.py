@@ -0,0 +1,56 @@
+"""add import_jobs
+
+Revision ID: 7c2d9e41a5b3
+Revises: 1813153ad9d8
+Create Date: 2026-10-18 10:40:12.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2d9e41a5b3'
+down_revision: Union[str, Sequence[str], None] = '1813153ad9d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "import_jobs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("filename", sa.String(), nullable=True),
+        sa.Column(
+            "status",
+            sa.Enum("QUEUED", "RUNNING", "DONE", "FAILED", "CANCELLED", name="importjobstatus"),
+            nullable=False,
+        ),
+        sa.Column("total_rows", sa.Integer(), nullable=True),
+        sa.Column("rows_processed", sa.Integer(), nullable=False),
+        sa.Column("created", sa.Integer(), nullable=False),
+        sa.Column("updated", sa.Integer(), nullable=False),
+        sa.Column("skipped", sa.Integer(), nullable=False),
+        sa.Column("duplicates_in_file", sa.Integer(), nullable=False),
+        sa.Column("sheet_used", sa.String(), nullable=True),
+        sa.Column("cancel_requested", sa.Boolean(), nullable=False),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("created_by", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_import_jobs_status", "import_jobs", ["status"])
+
+    # ### end Alembic commands ###
+
+
+def downgrade() -> None:
+    op.drop_index("ix_import_jobs_status", table_name="import_jobs")
+    op.drop_table("import_jobs")
+    sa.Enum(name="importjobstatus").drop(op.get_bind(), checkfirst=True)
+
+    # ### end Alembic commands ###
@@ -0,0 +1,27 @@
+"""add per-supplier minimum order amount
+
+Revision ID: a6e2d8c4f1b7
+Revises: f1c8e2a4d6b0
+Create Date: 2026-10-18 18:05:44.218391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6e2d8c4f1b7'
+down_revision: Union[str, Sequence[str], None] = 'f1c8e2a4d6b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # leeg = DEFAULT_MIN_ORDER_AMOUNT (app/services/po_combination.py)
+    op.add_column("suppliers", sa.Column("min_order_amount", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("suppliers", "min_order_amount")
@@ -0,0 +1,34 @@
+"""add items_version to serviceorders
+
+Revision ID: b3e1f6a2c9d4
+Revises: 7c2d9e41a5b3
+Create Date: 2026-10-18 14:05:31.402918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e1f6a2c9d4'
+down_revision: Union[str, Sequence[str], None] = '7c2d9e41a5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "serviceorders",
+        sa.Column(
+            "items_version",
+            sa.Integer(),
+            nullable=False,
+            server_default=sa.text("0"),
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("serviceorders", "items_version")
@@ -0,0 +1,65 @@
+"""add mail_outbox
+
+Revision ID: b9d3f5a7c2e8
+Revises: a6e2d8c4f1b7
+Create Date: 2026-10-18 19:12:37.504126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9d3f5a7c2e8'
+down_revision: Union[str, Sequence[str], None] = 'a6e2d8c4f1b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "mail_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("idempotency_key", sa.String(), nullable=True),
+        sa.Column("mail_type", sa.String(), nullable=False),
+        sa.Column("serviceorder_id", sa.Integer(), sa.ForeignKey("serviceorders.id"), nullable=True),
+        sa.Column("to", sa.String(), nullable=False),
+        sa.Column("subject", sa.String(), nullable=False),
+        sa.Column("body_html", sa.Text(), nullable=False),
+        sa.Column("attachment_path", sa.String(), nullable=True),
+        sa.Column(
+            "status",
+            sa.Enum("PENDING", "SENDING", "SENT", "SKIPPED", "DEAD", name="mailoutboxstatus"),
+            nullable=False,
+        ),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+        sa.Column("claim_token", sa.String(), nullable=True),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("provider_message_id", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("idempotency_key"),
+    )
+    op.create_index("ix_mail_outbox_serviceorder_id", "mail_outbox", ["serviceorder_id"])
+    op.create_index("ix_mail_outbox_claim_token", "mail_outbox", ["claim_token"])
+    op.create_index(
+        "ix_mail_outbox_status_next_attempt_at",
+        "mail_outbox",
+        ["status", "next_attempt_at"],
+    )
+
+    # ### end Alembic commands ###
+
+
+def downgrade() -> None:
+    op.drop_index("ix_mail_outbox_status_next_attempt_at", table_name="mail_outbox")
+    op.drop_index("ix_mail_outbox_claim_token", table_name="mail_outbox")
+    op.drop_index("ix_mail_outbox_serviceorder_id", table_name="mail_outbox")
+    op.drop_table("mail_outbox")
+    sa.Enum(name="mailoutboxstatus").drop(op.get_bind(), checkfirst=True)
+
+    # ### end Alembic commands ###
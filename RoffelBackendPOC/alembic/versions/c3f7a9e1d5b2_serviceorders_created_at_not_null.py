@@ -0,0 +1,47 @@
+"""serviceorders.created_at NOT NULL
+
+Revision ID: c3f7a9e1d5b2
+Revises: b9d3f5a7c2e8
+Create Date: 2026-10-18 20:41:09.331857
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f7a9e1d5b2'
+down_revision: Union[str, Sequence[str], None] = 'b9d3f5a7c2e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # oude orders zonder created_at: eerste logregel, anders helemaal achteraan
+    # (zelfde tekstformaat als SQLAlchemy op SQLite, mét microseconden)
+    op.execute(
+        "UPDATE serviceorders SET created_at = COALESCE("
+        "(SELECT MIN(l.created_at) FROM serviceorder_logs l "
+        "WHERE l.serviceorder_id = serviceorders.id), "
+        "'1970-01-01 00:00:00.000000') "
+        "WHERE created_at IS NULL"
+    )
+
+    # batch: SQLite kan een kolom alleen via een kopie van de tabel wijzigen
+    with op.batch_alter_table("serviceorders") as batch_op:
+        batch_op.alter_column(
+            "created_at",
+            existing_type=sa.DateTime(timezone=True),
+            nullable=False,
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("serviceorders") as batch_op:
+        batch_op.alter_column(
+            "created_at",
+            existing_type=sa.DateTime(timezone=True),
+            nullable=True,
+        )
@@ -0,0 +1,40 @@
+"""add qty_received to serviceorder_items
+
+Revision ID: c8d4a1f7e2b6
+Revises: b3e1f6a2c9d4
+Create Date: 2026-10-18 15:21:09.551204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8d4a1f7e2b6'
+down_revision: Union[str, Sequence[str], None] = 'b3e1f6a2c9d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "serviceorder_items",
+        sa.Column(
+            "qty_received",
+            sa.Integer(),
+            nullable=False,
+            server_default=sa.text("0"),
+        ),
+    )
+
+    # al ontvangen regels zijn volledig ontvangen
+    op.execute(
+        "UPDATE serviceorder_items SET qty_received = COALESCE(qty, 0) "
+        "WHERE ontvangen = true"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("serviceorder_items", "qty_received")
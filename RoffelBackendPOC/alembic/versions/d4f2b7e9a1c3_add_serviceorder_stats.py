@@ -0,0 +1,56 @@
+"""add serviceorder_stats rollup
+
+Revision ID: d4f2b7e9a1c3
+Revises: c8d4a1f7e2b6
+Create Date: 2026-10-18 16:02:44.318560
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f2b7e9a1c3'
+down_revision: Union[str, Sequence[str], None] = 'c8d4a1f7e2b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "serviceorder_stats",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("supplier_id", sa.Integer(), nullable=False),
+        sa.Column("employee", sa.String(), nullable=False),
+        sa.Column("order_count", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("open_lines", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("status", "supplier_id", "employee", name="uq_serviceorder_stats_key"),
+    )
+
+    # beginstand vullen; daarna houdt de applicatie de tellers bij
+    op.execute(
+        """
+        INSERT INTO serviceorder_stats (status, supplier_id, employee, order_count, open_lines)
+        SELECT
+            COALESCE(o.status, ''),
+            COALESCE(o.supplier_id, 0),
+            COALESCE(o.employee, ''),
+            COUNT(*),
+            COALESCE(SUM((
+                SELECT COUNT(*) FROM serviceorder_items i
+                WHERE i.serviceorder_id = o.id
+                  AND i.bestellen = true
+                  AND i.ontvangen = false
+            )), 0)
+        FROM serviceorders o
+        GROUP BY COALESCE(o.status, ''), COALESCE(o.supplier_id, 0), COALESCE(o.employee, '')
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("serviceorder_stats")
@@ -0,0 +1,44 @@
+"""normalize serviceorders.created_at text format (SQLite)
+
+Revision ID: d8b2e6f4a1c9
+Revises: c3f7a9e1d5b2
+Create Date: 2026-10-18 21:34:52.117640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b2e6f4a1c9'
+down_revision: Union[str, Sequence[str], None] = 'c3f7a9e1d5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # geen CURRENT_TIMESTAMP meer als default: dat schrijft op SQLite
+    # zonder microseconden; de ORM-default vult created_at
+    with op.batch_alter_table("serviceorders") as batch_op:
+        batch_op.alter_column(
+            "created_at",
+            existing_type=sa.DateTime(timezone=True),
+            existing_nullable=False,
+            server_default=None,
+        )
+
+    if op.get_bind().dialect.name == "sqlite":
+        # SQLite bewaart datetimes als tekst; SQLAlchemy vergelijkt met
+        # 'YYYY-MM-DD HH:MM:SS.ffffff'. Waarden zonder microseconden
+        # (backfill / CURRENT_TIMESTAMP) laten de keyset-cursor van het
+        # overzicht anders nooit verder komen.
+        op.execute(
+            "UPDATE serviceorders SET created_at = created_at || '.000000' "
+            "WHERE length(created_at) = 19"
+        )
+
+
+def downgrade() -> None:
+    pass
@@ -0,0 +1,36 @@
+"""add change_events
+
+Revision ID: e5a1c7d3f9b4
+Revises: d8b2e6f4a1c9
+Create Date: 2026-10-18 22:08:16.904211
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1c7d3f9b4'
+down_revision: Union[str, Sequence[str], None] = 'd8b2e6f4a1c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "change_events",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sqlite_autoincrement=True,
+    )
+
+    # ### end Alembic commands ###
+
+
+def downgrade() -> None:
+    op.drop_table("change_events")
+
+    # ### end Alembic commands ###
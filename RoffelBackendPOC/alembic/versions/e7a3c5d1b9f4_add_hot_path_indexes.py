@@ -0,0 +1,41 @@
+"""add indexes for hot foreign keys and overview sorting
+
+Revision ID: e7a3c5d1b9f4
+Revises: d4f2b7e9a1c3
+Create Date: 2026-10-18 16:40:27.904112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3c5d1b9f4'
+down_revision: Union[str, Sequence[str], None] = 'd4f2b7e9a1c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (naam, tabel, kolommen); gecontroleerd met check_query_plans.py
+INDEXES = [
+    ("ix_serviceorder_items_serviceorder_id", "serviceorder_items", ["serviceorder_id"]),
+    ("ix_serviceorder_items_part_no", "serviceorder_items", ["part_no"]),
+    ("ix_serviceorder_logs_serviceorder_id_id", "serviceorder_logs", ["serviceorder_id", "id"]),
+    ("ix_customer_contacts_customer_id_contact_name", "customer_contacts", ["customer_id", "contact_name"]),
+    ("ix_customer_price_rules_customer_id_min_amount", "customer_price_rules", ["customer_id", "min_amount"]),
+    ("ix_serviceorders_created_at_id", "serviceorders", ["created_at", "id"]),
+    ("ix_serviceorders_status_created_at_id", "serviceorders", ["status", "created_at", "id"]),
+    ("ix_users_reset_token", "users", ["reset_token"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,34 @@
+"""add cached pricing columns to serviceorders
+
+Revision ID: f1c8e2a4d6b0
+Revises: e7a3c5d1b9f4
+Create Date: 2026-10-18 17:12:51.637029
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c8e2a4d6b0'
+down_revision: Union[str, Sequence[str], None] = 'e7a3c5d1b9f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("serviceorders", sa.Column("pricing_total", sa.Float(), nullable=True))
+    op.add_column("serviceorders", sa.Column("pricing_price_type", sa.String(), nullable=True))
+    op.add_column(
+        "serviceorders",
+        sa.Column("pricing_version", sa.Integer(), nullable=False, server_default=sa.text("0")),
+    )
+    # vullen: python reprice_serviceorders.py (prijsregels zijn niet in SQL uit te drukken)
+
+
+def downgrade() -> None:
+    op.drop_column("serviceorders", "pricing_version")
+    op.drop_column("serviceorders", "pricing_price_type")
+    op.drop_column("serviceorders", "pricing_total")
@@ -0,0 +1,157 @@
+# app/core/login_guard.py
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional
+
+from fastapi import HTTPException
+from passlib.exc import UnknownHashError
+
+from app.core.security import pwd_context
+
+# aantal threads dat wachtwoorden controleert (bcrypt is CPU-zwaar)
+LOGIN_HASH_WORKERS = int(os.getenv("LOGIN_HASH_WORKERS", "2"))
+# maximaal aantal logins dat op een vrije hash-thread mag wachten
+LOGIN_HASH_QUEUE = int(os.getenv("LOGIN_HASH_QUEUE", "8"))
+LOGIN_HASH_TIMEOUT = float(os.getenv("LOGIN_HASH_TIMEOUT", "10"))  # seconden
+
+# mislukte pogingen binnen het venster voordat er (tijdelijk) geblokkeerd wordt
+LOGIN_WINDOW = int(os.getenv("LOGIN_WINDOW_SECONDS", "900"))
+LOGIN_MAX_FAILURES_ACCOUNT = int(os.getenv("LOGIN_MAX_FAILURES_ACCOUNT", "5"))
+LOGIN_MAX_FAILURES_IP = int(os.getenv("LOGIN_MAX_FAILURES_IP", "20"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=LOGIN_HASH_WORKERS,
+    thread_name_prefix="login-hash",
+)
+_slots = threading.BoundedSemaphore(LOGIN_HASH_WORKERS + LOGIN_HASH_QUEUE)
+
+
+class FailureThrottle:
+    """
+    Telt mislukte logins per sleutel (account of IP) in een schuivend venster.
+    Per proces; bij meerdere workers geldt de limiet dus per worker.
+    """
+
+    def __init__(self, max_failures: int, window: int = LOGIN_WINDOW):
+        self.max_failures = max_failures
+        self.window = window
+        self._lock = threading.Lock()
+        self._failures: dict[str, deque] = {}
+
+    def _prune(self, key: str, now: float) -> Optional[deque]:
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def retry_after(self, key: str) -> int:
+        """
+        Seconden tot een nieuwe poging mag, 0 als dat nu al mag.
+        """
+        now = time.monotonic()
+        with self._lock:
+            failures = self._prune(key, now)
+            if failures is None or len(failures) < self.max_failures:
+                return 0
+            return int(failures[0] + self.window - now) + 1
+
+    def fail(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            self._prune(key, now)
+            self._failures.setdefault(key, deque()).append(now)
+
+            # geheugen begrenzen bij een aanval met veel verschillende sleutels
+            if len(self._failures) > 10000:
+                for k in list(self._failures):
+                    self._prune(k, now)
+
+    def reset(self, key: str):
+        with self._lock:
+            self._failures.pop(key, None)
+
+
+account_throttle = FailureThrottle(LOGIN_MAX_FAILURES_ACCOUNT)
+ip_throttle = FailureThrottle(LOGIN_MAX_FAILURES_IP)
+
+
+def check_login_allowed(email: str, ip: Optional[str]):
+    """
+    429 als account of IP te veel mislukte pogingen had (vóór het dure hashen).
+    """
+    wait = max(
+        account_throttle.retry_after(email.lower()),
+        ip_throttle.retry_after(ip) if ip else 0,
+    )
+    if wait:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(wait)},
+        )
+
+
+def register_login_result(email: str, ip: Optional[str], ok: bool):
+    if ok:
+        account_throttle.reset(email.lower())
+        return
+
+    account_throttle.fail(email.lower())
+    if ip:
+        ip_throttle.fail(ip)
+
+
+def _verify(password: str, password_hash: Optional[str]) -> tuple[bool, Optional[str]]:
+    if password_hash is None:
+        # onbekend account: wel hashen, zodat de responstijd niets verraadt
+        pwd_context.dummy_verify()
+        return False, None
+
+    try:
+        return pwd_context.verify_and_update(password, password_hash)
+    except (UnknownHashError, ValueError):
+        # bv. "__invite_pending__": nog geen wachtwoord ingesteld
+        return False, None
+
+
+def verify_password_bounded(password: str, password_hash: Optional[str]) -> tuple[bool, Optional[str]]:
+    """
+    Controleer een wachtwoord op de login-executor.
+
+    Geeft (ok, nieuwe_hash) terug; nieuwe_hash is gezet als de opgeslagen
+    hash niet meer aan de ingestelde kosten voldoet (rehash-on-login).
+    Zit de wachtrij vol, dan direct 503 i.p.v. wachten.
+    """
+    if not _slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Login is busy, try again",
+            headers={"Retry-After": "1"},
+        )
+
+    try:
+        future = _executor.submit(_verify, password, password_hash)
+    except RuntimeError:  # executor is afgesloten (shutdown)
+        _slots.release()
+        raise HTTPException(503, "Login is busy, try again")
+
+    # plek pas vrijgeven als het hashen echt klaar (of geannuleerd) is
+    future.add_done_callback(lambda _: _slots.release())
+
+    try:
+        return future.result(timeout=LOGIN_HASH_TIMEOUT)
+    except FutureTimeout:
+        future.cancel()
+        raise HTTPException(503, "Login is busy, try again")
+
+
+def shutdown_login_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -1,7 +1,11 @@
 # app/core/security.py
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 import enum
+import os
+import threading
+import time
 
 from fastapi import Depends, Header, HTTPException
 from passlib.context import CryptContext
@@ -14,9 +18,13 @@ from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# kosten van nieuwe hashes; oudere hashes worden bij de volgende login omgezet
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
 pwd_context = CryptContext(
     schemes=["bcrypt_sha256"],
-    deprecated="auto"
+    deprecated="auto",
+    bcrypt_sha256__rounds=BCRYPT_ROUNDS,
 )
 
 class UserRole(str, enum.Enum):
@@ -44,23 +52,104 @@ def create_access_token(user: User) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
 
+# ======================
+# PRINCIPAL CACHE
+# ======================
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))  # seconden
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1000"))
+
+# velden die endpoints van de ingelogde gebruiker gebruiken
+PRINCIPAL_FIELDS = ("id", "email", "role", "first_name", "last_name", "function", "is_admin")
+
+
+class PrincipalCache:
+    """
+    Kortlevende cache email -> gebruiker, zodat niet elk request de users-tabel raakt.
+
+    Per proces: set-role / verwijderen invalideren direct in deze worker,
+    andere workers zien de wijziging uiterlijk na PRINCIPAL_CACHE_TTL.
+    """
+
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL, size: int = PRINCIPAL_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, User]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, email: str) -> Optional[User]:
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(email)
+                self.hits += 1
+                return entry[1]
+
+            self._entries.pop(email, None)
+            self.misses += 1
+            return None
+
+    def put(self, user: User) -> User:
+        """
+        Bewaar een losse kopie (niet gekoppeld aan een sessie) en geef die terug.
+        """
+        snapshot = User(**{f: getattr(user, f) for f in PRINCIPAL_FIELDS})
+
+        if self.ttl > 0:
+            with self._lock:
+                self._entries[snapshot.email] = (time.monotonic() + self.ttl, snapshot)
+                self._entries.move_to_end(snapshot.email)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+
+        return snapshot
+
+    def invalidate(self, email: Optional[str] = None):
+        with self._lock:
+            if email is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(email, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "ttl": self.ttl,
+            }
+
+
+principal_cache = PrincipalCache()
+
+
+def _decode_token(token: str) -> dict:
+    try:
+        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
+    except JWTError:
+        raise HTTPException(401, "Invalid token")
+
+
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db = Depends(get_db),
 ):
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
-        email = payload.get("sub")
-        if not email:
-            raise HTTPException(401, "Invalid token")
-
-        user = db.query(User).filter(User.email == email).first()
-        if not user:
-            raise HTTPException(401, "User not found")
+    payload = _decode_token(token)
+    email = payload.get("sub")
+    if not email:
+        raise HTTPException(401, "Invalid token")
 
+    user = principal_cache.get(email)
+    if user is not None:
         return user
-    except JWTError:
-        raise HTTPException(401, "Invalid token")
+
+    user = db.query(User).filter(User.email == email).first()
+    if not user:
+        raise HTTPException(401, "User not found")
+
+    return principal_cache.put(user)
 
 def require_min_role(min_role: UserRole):
     def _guard(user: User = Depends(get_current_user)):
@@ -69,6 +158,32 @@ def require_min_role(min_role: UserRole):
         return user
     return _guard
 
+def require_token_role(min_role: UserRole):
+    """
+    Alleen de claims uit het token (geen DB / cache), voor lees-endpoints
+    die de gebruiker zelf niet nodig hebben.
+    Let op: een rolwijziging of verwijderde gebruiker telt pas bij een nieuw token.
+    """
+    def _guard(token: str = Depends(oauth2_scheme)):
+        return check_token_role(token, min_role)
+    return _guard
+
+def check_token_role(token: str, min_role: UserRole) -> dict:
+    """
+    Claims van een geldig token met minimaal `min_role` (ook voor WebSockets,
+    waar de token niet via de Authorization-header binnenkomt).
+    """
+    payload = _decode_token(token)
+    try:
+        role = UserRole(payload.get("role"))
+    except ValueError:
+        raise HTTPException(401, "Invalid token")
+    if not payload.get("sub"):
+        raise HTTPException(401, "Invalid token")
+    if ROLE_LEVEL[role] < ROLE_LEVEL[min_role]:
+        raise HTTPException(403, "Insufficient permissions")
+    return payload
+
 def get_user_from_jwt_token(authorization: str = Header(...)):
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid token")
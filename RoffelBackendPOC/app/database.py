@@ -1,13 +1,59 @@
 # app/database.py
-from sqlalchemy import create_engine
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///roffel_tool.db"
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///roffel_tool.db")
+
+# Pool-instellingen (per uvicorn worker)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconden
+
+# SQLite: hoe lang (ms) een writer wacht op een lock i.p.v. direct "database is locked"
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))
+
+
+def _create_engine(url: str):
+    parsed = make_url(url)
+    is_sqlite = parsed.get_backend_name() == "sqlite"
+    is_memory = is_sqlite and parsed.database in (None, "", ":memory:")
+
+    kwargs = {"pool_pre_ping": True}
+
+    if is_sqlite:
+        kwargs["connect_args"] = {"check_same_thread": False}
+
+    # in-memory SQLite gebruikt een SingletonThreadPool zonder overflow
+    if not is_memory:
+        kwargs.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+
+    eng = create_engine(url, **kwargs)
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+    if is_sqlite:
+        @event.listens_for(eng, "connect")
+        def _sqlite_pragmas(dbapi_conn, _record):
+            cur = dbapi_conn.cursor()
+            if not is_memory:
+                # WAL: lezers blokkeren writers niet (en andersom)
+                cur.execute("PRAGMA journal_mode=WAL")
+                cur.execute("PRAGMA synchronous=NORMAL")
+            cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+            cur.close()
+
+    return eng
+
+
+engine = _create_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -17,6 +63,26 @@ SessionLocal = sessionmaker(
 
 Base = declarative_base()
 
+
+def dialect_name(db) -> str:
+    """
+    Naam van het database-dialect achter een Session ("sqlite", "postgresql", ...).
+    """
+    return db.get_bind().dialect.name
+
+
+def lock_for_write(db):
+    """
+    Dialect-afhankelijke write-lock aan het begin van een transactie.
+
+    - SQLite: BEGIN IMMEDIATE (één writer tegelijk, busy_timeout laat anderen wachten)
+    - PostgreSQL: niets; daar beschermen rij-locks (FOR UPDATE) en
+      constraints de gelijktijdige schrijvers
+    """
+    if dialect_name(db) == "sqlite":
+        db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+
+
 def get_db():
     db = SessionLocal()
     try:
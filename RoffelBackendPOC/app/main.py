@@ -9,6 +9,15 @@ app = FastAPI(title="Roffel Backend API")
 
 from app.database import SessionLocal
 from app.core.bootstrap import create_initial_admin
+from app.services.number_allocator import (
+    release_number_pools,
+    release_stale_number_pools,
+)
+from app.services.documents.renderer import shutdown_renderer
+from app.services.documents.mail_render import load_mail_templates
+from app.services.import_jobs import shutdown_import_jobs
+from app.core.login_guard import shutdown_login_executor
+from app.services.change_feed import shutdown_change_feed
 
 from app.routers import (
     health,
@@ -27,6 +36,8 @@ from app.routers import (
     suppliers,
     purchaseorder_numbers,
     admin_import,
+    changes,
+    mail_outbox,
 )
 
 app.add_middleware(
@@ -66,11 +77,31 @@ app.include_router(articles.router)
 app.include_router(suppliers.router)
 app.include_router(purchaseorder_numbers.router)
 app.include_router(admin_import.router )
+app.include_router(changes.router)
+app.include_router(mail_outbox.router)
 
 @app.on_event("startup")
 def startup_event():
     db = SessionLocal()
     try:
         create_initial_admin(db)
+        release_stale_number_pools(db)
     finally:
         db.close()
+
+    load_mail_templates()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    # ongebruikte pool-nummers van deze worker terug naar FREE
+    db = SessionLocal()
+    try:
+        release_number_pools(db)
+    finally:
+        db.close()
+
+    shutdown_renderer()
+    shutdown_import_jobs()
+    shutdown_login_executor()
+    shutdown_change_feed()
@@ -7,9 +7,14 @@ from .serviceorder import ServiceOrder
 from .serviceorder_item import ServiceOrderItem
 from .serviceorder_log import ServiceOrderLog
 from .serviceorder_number import ServiceOrderNumber
+from .serviceorder_stats import ServiceOrderStat
 
 from .purchaseorder_number import PurchaseOrderNumber
 
+from .import_job import ImportJob
+from .mail_outbox import MailOutbox
+from .change_event import ChangeEvent
+
 __all__ = [
     "Article",
     "Customer",
@@ -19,5 +24,9 @@ __all__ = [
     "ServiceOrderItem",
     "ServiceOrderLog",
     "ServiceOrderNumber",
+    "ServiceOrderStat",
     "PurchaseOrderNumber",
+    "ImportJob",
+    "MailOutbox",
+    "ChangeEvent",
 ]
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Text, DateTime
+from datetime import datetime
+
+from app.database import Base
+
+
+class ChangeEvent(Base):
+    """
+    Gedeelde buffer van de change feed (CHANGE_FEED_BACKEND=database):
+    elke worker schrijft zijn events hier en leest die van de anderen
+    (zie app/services/change_feed.py). Het id is het SSE event-id.
+    """
+    __tablename__ = "change_events"
+    # SQLite: ids nooit hergebruiken, ook niet na opruimen
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    payload = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
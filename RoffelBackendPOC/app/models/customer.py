@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index
 from datetime import datetime
 
 from app.database import Base
@@ -36,6 +36,10 @@ class CustomerContact(Base):
 
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_customer_contacts_customer_id_contact_name", "customer_id", "contact_name"),
+    )
+
 
 class CustomerPriceRule(Base):
     __tablename__ = "customer_price_rules"
@@ -48,6 +52,11 @@ class CustomerPriceRule(Base):
 
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # regels per klant, oplopend op drempel
+        Index("ix_customer_price_rules_customer_id_min_amount", "customer_id", "min_amount"),
+    )
+
 
 class SullairSettings(Base):
     __tablename__ = "sullair_settings"
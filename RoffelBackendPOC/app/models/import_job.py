@@ -0,0 +1,51 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Enum
+from datetime import datetime
+import enum
+
+from app.database import Base
+
+
+class ImportJobStatus(str, enum.Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    # uuid, zodat job-id's niet te raden zijn
+    id = Column(String, primary_key=True)
+
+    kind = Column(String, nullable=False)       # bv. "duallist"
+    filename = Column(String, nullable=True)
+
+    status = Column(
+        Enum(ImportJobStatus),
+        nullable=False,
+        default=ImportJobStatus.QUEUED,
+        index=True,
+    )
+
+    # voortgang (bijgewerkt per chunk)
+    total_rows = Column(Integer, nullable=True)
+    rows_processed = Column(Integer, nullable=False, default=0)
+    created = Column(Integer, nullable=False, default=0)
+    updated = Column(Integer, nullable=False, default=0)
+    skipped = Column(Integer, nullable=False, default=0)
+    duplicates_in_file = Column(Integer, nullable=False, default=0)
+    sheet_used = Column(String, nullable=True)
+
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    error = Column(String, nullable=True)
+
+    created_by = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    @property
+    def total_processed(self):
+        return (self.created or 0) + (self.updated or 0)
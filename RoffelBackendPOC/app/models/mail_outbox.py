@@ -0,0 +1,50 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, ForeignKey, Index
+from datetime import datetime
+import enum
+
+from app.database import Base
+
+
+class MailOutboxStatus(str, enum.Enum):
+    PENDING = "PENDING"      # wacht op (volgende) poging
+    SENDING = "SENDING"      # geclaimd door een worker (tot locked_until)
+    SENT = "SENT"
+    SKIPPED = "SKIPPED"      # MAIL_ENABLED=false
+    DEAD = "DEAD"            # opgegeven; handmatig opnieuw proberen
+
+
+class MailOutbox(Base):
+    __tablename__ = "mail_outbox"
+
+    id = Column(Integer, primary_key=True)
+
+    # één mail per (order, mailtype, inhoudsversie); dubbel klikken = zelfde rij
+    idempotency_key = Column(String, nullable=True, unique=True)
+    mail_type = Column(String, nullable=False)
+    serviceorder_id = Column(Integer, ForeignKey("serviceorders.id"), nullable=True, index=True)
+
+    to = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body_html = Column(Text, nullable=False)
+    attachment_path = Column(String, nullable=True)
+
+    status = Column(
+        Enum(MailOutboxStatus),
+        nullable=False,
+        default=MailOutboxStatus.PENDING,
+    )
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=True)
+    claim_token = Column(String, nullable=True, index=True)
+
+    last_error = Column(String, nullable=True)
+    provider_message_id = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # worker: eerstvolgende mails die aan de beurt zijn
+        Index("ix_mail_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 
@@ -25,4 +25,24 @@ class ServiceOrder(Base):
     employee = Column(String)
     remarks = Column(String)
 
-    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    # ophogen bij elke wijziging van de regels (optimistic locking bij PATCH)
+    items_version = Column(Integer, nullable=False, default=0, server_default=text("0"))
+
+    # bewaarde prijsberekening (app/services/order_pricing.py); de versie
+    # wordt bij elke herberekening opgehoogd, 0 = nog nooit berekend
+    pricing_total = Column(Float, nullable=True)
+    pricing_price_type = Column(String, nullable=True)
+    pricing_version = Column(Integer, nullable=False, default=0, server_default=text("0"))
+
+    # NOT NULL: de keyset-cursor van het overzicht rekent op (created_at, id)
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+    )
+
+    __table_args__ = (
+        # overzicht: keyset-paginering op (created_at, id), eventueel per status
+        Index("ix_serviceorders_created_at_id", "created_at", "id"),
+        Index("ix_serviceorders_status_created_at_id", "status", "created_at", "id"),
+    )
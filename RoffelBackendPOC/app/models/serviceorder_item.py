@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, Integer, String, Float,
-    Boolean, DateTime, ForeignKey
+    Boolean, DateTime, ForeignKey, text
 )
 from datetime import datetime
 
@@ -10,9 +10,10 @@ class ServiceOrderItem(Base):
     __tablename__ = "serviceorder_items"
 
     id = Column(Integer, primary_key=True)
-    serviceorder_id = Column(Integer, ForeignKey("serviceorders.id"))
+    serviceorder_id = Column(Integer, ForeignKey("serviceorders.id"), index=True)
 
-    part_no = Column(String, nullable=False)
+    # leveringsbon: regels op part_no zoeken
+    part_no = Column(String, nullable=False, index=True)
     description = Column(String)
     qty = Column(Integer)
 
@@ -26,6 +27,7 @@ class ServiceOrderItem(Base):
     bestellen = Column(Boolean, default=False)
 
     ontvangen = Column(Boolean, default=False)
+    qty_received = Column(Integer, nullable=False, default=0, server_default=text("0"))
     received_at = Column(DateTime, nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from datetime import datetime
 
 from app.database import Base
@@ -14,3 +14,8 @@ class ServiceOrderLog(Base):
     message = Column(String, nullable=False)
 
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # log per order, gepagineerd op id
+        Index("ix_serviceorder_logs_serviceorder_id_id", "serviceorder_id", "id"),
+    )
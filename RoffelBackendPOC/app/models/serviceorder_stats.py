@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint, text
+from datetime import datetime
+
+from app.database import Base
+
+
+class ServiceOrderStat(Base):
+    """
+    Tellers per (status, leverancier, medewerker), bijgehouden bij elke
+    status- of regelwijziging (zie app/services/serviceorder_stats.py).
+
+    Lege status / medewerker staan als "" opgeslagen (unique + upsert).
+    """
+    __tablename__ = "serviceorder_stats"
+
+    id = Column(Integer, primary_key=True)
+
+    status = Column(String, nullable=False)
+    supplier_id = Column(Integer, nullable=False)
+    employee = Column(String, nullable=False)
+
+    # aantal serviceorders met deze sleutel
+    order_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    # bestelde regels die nog niet (volledig) ontvangen zijn
+    open_lines = Column(Integer, nullable=False, default=0, server_default=text("0"))
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("status", "supplier_id", "employee", name="uq_serviceorder_stats_key"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, Float
 from datetime import datetime, timezone
 
 from app.database import Base
@@ -12,4 +12,6 @@ class Supplier(Base):
     supplier_contact = Column(String, nullable=True)
     supplier_contact_mail = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
+    # minimale inkoopwaarde per PO; leeg = DEFAULT_MIN_ORDER_AMOUNT
+    min_order_amount = Column(Float, nullable=True)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
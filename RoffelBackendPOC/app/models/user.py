@@ -29,7 +29,7 @@ class User(Base):
 
     is_admin = Column(Boolean, default=False)
 
-    reset_token = Column(String, nullable = True)
+    reset_token = Column(String, nullable = True, index=True)
     reset_expires = Column(DateTime, nullable = True)
 
     created_at = Column(DateTime, default=datetime.utcnow)
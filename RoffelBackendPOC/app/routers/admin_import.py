@@ -1,10 +1,16 @@
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 from sqlalchemy.orm import Session
-import tempfile
 import os
 
 from app.database import get_db
-from app.services.duallist_importer import import_duallist_from_excel
+from app.models.import_job import ImportJob
+from app.schemas.import_job import ImportJobOut, ImportJobQueuedOut
+from app.services.import_jobs import (
+    save_upload,
+    create_job,
+    submit_duallist_import,
+    request_cancel,
+)
 from app.core.security import require_min_role
 from app.models.user import UserRole
 
@@ -13,7 +19,7 @@ router = APIRouter(
     tags=["Admin Imports"],
  )
 
-@router.post("/duallist")
+@router.post("/duallist", response_model=ImportJobQueuedOut)
 def upload_duallist(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
@@ -25,15 +31,40 @@ def upload_duallist(
             detail="Alleen Excel bestanden toegestaan",
         )
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-        tmp.write(file.file.read())
-        tmp_path = tmp.name
-
-    try:
-        result = import_duallist_from_excel(tmp_path, db)
-        return {
-            "status": "ok",
-            **result,
-        }
-    finally:
-        os.unlink(tmp_path)
+    # upload in blokken naar schijf, import draait op de achtergrond
+    tmp_path = save_upload(file.file, os.path.splitext(file.filename)[1])
+
+    job = create_job(
+        db,
+        kind="duallist",
+        filename=file.filename,
+        created_by=user.email,
+    )
+    submit_duallist_import(job.id, tmp_path)
+
+    return {"status": job.status, "job_id": job.id}
+
+
+def _get_job(db: Session, job_id: str) -> ImportJob:
+    job = db.query(ImportJob).filter(ImportJob.id == job_id).first()
+    if not job:
+        raise HTTPException(404, "Import job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=ImportJobOut)
+def get_import_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    user=Depends(require_min_role(UserRole.admin)),
+):
+    return _get_job(db, job_id)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=ImportJobOut)
+def cancel_import_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    user=Depends(require_min_role(UserRole.admin)),
+):
+    return request_cancel(db, _get_job(db, job_id))
@@ -1,24 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from typing import Optional
 
 from app.database import get_db
-from app.models.article import Article
-from app.schemas.article import ArticleOut
-from app.models.user import User
-from app.core.security import get_current_user
+from app.schemas.article import (
+    ArticleOut,
+    ArticleSearchOut,
+    ArticleLookupIn,
+    ArticleLookupOut,
+)
+from app.core.security import require_token_role, UserRole
+from app.services.article_search import search_articles
+from app.services.article_cache import lookup_articles
+
+# maximaal aantal part_no's per lookup
+MAX_LOOKUP = 1000
 
 router = APIRouter(
     prefix="/articles",
     tags=["Articles"],
 )
 
+# Let op: moet vóór "/{part_no}" staan
+@router.get("/search", response_model=ArticleSearchOut)
+def search(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    claims: dict = Depends(require_token_role(UserRole.user)),
+):
+    """
+    Zoek op (deel van) part_no of omschrijving; resultaten op relevantie.
+    `cursor` is de `next_cursor` van de vorige pagina; na een nieuwe
+    catalogusimport is die verlopen (400, opnieuw zoeken).
+    """
+    try:
+        items, total, next_cursor = search_articles(db, q, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    return {
+        "items": items,
+        "total": total,
+        "next_cursor": next_cursor,
+    }
+
+
+@router.post("/lookup", response_model=ArticleLookupOut)
+def lookup(
+    payload: ArticleLookupIn,
+    db: Session = Depends(get_db),
+    claims: dict = Depends(require_token_role(UserRole.user)),
+):
+    """
+    Meerdere part_no's in één keer opzoeken (bv. geplakte onderdelenlijst).
+    Volgorde van `items` volgt de aanvraag; onbekende codes staan in `missing`.
+    """
+    if len(payload.part_nos) > MAX_LOOKUP:
+        raise HTTPException(400, f"Maximaal {MAX_LOOKUP} part_no's per lookup")
+
+    items, missing = lookup_articles(db, payload.part_nos)
+    return {"items": items, "missing": missing}
+
+
 @router.get("/{part_no}", response_model=ArticleOut)
 def get_article(
     part_no: str,
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    claims: dict = Depends(require_token_role(UserRole.user)),
 ):
-    rec = db.query(Article).filter(Article.part_no == part_no).first()
-    if not rec:
+    items, _ = lookup_articles(db, [part_no])
+    if not items:
         raise HTTPException(404, "Article not found")
-    return rec
+    return items[0]
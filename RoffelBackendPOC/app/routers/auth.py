@@ -1,5 +1,5 @@
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
@@ -8,13 +8,17 @@ import secrets
 from app.database import get_db
 from app.models.user import User
 from app.schemas.auth import PasswordResetRequest, PasswordResetSubmit
-from app.services.mail.mail_sender import send_mail
+from app.services.mail.outbox import enqueue_mail
 from app.core.security import (
     get_current_user,
     create_access_token,
-    verify_password,
     hash_password,
 )
+from app.core.login_guard import (
+    check_login_allowed,
+    register_login_result,
+    verify_password_bounded,
+)
 from app.core.config import FRONTEND_URL
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -29,13 +33,32 @@ def read_me(user: User = Depends(get_current_user)):
 
 @router.post("/login")
 def login(
+    request: Request,
     form: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
 ):
+    ip = request.client.host if request.client else None
+
+    # 🚦 te veel mislukte pogingen → 429 (zonder te hashen)
+    check_login_allowed(form.username, ip)
+
     user = db.query(User).filter(User.email == form.username).first()
-    if not user or not verify_password(form.password, user.password_hash):
+
+    # 🔐 bcrypt op de begrensde login-executor
+    ok, new_hash = verify_password_bounded(
+        form.password,
+        user.password_hash if user else None,
+    )
+    register_login_result(form.username, ip, ok)
+
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # hash voldoet niet meer aan de ingestelde kosten → direct omzetten
+    if new_hash:
+        user.password_hash = new_hash
+        db.commit()
+
     token = create_access_token(user)
     return {
         "access_token": token,
@@ -67,12 +90,12 @@ def request_password_reset(
     user.reset_token = reset_token
     user.reset_expires = datetime.utcnow() + timedelta(minutes=30)
 
-    db.commit()
-
-    # later: mailservice
     reset_url = f"{FRONTEND_URL}/reset-password/{reset_token}"
 
-    send_mail(
+    # via de outbox: de response wacht niet op de mailprovider
+    enqueue_mail(
+        db,
+        "password_reset",
         to=user.email,
         subject="Wachtwoord reset – Maconet Portal",
         body_html=f"""
@@ -90,6 +113,7 @@ def request_password_reset(
         """,
     )
 
+    db.commit()
 
     return {"result": "ok"}
 
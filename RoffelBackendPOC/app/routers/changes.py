@@ -0,0 +1,83 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.core.security import check_token_role, require_token_role, UserRole
+from app.services.change_feed import change_feed, format_sse
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+
+@router.get("/stream")
+async def stream_changes(
+    so: Optional[str] = None,
+    supplier_id: Optional[int] = None,
+    after: Optional[int] = Query(None, description="Hervatten na dit event-id"),
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+    claims: dict = Depends(require_token_role(UserRole.user)),
+):
+    """
+    Server-Sent Events met statuswijzigingen, logregels, ontvangsten en
+    PO-bestellingen. Filter op `so` of `supplier_id`; bij opnieuw verbinden
+    stuurt de browser Last-Event-ID mee en worden gemiste events nagestuurd.
+    """
+    # alleen token-claims: geen DB-sessie die de hele stream open blijft
+    resume = last_event_id if last_event_id is not None else after
+
+    async def _events():
+        yield "retry: 3000\n\n"
+        async for e in change_feed.stream(so, supplier_id, resume):
+            yield format_sse(e)
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # nginx: niet bufferen
+        },
+    )
+
+
+@router.websocket("/ws")
+async def changes_websocket(
+    websocket: WebSocket,
+    token: str,
+    so: Optional[str] = None,
+    supplier_id: Optional[int] = None,
+    after: Optional[int] = None,
+):
+    """
+    Zelfde events als /changes/stream, als JSON-berichten over een WebSocket.
+    Browsers kunnen hier geen Authorization-header meesturen → `?token=`.
+    """
+    try:
+        check_token_role(token, UserRole.user)
+    except HTTPException:
+        await websocket.close(code=1008)  # policy violation
+        return
+
+    await websocket.accept()
+
+    # berichten van de client negeren; alleen merken dat hij weg is
+    async def _until_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    listener = asyncio.create_task(_until_disconnect())
+    events = change_feed.stream(so, supplier_id, after)
+    try:
+        async for e in events:
+            if listener.done():
+                return
+            await websocket.send_json(e if e is not None else {"type": "keepalive"})
+
+        # stream gestopt (trage client / shutdown): client hervat met ?after=
+        await websocket.close(code=1013)  # try again later
+    except WebSocketDisconnect:
+        pass
+    finally:
+        listener.cancel()
+        await events.aclose()
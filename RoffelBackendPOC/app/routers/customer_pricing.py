@@ -7,15 +7,42 @@ from app.models.customer import Customer, CustomerPriceRule
 from app.schemas.customer import (
     CustomerPriceRuleIn,
     CustomerPriceRuleOut,
+    PriceTypeResolveIn,
+    PriceTypeResolveOut,
 )
 from app.models.user import User
 from app.core.security import require_min_role, UserRole
+from app.services.order_pricing import queue_reprice_customer
+from app.services.price_rule_cache import resolve_price_types
 
 router = APIRouter(
     prefix="/customers",
     tags=["Customer Pricing"],
 )
 
+# =========================
+# RESOLVE PRICE TYPES (BATCH)
+# =========================
+@router.post(
+    "/price-rules/resolve",
+    response_model=List[PriceTypeResolveOut]
+)
+def resolve_price_rules(
+    data: List[PriceTypeResolveIn],
+    db: Session = Depends(get_db),
+    user: User = Depends(require_min_role(UserRole.user)),
+):
+    """
+    Prijstype voor veel (klant, totaal)-combinaties tegelijk, uit de
+    gecachete prijsregels (bv. voor offertes of een prijsvergelijking).
+    """
+    price_types = resolve_price_types(db, [(r.customer_id, r.total) for r in data])
+
+    return [
+        PriceTypeResolveOut(customer_id=r.customer_id, total=r.total, price_type=pt)
+        for r, pt in zip(data, price_types)
+    ]
+
 # =========================
 # GET PRICE RULES
 # =========================
@@ -66,6 +93,9 @@ def save_price_rules(
             )
         )
 
+    # gecachete tiers vergeten + bewaarde prijzen van de orders van deze
+    # klant bijwerken (zelfde commit)
+    queue_reprice_customer(db, customer_id)
     db.commit()
 
     return {
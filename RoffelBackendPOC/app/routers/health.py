@@ -1,4 +1,6 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+
+from app.core.security import principal_cache, require_min_role, UserRole
 
 router = APIRouter()
 
@@ -10,3 +12,7 @@ def health():
 @router.get("/health-test")
 def test():
     return {"source": "router"}
+
+@router.get("/health/cache")
+def cache_stats(user=Depends(require_min_role(UserRole.admin))):
+    return {"principal": principal_cache.stats()}
@@ -0,0 +1,43 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models.mail_outbox import MailOutbox, MailOutboxStatus
+from app.schemas.mail import MailOutboxOut, MailOutboxRetryIn, MailOutboxRetryOut
+from app.services.mail.outbox import retry_dead_mails
+from app.core.security import require_min_role
+from app.models.user import UserRole
+
+router = APIRouter(
+    prefix="/admin/mail-outbox",
+    tags=["Admin Mail"],
+)
+
+
+@router.get("", response_model=List[MailOutboxOut])
+def list_outbox(
+    status: Optional[MailOutboxStatus] = None,
+    so_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+    user=Depends(require_min_role(UserRole.admin)),
+):
+    query = db.query(MailOutbox)
+    if status is not None:
+        query = query.filter(MailOutbox.status == status)
+    if so_id is not None:
+        query = query.filter(MailOutbox.serviceorder_id == so_id)
+
+    return query.order_by(MailOutbox.id.desc()).limit(limit).all()
+
+
+@router.post("/retry", response_model=MailOutboxRetryOut)
+def retry_outbox(
+    data: MailOutboxRetryIn,
+    db: Session = Depends(get_db),
+    user=Depends(require_min_role(UserRole.admin)),
+):
+    # dead-letter mails terug naar PENDING; de worker pakt ze direct op
+    return {"requeued": retry_dead_mails(db, data.ids)}
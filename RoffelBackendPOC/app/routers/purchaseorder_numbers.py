@@ -1,22 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, noload
 from datetime import datetime
 
 from app.database import get_db
 from app.core.security import get_current_user, require_min_role, UserRole
 
-from app.models.purchaseorder_number import PurchaseOrderNumber, PurchaseOrderServiceOrderLink, PurchaseOrderNrStatus
+from app.models.purchaseorder_number import PurchaseOrderNumber, PurchaseOrderNrStatus
 from app.schemas.purchaseorder_number import (
     PurchaseOrderNumberOut,
     PurchaseOrderNumberUpdate,
     PurchaseOrderNumberReserveOut,
     PurchaseOrderNrStatusEnum,
     PurchaseOrderServiceOrdersUpdate,
-    PurchaseOrderPlaceRequest
+    PurchaseOrderServiceOrdersDiffOut,
+    PurchaseOrderPlaceRequest,
+    SupplierCombinationOut,
 )
 
 from app.services.purchaseorder_numbers import reserve_next_purchaseorder_number
-from app.services.purchaseorder_orders import collect_order_items_from_serviceorders, mark_serviceorder_as_ordered
+from app.services.number_allocator import not_pooled
+from app.services.po_combination import min_order_amount, suggest_combinations
+from app.services.purchaseorder_orders import (
+    collect_po_serviceorders,
+    confirm_purchaseorder,
+    mark_serviceorders_as_ordered,
+    po_order_total,
+    sync_po_serviceorder_links,
+)
 
 
 router = APIRouter(prefix="/purchaseorder-numbers", tags=["purchaseorder-numbers"])
@@ -39,7 +50,10 @@ def list_purchaseorder_numbers(
     user=Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    q = db.query(PurchaseOrderNumber)
+    q = (
+        db.query(PurchaseOrderNumber)
+        .filter(not_pooled(PurchaseOrderNumber.reserved_by))
+    )
 
     if year:
         q = q.filter(PurchaseOrderNumber.year == year)
@@ -58,6 +72,40 @@ def list_purchaseorder_numbers(
     )
 
 
+# Let op: moet vóór "/{po_number}" staan
+@router.get("/combination-suggestions", response_model=list[SupplierCombinationOut])
+def list_combination_suggestions(
+    supplier_id: int | None = None,
+    user=Depends(require_min_role(UserRole.user)),
+    db: Session = Depends(get_db),
+):
+    """
+    Voorstel per leverancier: welke orders in WACHT_OP_COMBINATIE samen een
+    PO vormen die het minimum van de leverancier haalt (langst wachtende
+    orders eerst), en wat er daarna nog wacht.
+    """
+    out = []
+    for c in suggest_combinations(db, supplier_id):
+        waiting_total = round(sum(o.order_total for o in c.waiting), 2)
+        out.append({
+            "supplier_id": c.supplier_id,
+            "supplier_name": c.supplier_name,
+            "min_order_amount": c.min_order_amount,
+            "purchase_orders": [
+                {
+                    "order_total": round(sum(o.order_total for o in po), 2),
+                    "overshoot": round(sum(o.order_total for o in po) - c.min_order_amount, 2),
+                    "serviceorders": [o.__dict__ for o in po],
+                }
+                for po in c.purchase_orders
+            ],
+            "waiting": [o.__dict__ for o in c.waiting],
+            "waiting_total": waiting_total,
+            "missing": round(max(c.min_order_amount - waiting_total, 0.0), 2) if c.waiting else 0.0,
+        })
+    return out
+
+
 @router.get("/{po_number}", response_model=PurchaseOrderNumberOut)
 def get_purchaseorder_number(
     po_number: str,
@@ -145,7 +193,7 @@ def cancel_po_number(
 
 @router.put(
     "/{po_number}/serviceorders",
-    response_model=PurchaseOrderNumberOut,
+    response_model=PurchaseOrderServiceOrdersDiffOut,
 )
 def update_po_serviceorders(
     po_number: str,
@@ -153,8 +201,14 @@ def update_po_serviceorders(
     user=Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
+    """
+    Koppelingen van de PO gelijkmaken aan `so_numbers`. Alleen het verschil
+    wordt weggeschreven (één commit); het antwoord bevat alleen de gewijzigde
+    koppelingen en het nieuwe PO-totaal.
+    """
     po = (
         db.query(PurchaseOrderNumber)
+        .options(noload(PurchaseOrderNumber.serviceorders))
         .filter(PurchaseOrderNumber.po_number == po_number)
         .first()
     )
@@ -168,25 +222,35 @@ def update_po_serviceorders(
             detail="Only RESERVED purchase orders can be updated"
         )
 
-    # 1️⃣ Bestaande koppelingen expliciet verwijderen
-    db.query(PurchaseOrderServiceOrderLink)\
-        .filter(PurchaseOrderServiceOrderLink.purchase_order_id == po.id)\
-        .delete(synchronize_session=False)
-
-    db.commit()   # ⬅️ DIT IS DE CRUCIALE FIX
+    # 1️⃣ Verschil wegschrijven (inserts + deletes)
+    added, removed, unknown = sync_po_serviceorder_links(db, po.id, payload.so_numbers)
 
-    # 2️⃣ Nieuwe koppelingen toevoegen
-    for so in payload.so_numbers:
-        db.add(
-            PurchaseOrderServiceOrderLink(
-                purchase_order_id=po.id,
-                so_number=so
-            )
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "code": "UNKNOWN_SERVICEORDERS",
+                "so_numbers": unknown,
+            },
         )
 
-    db.commit()
-    db.refresh(po)
-    return po
+    # 2️⃣ Nieuw totaal (in SQL, binnen dezelfde transactie)
+    total = po_order_total(db, po.id)
+    po.order_total = total
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # tegelijk dezelfde koppeling toegevoegd door een ander request
+        db.rollback()
+        raise HTTPException(409, "Links were changed by someone else, reload and try again")
+
+    return {
+        "po_number": po_number,
+        "added": added,
+        "removed": removed,
+        "order_total": total,
+    }
 
 @router.post("/{po_number}/order")
 def place_purchaseorder(
@@ -207,51 +271,48 @@ def place_purchaseorder(
     if po.status != PurchaseOrderNrStatus.RESERVED:
         raise HTTPException(400, "Only RESERVED purchase orders can be ordered")
 
-    so_numbers = [l.so_number for l in po.serviceorders]
+    # 1️⃣ Gekoppelde serviceorders + te bestellen regels (één query, totaal in SQL)
+    rows = collect_po_serviceorders(db, po.id)
 
-    if not so_numbers:
+    if not rows:
         raise HTTPException(400, "No serviceorders linked to this PO")
 
-    # 1️⃣ Items verzamelen
-    items = collect_order_items_from_serviceorders(db, so_numbers)
-
-    if not items:
+    if not any(r.order_lines for r in rows):
         raise HTTPException(400, "No orderable items found")
 
-    total = sum(
-        (it.price_purchase or 0) * it.qty
-        for it in items
-    )
+    total = round(sum(r.order_total for r in rows), 2)
+    so_numbers = [r.so for r in rows]
 
-    # 2️⃣ Minimum-order-check
-    MIN_ORDER_AMOUNT = 500  # straks config
+    # 2️⃣ Minimum-order-check (per leverancier; zonder eenduidige leverancier de standaard)
+    supplier_ids = {r.supplier_id for r in rows if r.supplier_id}
+    supplier_id = po.supplier_id or (supplier_ids.pop() if len(supplier_ids) == 1 else None)
+    minimum = min_order_amount(db, supplier_id)
 
-    if total < MIN_ORDER_AMOUNT and not payload.force:
+    if total < minimum and not payload.force:
         raise HTTPException(
             status_code=409,
             detail={
                 "code": "MIN_ORDER_NOT_REACHED",
                 "order_total": total,
-                "minimum": MIN_ORDER_AMOUNT,
+                "minimum": minimum,
             },
         )
 
     # 3️⃣ HIER haak je je bestaande bestelactie in
     # perform_supplier_order(...)
 
-    # 4️⃣ Statusupdates
-    for so in so_numbers:
-        mark_serviceorder_as_ordered(db, so)
+    # 4️⃣ PO bevestigen (conditioneel: niet twee keer bestellen)
+    if not confirm_purchaseorder(db, po, total):
+        raise HTTPException(409, "Purchase order was already ordered or changed, reload and try again")
 
-    po.status = PurchaseOrderNrStatus.CONFIRMED
-    po.order_total = total
-    po.confirmed_at = datetime.utcnow()
+    # 5️⃣ Statusupdates + logregels, set-based
+    mark_serviceorders_as_ordered(db, rows, po.po_number)
 
     db.commit()
 
     return {
         "status": "ordered",
-        "po_number": po.po_number,
+        "po_number": po_number,
         "order_total": total,
         "serviceorders": so_numbers,
     }
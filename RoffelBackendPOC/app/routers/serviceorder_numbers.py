@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Path, Query, HTTPException
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from datetime import datetime
@@ -17,9 +17,11 @@ from app.schemas.serviceorder_number import (
 
 from app.services.serviceorder_numbers import ( 
     reserve_next_serviceorder_number,
+    reserve_serviceorder_numbers,
     confirm_serviceorder_number,
     cancel_serviceorder_number,
     )
+from app.services.number_allocator import not_pooled
 from app.core.security import get_current_user, require_min_role, UserRole
 
 router = APIRouter(prefix="/serviceorder-numbers", tags=["serviceorder-numbers"])
@@ -41,17 +43,16 @@ def reserve_so_number(
 
 @router.post("/reserve-batch/{count}")
 def reserve_batch(
-    count: int,
+    count: int = Path(..., ge=1, le=500),
     user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    numbers = []
-    for _ in range(count):
-        rec = reserve_next_serviceorder_number(
-            db=db,
-            reserved_by="WORKSHOP"
-        )
-        numbers.append(rec.so_number)
+    # één transactie voor het hele blok
+    numbers = reserve_serviceorder_numbers(
+        db=db,
+        reserved_by="WORKSHOP",
+        count=count,
+    )
 
     return {
         "count": len(numbers),
@@ -115,6 +116,7 @@ def list_serviceorder_numbers(
 ):
     query = (
         db.query(ServiceOrderNumber)
+        .filter(not_pooled(ServiceOrderNumber.reserved_by))
     )
 
     if year:
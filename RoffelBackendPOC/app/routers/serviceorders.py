@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Path, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session, joinedload
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 from app.database import get_db
@@ -15,7 +15,10 @@ from app.models.supplier import Supplier
 
 from app.schemas.serviceorder import (
     ServiceOrderIn,
-    ServiceOrderOverview,
+    ServiceOrderOverviewPage,
+    ServiceOrderFullOut,
+    ServiceOrderStatsOut,
+    ServiceOrderStatsRebuildOut,
     ServiceOrderStatusTransition,
     ServiceOrderStatusEnum,
     SERVICEORDER_ALLOWED_TRANSITIONS,
@@ -23,6 +26,11 @@ from app.schemas.serviceorder import (
 from app.schemas.serviceorder_item import (
     ServiceOrderItemIn,
     ServiceOrderItemOut,
+    ServiceOrderItemsPatch,
+    ServiceOrderItemsPatchOut,
+    ItemsReceiveIn,
+    DeliveryReceiveIn,
+    ReceiveResultOut,
 )
 from app.schemas.serviceorder_log import ServiceOrderLogOut
 from app.schemas.article import ArticleOut
@@ -31,7 +39,7 @@ from app.schemas.serviceorder_merge import ServiceOrderForPOMergeOut
 
 from app.core.security import get_current_user, require_min_role, UserRole
 
-from app.services.orders import set_order_status, log_event
+from app.services.orders import set_order_status, log_event, transition_order_status
 from app.services.documents.packing_slip import build_packing_slip_pdf
 from app.services.documents.stock_order import build_stock_order_pdf
 from app.services.documents.mail_templates import (
@@ -41,10 +49,29 @@ from app.services.documents.mail_templates import (
     build_order_confirmation_mail,
 )
 from app.services.serviceorder_numbers import confirm_serviceorder_number
-from app.services.pricing import calculate_order_totals
+from app.services.pricing import calculate_totals_for_orders
+from app.services.order_pricing import queue_reprice
+from app.services.serviceorder_items import (
+    apply_items_patch,
+    bump_items_version,
+    item_insert_values,
+)
+from app.services.receiving import receive_order_items, receive_delivery
+from app.services.serviceorder_stats import (
+    count_open_lines,
+    order_key,
+    rebuild_serviceorder_stats,
+    serviceorder_stats,
+    stage_open_lines,
+)
+from app.services.serviceorder_queries import (
+    serviceorder_overview_page,
+    serviceorder_full,
+    parse_include,
+)
 
 # ✅ NEW: echte mail verzending
-from app.services.mail.mail_sender import send_mail
+from app.services.mail.outbox import enqueue_mail, mail_idempotency_key
 
 import os
 
@@ -80,8 +107,7 @@ def upsert_serviceorder(
     rec = ServiceOrder(**payload.model_dump())
 
     db.add(rec)
-    db.commit()
-    db.refresh(rec)
+    db.flush()  # id nodig voor de logregel
 
     set_order_status(
         db,
@@ -89,26 +115,163 @@ def upsert_serviceorder(
         "OPEN",
         "Serviceorder aangemaakt",
     )
+    db.commit()
 
     return {"result": "created", "so": payload.so}
 
 
-@router.get("/overview", response_model=List[ServiceOrderOverview])
+@router.get("/overview", response_model=ServiceOrderOverviewPage)
 def list_serviceorders_overview(
+    status: Optional[List[str]] = Query(None),
+    supplier_id: Optional[int] = None,
+    customer_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    q: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db),
     user: User = Depends(require_min_role(UserRole.user)),
 ):
-    orders = (
+    """
+    Serviceorders, nieuwste eerst, per pagina.
+    Volgende pagina: `cursor` = `next_cursor` van de vorige response.
+    """
+    return serviceorder_overview_page(
+        db,
+        status=status,
+        supplier_id=supplier_id,
+        customer_id=customer_id,
+        date_from=date_from,
+        date_to=date_to,
+        q=q,
+        cursor=cursor,
+        limit=limit,
+    )
+
+
+# ================================
+# Dashboard-tellers
+# ================================
+# Let op: moet vóór "/{so}" staan, anders matcht die route eerst
+
+@router.get("/stats", response_model=ServiceOrderStatsOut)
+def get_serviceorder_stats(
+    db: Session = Depends(get_db),
+    user: User = Depends(require_min_role(UserRole.user)),
+):
+    """
+    Aantal orders en openstaande bestelde regels per status, leverancier en
+    medewerker. Leest de bijgehouden rollup, niet de orders zelf.
+    """
+    return serviceorder_stats(db)
+
+
+@router.post("/stats/rebuild", response_model=ServiceOrderStatsRebuildOut)
+def rebuild_stats(
+    db: Session = Depends(get_db),
+    user: User = Depends(require_min_role(UserRole.admin)),
+):
+    """
+    Tellers opnieuw berekenen; `differences` toont waar de rollup afweek.
+    """
+    return {"differences": rebuild_serviceorder_stats(db)}
+
+
+# ================================
+# t.b.v Merging
+# ================================
+# Let op: moet vóór "/{so}" staan, anders matcht die route eerst
+
+@router.get("/for-po-merge", response_model=list[ServiceOrderForPOMergeOut])
+def list_serviceorders_for_po_merge(
+    status: Optional[List[str]] = Query(None),
+    since: Optional[datetime] = None,
+    limit: int = Query(200, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    user: User = Depends(require_min_role(UserRole.user)),
+):
+    query = (
         db.query(ServiceOrder)
         .options(
-            joinedload(ServiceOrder.supplier),
             joinedload(ServiceOrder.customer),
+            joinedload(ServiceOrder.supplier),
         )
-        .order_by(ServiceOrder.created_at.desc())
+    )
+
+    if status:
+        query = query.filter(ServiceOrder.status.in_(status))
+    if since:
+        query = query.filter(ServiceOrder.created_at >= since)
+
+    orders = (
+        query
+        .order_by(ServiceOrder.created_at.desc(), ServiceOrder.id.desc())
+        .offset(offset)
+        .limit(limit)
         .all()
     )
 
-    return orders
+    # bewaarde totalen; alleen nog nooit geprijsde orders worden berekend
+    totals = calculate_totals_for_orders(
+        db, [o for o in orders if not o.pricing_version]
+    )
+
+    out: list[ServiceOrderForPOMergeOut] = []
+
+    for o in orders:
+        # ---- klant/leverancier display met fallbacks ----
+        customer_display = (
+            getattr(o, "customer_name_free", None)
+            or (o.customer.name if getattr(o, "customer", None) else None)
+            or "—"
+        )
+        supplier_display = (
+            getattr(o, "supplier_name_free", None)
+            or (o.supplier.name if getattr(o, "supplier", None) else None)
+            or "—"
+        )
+
+        # ---- totaal; orders zonder klant blijven op 0 ----
+        if o.pricing_version:
+            order_total = float(o.pricing_total or 0.0)
+        else:
+            order_total = float(totals.get(o.id, {}).get("total") or 0.0)
+
+        out.append(
+            ServiceOrderForPOMergeOut(
+                so=o.so,
+                date=getattr(o, "date", None) or getattr(o, "created_at", None),
+                customer_display=customer_display,
+                supplier_display=supplier_display,
+                order_total=order_total,
+                status=getattr(o, "status", None),
+                can_merge=True,
+            )
+        )
+
+    return out
+
+
+# Let op: moet vóór "/{so}" staan
+@router.post("/receive-delivery", response_model=ReceiveResultOut)
+def receive_supplier_delivery(
+    payload: DeliveryReceiveIn,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_min_role(UserRole.user)),
+):
+    """
+    Leveringsbon (part_no + aantal) in één keer ontvangen over alle
+    openstaande bestelde orders, oudste order eerst.
+    """
+    result = receive_delivery(
+        db,
+        [(line.part_no, line.qty) for line in payload.lines],
+        supplier_id=payload.supplier_id,
+    )
+    db.commit()
+    return result
 
 
 @router.get("/{so}", response_model=ServiceOrderIn)
@@ -123,6 +286,31 @@ def get_serviceorder(
     return order
 
 
+@router.get("/{so}/full", response_model=ServiceOrderFullOut)
+def get_serviceorder_full(
+    so: str,
+    include: Optional[str] = Query(
+        None,
+        description="Kommagescheiden: order,items,pricing,log,transitions (leeg = alles)",
+    ),
+    log_limit: int = Query(50, ge=1, le=500),
+    log_before: Optional[int] = None,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_min_role(UserRole.user)),
+):
+    """
+    Alles voor het detailscherm in één request.
+    Oudere logregels: `log_before` = `log.next_before` van de vorige response.
+    """
+    return serviceorder_full(
+        db,
+        so,
+        parse_include(include),
+        log_limit=log_limit,
+        log_before=log_before,
+    )
+
+
 # ==================================================
 # SERVICE ORDER ITEMS
 # ==================================================
@@ -138,6 +326,9 @@ def replace_items(
     if not order:
         raise HTTPException(404, "Serviceorder not found")
 
+    bump_items_version(db, order)
+    open_before = count_open_lines(db, [order.id]).get(order.id, 0)
+
     db.query(ServiceOrderItem).filter(
         ServiceOrderItem.serviceorder_id == order.id
     ).delete()
@@ -145,13 +336,40 @@ def replace_items(
     for item in items:
         db.add(ServiceOrderItem(
             serviceorder_id=order.id,
-            **item.model_dump()
+            **item_insert_values(item)
         ))
 
+    stage_open_lines(
+        db,
+        order_key(order),
+        sum(1 for i in items if i.bestellen and not i.ontvangen) - open_before,
+    )
+    queue_reprice(db, [order.id])
+
     db.commit()
     return {"result": "ok", "count": len(items)}
 
 
+@router.patch("/{so}/items", response_model=ServiceOrderItemsPatchOut)
+def patch_items(
+    so: str,
+    patch: ServiceOrderItemsPatch,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_min_role(UserRole.user)),
+):
+    """
+    Alleen de gewijzigde regels opslaan (toegevoegd / gewijzigd / verwijderd op id).
+    Met `expected_version` → 409 als iemand anders de regels intussen wijzigde.
+    """
+    order = db.query(ServiceOrder).filter(ServiceOrder.so == so).first()
+    if not order:
+        raise HTTPException(404, "Serviceorder not found")
+
+    result = apply_items_patch(db, order, patch)
+    db.commit()
+    return result
+
+
 @router.get("/{so}/items", response_model=List[ServiceOrderItemOut])
 def get_items(
     so: str,
@@ -180,43 +398,37 @@ def receive_item(
     if not order:
         raise HTTPException(404, "Serviceorder not found")
 
-    item = db.query(ServiceOrderItem).filter(
-        ServiceOrderItem.id == item_id,
-        ServiceOrderItem.serviceorder_id == order.id
-    ).first()
+    receive_order_items(db, order, [(item_id, None)])
+    db.commit()
 
-    if not item:
-        raise HTTPException(404, "Item not found")
+    return {"status": "ok"}
 
-    if not item.bestellen:
-        raise HTTPException(400, "Item was not ordered")
 
-    item.ontvangen = True
-    item.received_at = datetime.utcnow()
-    db.commit()
+@router.post("/{so}/items/receive", response_model=ReceiveResultOut)
+def receive_items(
+    so: str,
+    payload: ItemsReceiveIn,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_min_role(UserRole.user)),
+):
+    """
+    Meerdere regels tegelijk ontvangen (bv. scannen van een levering).
+    `qty` leeg = alles wat nog openstaat.
+    """
+    order = db.query(ServiceOrder).filter(ServiceOrder.so == so).first()
+    if not order:
+        raise HTTPException(404, "Serviceorder not found")
 
-    remaining = db.query(ServiceOrderItem).filter(
-        ServiceOrderItem.serviceorder_id == order.id,
-        ServiceOrderItem.bestellen == True,
-        ServiceOrderItem.ontvangen == False
-    ).count()
-
-    if remaining == 0:
-        set_order_status(
-            db,
-            order,
-            "ONTVANGEN",
-            "Alle bestelde artikelen zijn ontvangen",
-        )
-    else:
-        log_event(
-            db,
-            order,
-            "DEELONTVANGST",
-            f"Artikel {item.part_no} ontvangen",
-        )
+    if not payload.lines:
+        raise HTTPException(400, "No lines to receive")
 
-    return {"status": "ok"}
+    result = receive_order_items(
+        db,
+        order,
+        [(line.item_id, line.qty) for line in payload.lines],
+    )
+    db.commit()
+    return result
 
 @router.put("/{so}/po")
 def update_serviceorder_po(
@@ -231,7 +443,6 @@ def update_serviceorder_po(
         raise HTTPException(404, "Serviceorder not found")
 
     order.po = payload.get("po")
-    db.commit()
 
     log_event(
         db,
@@ -239,6 +450,7 @@ def update_serviceorder_po(
         "PO_UPDATED",
         f"PO gewijzigd naar {order.po or '-'}"
     )
+    db.commit()
 
     return {"status": "ok", "po": order.po}
 
@@ -319,7 +531,7 @@ def preview_stock_order_pdf(
     if not supplier or not supplier.email_general:
         raise HTTPException(400, "Supplier email not configured")
 
-    pdf_path = build_stock_order_pdf(db, order, supplier.email_general)
+    pdf_path = build_stock_order_pdf(db, order)
 
     return FileResponse(
         pdf_path,
@@ -328,10 +540,42 @@ def preview_stock_order_pdf(
     )
 
 
+def _queue_order_mail(
+    db: Session,
+    order: ServiceOrder,
+    mail_type: str,
+    mail: dict,
+    status: str,
+    message: str,
+    **extra,
+):
+    """
+    Mail in de outbox + statuswijziging in één commit; de mail-worker
+    verstuurt. Nogmaals versturen van dezelfde inhoud doet niets.
+    """
+    row, created = enqueue_mail(
+        db,
+        mail_type,
+        to=mail["to"],
+        subject=mail["subject"],
+        body_html=mail["body_html"],
+        serviceorder_id=order.id,
+        idempotency_key=mail_idempotency_key(mail_type, order),
+        attachment_path=mail.get("pdf_path"),
+    )
+
+    if not created:
+        return {"status": "already_queued", "mail_id": row.id, "mail_status": row.status, **extra}
+
+    set_order_status(db, order, status, message)
+    db.commit()
+
+    return {"status": "queued", "mail_id": row.id, **extra}
+
+
 @router.post("/{so}/order/send")
 def send_stock_order(
     so: str,
-    background: BackgroundTasks,
     db: Session = Depends(get_db),
     user: User = Depends(require_min_role(UserRole.user)),
 ):
@@ -339,37 +583,14 @@ def send_stock_order(
     if not order:
         raise HTTPException(404, "Serviceorder not found")
 
-    
-
-    set_order_status(
-        db,
-        order,
-        "BESTELD",
-        "Stock order sent to supplier",
-    )
-
-    supplier = (
-        db.query(Supplier)
-        .filter(Supplier.id == order.supplier_id)
-        .first()
-    )
-
     mail = build_stock_order_mail(db, order)
 
-    # async verzenden
-    background.add_task(
-        send_mail,
-        mail["to"],
-        mail["subject"],
-        mail["body_html"],
-        mail.get("pdf_path"),
+    return _queue_order_mail(
+        db, order, "stock_order", mail,
+        "BESTELD", "Stock order sent to supplier",
+        pdf=mail.get("pdf_path"),
     )
 
-    return {
-        "status": "sent",
-        "pdf": mail.get("pdf_path"),
-    }
-
 
 # =====================================
 # Mail Previews
@@ -418,93 +639,56 @@ def preview_order_confirmation_mail(
 @router.post("/{so}/mail/leadtime/send")
 def send_supplier_leadtime_mail(
     so: str,
-    background: BackgroundTasks,
     db: Session = Depends(get_db),
     user: User = Depends(require_min_role(UserRole.user)),
 ):
     mail = build_supplier_leadtime_mail(db, so)
 
-    # async verzenden
-    background.add_task(
-        send_mail,
-        mail["to"],
-        mail["subject"],
-        mail["body_html"],
-    )
-
     order = db.query(ServiceOrder).filter(ServiceOrder.so == so).first()
     if not order:
         raise HTTPException(404, "Serviceorder not found")
 
-    set_order_status(
-        db,
-        order,
-        "LEADTIME_AANGEVRAAGD",
-        "Leadtime mail sent to supplier",
+    return _queue_order_mail(
+        db, order, "leadtime", mail,
+        "LEADTIME_AANGEVRAAGD", "Leadtime mail sent to supplier",
     )
 
-    return {"status": "sent"}
-
 
 @router.post("/{so}/mail/offer/send")
 def send_offer_mail(
     so: str,
-    background: BackgroundTasks,
     db: Session = Depends(get_db),
     user: User = Depends(require_min_role(UserRole.user)),
 ):
     mail = build_offer_mail(db, so)
 
-    background.add_task(
-        send_mail,
-        mail["to"],
-        mail["subject"],
-        mail["body_html"],
-    )
-
     order = db.query(ServiceOrder).filter(ServiceOrder.so == so).first()
     if not order:
         raise HTTPException(404, "Serviceorder not found")
 
-    set_order_status(
-        db,
-        order,
-        "OFFER_VERSTUURD",
-        "Offer mail sent to customer",
+    return _queue_order_mail(
+        db, order, "offer", mail,
+        "OFFER_VERSTUURD", "Offer mail sent to customer",
     )
 
-    return {"status": "sent"}
-
 
 @router.post("/{so}/mail/order-confirmation/send")
 def send_order_confirmation_mail(
     so: str,
-    background: BackgroundTasks,
     db: Session = Depends(get_db),
     user: User = Depends(require_min_role(UserRole.user)),
 ):
     mail = build_order_confirmation_mail(db, so)
 
-    background.add_task(
-        send_mail,
-        mail["to"],
-        mail["subject"],
-        mail["body_html"],
-    )
-
     order = db.query(ServiceOrder).filter(ServiceOrder.so == so).first()
     if not order:
         raise HTTPException(404, "Serviceorder not found")
 
-    set_order_status(
-        db,
-        order,
-        "CONFIRMATIE_VERSTUURD",
-        "Order confirmation sent to customer",
+    return _queue_order_mail(
+        db, order, "order_confirmation", mail,
+        "CONFIRMATIE_VERSTUURD", "Order confirmation sent to customer",
     )
 
-    return {"status": "sent"}
-
 
 @router.get("/{so}/order/pdf")
 def get_stock_order_pdf(
@@ -611,6 +795,7 @@ def mark_offer_sent(
         status="OFFER_VERSTUURD",
         message="Offer mail sent to customer",
     )
+    db.commit()
 
     return {"status": "ok"}
 
@@ -631,6 +816,7 @@ def mark_order_confirmation_sent(
         status="CONFIRMATIE_VERSTUURD",
         message="Order confirmation sent to customer",
     )
+    db.commit()
 
     return {"status": "ok"}
 
@@ -651,21 +837,10 @@ def transition_serviceorder(
     if not order:
         raise HTTPException(404, "Serviceorder not found")
 
-    current = ServiceOrderStatusEnum(order.status)
-    target = payload.to
-
-    allowed = SERVICEORDER_ALLOWED_TRANSITIONS.get(current, [])
-
-    if target not in allowed:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Transition {current} → {target} not allowed"
-        )
-
-    order.status = target
+    transition_order_status(db, order, payload.to)
     db.commit()
 
-    return {"so": so, "status": target}
+    return {"so": so, "status": payload.to}
 
 
 @router.get("/{so}/allowed-statuses")
@@ -692,61 +867,3 @@ def get_allowed_statuses(
         "current": current,
         "allowed": allowed,
     }
-
-
-# ================================
-# t.b.v Merging
-# ================================
-
-@router.get("/for-po-merge", response_model=list[ServiceOrderForPOMergeOut])
-def list_serviceorders_for_po_merge(
-    db: Session = Depends(get_db),
-    user: User = Depends(require_min_role(UserRole.user)),
-):
-    orders = (
-        db.query(ServiceOrder)
-        .options(
-            joinedload(ServiceOrder.customer),
-            joinedload(ServiceOrder.supplier),
-        )
-        .order_by(ServiceOrder.created_at.desc())
-        .all()
-    )
-
-    out: list[ServiceOrderForPOMergeOut] = []
-
-    for o in orders:
-        # ---- klant/leverancier display met fallbacks ----
-        customer_display = (
-            getattr(o, "customer_name_free", None)
-            or (o.customer.name if getattr(o, "customer", None) else None)
-            or "—"
-        )
-        supplier_display = (
-            getattr(o, "supplier_name_free", None)
-            or (o.supplier.name if getattr(o, "supplier", None) else None)
-            or "—"
-        )
-
-        # ---- totaal (jouw pricing geeft key 'total') ----
-        order_total = 0.0
-        try:
-            pricing = calculate_order_totals(db, o)
-            order_total = float(pricing.get("total") or 0.0)
-        except Exception:
-            # niet hard falen op 1 order; alleen totaal blijft 0
-            order_total = 0.0
-
-        out.append(
-            ServiceOrderForPOMergeOut(
-                so=o.so,
-                date=getattr(o, "date", None) or getattr(o, "created_at", None),
-                customer_display=customer_display,
-                supplier_display=supplier_display,
-                order_total=order_total,
-                status=getattr(o, "status", None),
-                can_merge=True,
-            )
-        )
-
-    return out
@@ -9,10 +9,11 @@ from app.schemas.user import UserCreate, UserOut, UserRoleUpdate
 from app.core.security import (
     hash_password,
     require_min_role,
+    principal_cache,
     UserRole,
 )
 from app.core.config import FRONTEND_URL
-from app.services.mail.mail_sender import send_mail
+from app.services.mail.outbox import enqueue_mail
 import secrets
 import os
 
@@ -46,12 +47,13 @@ def create_user(
     user.reset_expires = datetime.utcnow() + timedelta(hours=24)
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
 
     reset_url = f"{FRONTEND_URL}/reset-password/{reset_token}"
 
-    send_mail(
+    # via de outbox: zelfde commit als de gebruiker, verzenden door de mail-worker
+    enqueue_mail(
+        db,
+        "user_invite",
         to=user.email,
         subject="Je account voor het Maconet Portal",
         body_html=f"""
@@ -72,6 +74,8 @@ def create_user(
         """,
     )
 
+    db.commit()
+    db.refresh(user)
 
     return user
 
@@ -104,6 +108,7 @@ def delete_user(
 
     db.delete(user)
     db.commit()
+    principal_cache.invalidate(user.email)
 
     return {
         "status": "deleted",
@@ -141,6 +146,7 @@ def set_user_role(
 
     user.role = data.role
     db.commit()
+    principal_cache.invalidate(user.email)
 
     return {
         "status": "ok",
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 
 class ArticleOut(BaseModel):
     part_no: str
@@ -11,4 +11,16 @@ class ArticleOut(BaseModel):
     price_purchase: Optional[float] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ArticleSearchOut(BaseModel):
+    items: List[ArticleOut]
+    total: int
+    next_cursor: Optional[str] = None
+
+class ArticleLookupIn(BaseModel):
+    part_nos: List[str]
+
+class ArticleLookupOut(BaseModel):
+    items: List[ArticleOut]
+    missing: List[str]
@@ -78,4 +78,13 @@ class CustomerPriceRuleOut(BaseModel):
     price_type: str
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class PriceTypeResolveIn(BaseModel):
+    customer_id: int
+    total: float
+
+class PriceTypeResolveOut(BaseModel):
+    customer_id: int
+    total: float
+    price_type: Optional[str] = None  # None = klant onbekend
@@ -0,0 +1,44 @@
+from enum import Enum
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+
+class ImportJobStatusEnum(str, Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
+
+class ImportJobQueuedOut(BaseModel):
+    status: ImportJobStatusEnum
+    job_id: str
+
+
+class ImportJobOut(BaseModel):
+    id: str
+    kind: str
+    filename: Optional[str]
+    status: ImportJobStatusEnum
+
+    sheet_used: Optional[str]
+    total_rows: Optional[int]
+    rows_processed: int
+    created: int
+    updated: int
+    skipped: int
+    duplicates_in_file: int
+    total_processed: int
+
+    cancel_requested: bool
+    error: Optional[str]
+
+    created_by: Optional[str]
+    created_at: Optional[datetime]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
@@ -1,4 +1,6 @@
 from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional, List
 
 class MailPreviewOut(BaseModel):
     to: str
@@ -11,4 +13,29 @@ class MailSendIn(BaseModel):
     body_html: str
 
 class MailPreviewIn(BaseModel):
-    so: str
\ No newline at end of file
+    so: str
+
+class MailOutboxOut(BaseModel):
+    id: int
+    mail_type: str
+    serviceorder_id: Optional[int]
+    to: str
+    subject: str
+    status: str
+    attempts: int
+    next_attempt_at: datetime
+    last_error: Optional[str]
+    provider_message_id: Optional[str]
+    created_at: Optional[datetime]
+    sent_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+class MailOutboxRetryIn(BaseModel):
+    ids: Optional[List[int]] = None  # leeg = alle dead-letter mails
+
+
+class MailOutboxRetryOut(BaseModel):
+    requeued: int
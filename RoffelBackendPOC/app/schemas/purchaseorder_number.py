@@ -71,10 +71,36 @@ class PurchaseOrderNumberReserveOut(BaseModel):
 class PurchaseOrderServiceOrdersUpdate(BaseModel):
     so_numbers: List[str]
 
-class PurchaseOrderServiceOrdersUpdate(BaseModel):
-    so_numbers: List[str]
+
+class PurchaseOrderServiceOrdersDiffOut(BaseModel):
+    po_number: str
+    added: List[str] = []
+    removed: List[str] = []
+    order_total: float
 
 
 class PurchaseOrderPlaceRequest(BaseModel):
     force: bool = False
 
+
+class CombinationOrderOut(BaseModel):
+    so: str
+    order_total: float
+    waiting_since: datetime
+
+
+class CombinationPurchaseOrderOut(BaseModel):
+    order_total: float
+    overshoot: float  # boven het minimum
+    serviceorders: List[CombinationOrderOut]
+
+
+class SupplierCombinationOut(BaseModel):
+    supplier_id: Optional[int]
+    supplier_name: Optional[str]
+    min_order_amount: float
+    purchase_orders: List[CombinationPurchaseOrderOut] = []
+    waiting: List[CombinationOrderOut] = []
+    waiting_total: float
+    missing: float  # nog nodig voordat de wachtende orders een PO vormen
+
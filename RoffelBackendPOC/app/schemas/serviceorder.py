@@ -1,10 +1,12 @@
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List, Dict
 from pydantic import BaseModel
 from enum import Enum
 
 from app.schemas.supplier import SupplierOut
 from app.schemas.customer import CustomerOut
+from app.schemas.serviceorder_item import ServiceOrderItemOut
+from app.schemas.serviceorder_log import ServiceOrderLogOut
 
 class ServiceOrderStatusEnum(str, Enum):
     OPEN = "OPEN"
@@ -71,5 +73,102 @@ class ServiceOrderOverview(BaseModel):
     class Config:
         from_attributes = True
 
+# ==========================
+# Overzicht (plat + lookup-tabellen)
+# ==========================
+class ServiceOrderOverviewRow(BaseModel):
+    id: int
+    so: str
+    supplier_id: int | None
+    customer_id: int | None
+    customer_ref: str | None
+    po: str | None
+    status: str | None
+    price_type: str | None
+    employee: str | None
+    pricing_total: float | None = None
+    created_at: datetime | None
+
+class OverviewSupplier(BaseModel):
+    id: int
+    name: str
+
+class OverviewCustomer(BaseModel):
+    id: int
+    name: str
+    city: str | None = None
+
+class ServiceOrderOverviewPage(BaseModel):
+    items: List[ServiceOrderOverviewRow]
+    suppliers: Dict[int, OverviewSupplier]
+    customers: Dict[int, OverviewCustomer]
+    next_cursor: Optional[str] = None
+
+# ==========================
+# Detail (/{so}/full)
+# ==========================
+class ServiceOrderDetailOut(ServiceOrderIn):
+    id: int
+    created_at: datetime | None = None
+    items_version: int = 0
+    pricing_total: float | None = None
+    pricing_price_type: str | None = None
+    pricing_version: int = 0
+
+    class Config:
+        from_attributes = True
+
+class PricedLineOut(BaseModel):
+    item_id: int
+    part_no: str
+    description: str | None = None
+    qty: int
+    price_each: float
+    line_total: float
+
+class ServiceOrderPricingOut(BaseModel):
+    price_type: str
+    total: float
+    items: List[PricedLineOut]
+
+class AllowedTransitionsOut(BaseModel):
+    current: str | None
+    allowed: List[ServiceOrderStatusEnum]
+
+class ServiceOrderLogPage(BaseModel):
+    items: List[ServiceOrderLogOut]
+    next_before: Optional[int] = None
+
+class ServiceOrderFullOut(BaseModel):
+    so: str
+    order: Optional[ServiceOrderDetailOut] = None
+    items: Optional[List[ServiceOrderItemOut]] = None
+    pricing: Optional[ServiceOrderPricingOut] = None
+    log: Optional[ServiceOrderLogPage] = None
+    transitions: Optional[AllowedTransitionsOut] = None
+
+# ----------------------
+# Dashboard-tellers (GET /serviceorders/stats)
+# ----------------------
+class ServiceOrderStatsCounter(BaseModel):
+    orders: int
+    open_lines: int
+
+class ServiceOrderStatsOut(BaseModel):
+    totals: ServiceOrderStatsCounter
+    by_status: Dict[str, ServiceOrderStatsCounter]
+    by_supplier: Dict[int, Dict[str, ServiceOrderStatsCounter]]
+    by_employee: Dict[str, Dict[str, ServiceOrderStatsCounter]]
+
+class ServiceOrderStatsDifference(BaseModel):
+    status: str
+    supplier_id: int
+    employee: str
+    expected: ServiceOrderStatsCounter
+    actual: ServiceOrderStatsCounter
+
+class ServiceOrderStatsRebuildOut(BaseModel):
+    differences: List[ServiceOrderStatsDifference]
+
 class ServiceOrderStatusTransition(BaseModel):
     to: ServiceOrderStatusEnum
\ No newline at end of file
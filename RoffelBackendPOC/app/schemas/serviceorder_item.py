@@ -1,6 +1,6 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel
+from typing import Optional, List
+from pydantic import BaseModel, Field
 
 class ServiceOrderItemIn(BaseModel):
     part_no: str
@@ -16,6 +16,7 @@ class ServiceOrderItemIn(BaseModel):
     leadtime: Optional[str] = None
     bestellen: bool = False
     ontvangen: Optional[bool] = False
+    qty_received: int = Field(0, ge=0)  # NOT NULL in de database
     
 class ServiceOrderItemOut(BaseModel):
     id: int
@@ -33,7 +34,80 @@ class ServiceOrderItemOut(BaseModel):
     bestellen: bool
 
     ontvangen: bool
+    qty_received: Optional[int] = 0
     received_at: Optional[datetime]
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# ==========================
+# PATCH (diff op item-id)
+# ==========================
+class ServiceOrderItemChange(BaseModel):
+    id: int
+    part_no: Optional[str] = None
+    description: Optional[str] = None
+    qty: Optional[int] = None
+
+    list_price: Optional[float] = None
+    price_bruto: Optional[float] = None
+    price_wvk: Optional[float] = None
+    price_edmac: Optional[float] = None
+    price_purchase: Optional[float] = None
+
+    leadtime: Optional[str] = None
+    bestellen: Optional[bool] = None
+    ontvangen: Optional[bool] = None
+
+class ServiceOrderItemsPatch(BaseModel):
+    added: List[ServiceOrderItemIn] = []
+    changed: List[ServiceOrderItemChange] = []
+    removed: List[int] = []
+
+    # items_version waarop de client zijn wijzigingen baseert (optioneel)
+    expected_version: Optional[int] = None
+
+class ServiceOrderItemsPatchOut(BaseModel):
+    items_version: int
+    added: List[ServiceOrderItemOut]
+    changed: List[int]
+    removed: List[int]
+
+
+# ==========================
+# Ontvangst (bulk)
+# ==========================
+class ItemReceiveLine(BaseModel):
+    item_id: int
+    qty: Optional[int] = None   # leeg = alles wat nog openstaat
+
+class ItemsReceiveIn(BaseModel):
+    lines: List[ItemReceiveLine]
+
+class DeliveryReceiveLine(BaseModel):
+    part_no: str
+    qty: int
+
+class DeliveryReceiveIn(BaseModel):
+    supplier_id: Optional[int] = None
+    lines: List[DeliveryReceiveLine]
+
+class ReceivedLineOut(BaseModel):
+    so: str
+    item_id: int
+    part_no: str
+    qty: int
+
+class ReceivedOrderOut(BaseModel):
+    so: str
+    status: Optional[str]
+    remaining: int
+
+class UnmatchedLineOut(BaseModel):
+    part_no: str
+    qty: int
+
+class ReceiveResultOut(BaseModel):
+    received: List[ReceivedLineOut]
+    orders: List[ReceivedOrderOut]
+    unmatched: List[UnmatchedLineOut] = []
@@ -12,6 +12,7 @@ class SupplierIn(BaseModel):
     supplier_contact: Optional[str] = None
     supplier_contact_mail: Optional[str] = None
     is_active: bool = True
+    min_order_amount: Optional[float] = None
 
 
 # =========================
@@ -22,6 +23,7 @@ class SupplierUpdate(BaseModel):
     supplier_contact: Optional[str] = None
     supplier_contact_mail: Optional[str] = None
     is_active: Optional[bool] = None
+    min_order_amount: Optional[float] = None
 
 
 # =========================
@@ -34,6 +36,7 @@ class SupplierOut(BaseModel):
     supplier_contact: Optional[str]
     supplier_contact_mail: Optional[str]
     is_active: bool
+    min_order_amount: Optional[float] = None
     created_at: datetime
 
     class Config:
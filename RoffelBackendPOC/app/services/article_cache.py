@@ -0,0 +1,121 @@
+# app/services/article_cache.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.orm import Session
+
+from app.models.article import Article
+from app.services.article_search import ARTICLE_FIELDS, catalogue_version
+
+# maximaal aantal part_no's in het geheugen (LRU)
+ARTICLE_CACHE_SIZE = int(os.getenv("ARTICLE_CACHE_SIZE", "20000"))
+
+# hoe vaak (sec) we controleren of een andere worker een import heeft gedaan
+CACHE_CHECK_INTERVAL = int(os.getenv("ARTICLE_INDEX_CHECK_INTERVAL", "30"))
+
+# aantal part_no's per IN-query
+LOOKUP_CHUNK_SIZE = 500
+
+# gecachte "bestaat niet" (zodat herhaald plakken van onbekende codes ook snel is)
+_MISSING = object()
+
+
+class ArticleCache:
+    """
+    Read-through cache part_no -> ArticleOut-velden.
+
+    - wordt door de Duallist-importer per chunk geïnvalideerd (deze worker)
+    - andere workers legen de cache zodra de catalogusversie wijzigt
+    """
+
+    def __init__(self, size: int = ARTICLE_CACHE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, object] = OrderedDict()
+        self._version = None
+        self._checked_at = 0.0
+
+    def _check_version(self, db: Session):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < CACHE_CHECK_INTERVAL:
+            return
+
+        version = catalogue_version(db)
+        with self._lock:
+            self._checked_at = now
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+
+    def get_many(self, db: Session, part_nos: list[str]) -> dict[str, dict]:
+        """
+        Artikelen bij `part_nos`; ontbrekende codes komen niet in het resultaat.
+        Cache-missers worden in één IN-query (per LOOKUP_CHUNK_SIZE) opgehaald.
+        """
+        self._check_version(db)
+
+        found: dict[str, dict] = {}
+        todo: list[str] = []
+
+        with self._lock:
+            for part_no in part_nos:
+                entry = self._entries.get(part_no)
+                if entry is None:
+                    todo.append(part_no)
+                    continue
+                self._entries.move_to_end(part_no)
+                if entry is not _MISSING:
+                    found[part_no] = entry
+
+        if not todo:
+            return found
+
+        loaded: dict[str, dict] = {}
+        for i in range(0, len(todo), LOOKUP_CHUNK_SIZE):
+            rows = (
+                db.query(*[getattr(Article, f) for f in ARTICLE_FIELDS])
+                .filter(Article.part_no.in_(todo[i:i + LOOKUP_CHUNK_SIZE]))
+                .all()
+            )
+            for r in rows:
+                loaded[r.part_no] = dict(zip(ARTICLE_FIELDS, r))
+
+        with self._lock:
+            for part_no in todo:
+                self._entries[part_no] = loaded.get(part_no, _MISSING)
+                self._entries.move_to_end(part_no)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+        found.update(loaded)
+        return found
+
+    def invalidate(self, part_nos=None):
+        """
+        Vergeet de opgegeven part_no's, of alles als `part_nos` None is.
+        """
+        with self._lock:
+            if part_nos is None:
+                self._entries.clear()
+                return
+            for part_no in part_nos:
+                self._entries.pop(part_no, None)
+
+
+article_cache = ArticleCache()
+
+
+def lookup_articles(db: Session, part_nos: list[str]) -> tuple[list[dict], list[str]]:
+    """
+    (gevonden artikelen, ontbrekende part_no's), in de volgorde van de aanvraag.
+    Lege en dubbele codes worden genegeerd.
+    """
+    wanted = list(dict.fromkeys(p.strip() for p in part_nos if p and p.strip()))
+    found = article_cache.get_many(db, wanted)
+
+    items = [found[p] for p in wanted if p in found]
+    missing = [p for p in wanted if p not in found]
+    return items, missing
@@ -0,0 +1,376 @@
+# app/services/article_search.py
+
+import base64
+import hashlib
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.article import Article
+from app.models.import_job import ImportJob
+
+log = logging.getLogger(__name__)
+
+# hoe vaak (sec) we controleren of een andere worker een import heeft gedaan
+INDEX_CHECK_INTERVAL = int(os.getenv("ARTICLE_INDEX_CHECK_INTERVAL", "30"))
+
+# maximaal aantal kandidaten per zoekstap (houdt brede zoekopdrachten snel)
+MAX_CANDIDATES = 5000
+
+# velden die in het geheugen worden vastgehouden (= ArticleOut)
+ARTICLE_FIELDS = (
+    "part_no",
+    "description",
+    "list_price",
+    "price_bruto",
+    "price_wvk",
+    "price_edmac",
+    "price_purchase",
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _compact(value: str) -> str:
+    """ "02250262-074" → "02250262074" (zoeken zonder streepjes/spaties) """
+    return "".join(_TOKEN_RE.findall(value.lower()))
+
+
+def catalogue_version(db: Session) -> tuple:
+    """
+    Goedkope versie van de catalogus: wijzigt na elke (ook afgebroken) import.
+    """
+    last_import = db.query(func.max(ImportJob.finished_at)).scalar()
+    count = db.query(func.count(Article.id)).scalar()
+    return (count, last_import)
+
+
+def _encode_cursor(version: tuple, score: float, part_no: str) -> str:
+    """
+    Opaque cursor: laatste (score, part_no) van de pagina + de indexversie.
+    """
+    tag = hashlib.sha1(repr(version).encode("utf-8")).hexdigest()[:12]
+    raw = json.dumps([tag, score, part_no])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str, version: tuple) -> tuple[float, str]:
+    try:
+        tag, score, part_no = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        score = float(score)
+        part_no = str(part_no)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+    if tag != hashlib.sha1(repr(version).encode("utf-8")).hexdigest()[:12]:
+        # catalogus is intussen opnieuw geïmporteerd: de volgorde klopt niet meer
+        raise ValueError("Stale cursor, search again")
+
+    return score, part_no
+
+
+def _trigrams(value: str) -> set[str]:
+    value = f"  {value} "
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _prefix_range(sorted_keys: list, prefix: str, cap: int = MAX_CANDIDATES):
+    """
+    Alle (key, idx) uit een gesorteerde lijst waarvan key met prefix begint.
+    """
+    pos = bisect_left(sorted_keys, (prefix,))
+    out = []
+    while pos < len(sorted_keys) and len(out) < cap:
+        key, idx = sorted_keys[pos]
+        if not key.startswith(prefix):
+            break
+        out.append((key, idx))
+        pos += 1
+    return out
+
+
+@dataclass(frozen=True)
+class _IndexSnapshot:
+    """
+    Eén opgebouwde versie van de index; wordt nooit gewijzigd, alleen
+    in zijn geheel vervangen (zoeken leest dus zonder lock).
+    """
+    version: Optional[tuple] = None
+    rows: list = field(default_factory=list)
+    part_keys: list = field(default_factory=list)
+    compact_keys: list = field(default_factory=list)
+    compact_parts: list = field(default_factory=list)
+    token_postings: dict = field(default_factory=dict)
+    tokens_sorted: list = field(default_factory=list)
+    vocab: list = field(default_factory=list)
+    part_trigrams: dict = field(default_factory=dict)
+    token_trigrams: dict = field(default_factory=dict)
+
+
+class ArticleIndex:
+    """
+    In-memory zoekindex over de artikelcatalogus.
+
+    - prefix op part_no (ook zonder leestekens)
+    - token-zoeken op omschrijving (laatste token als prefix)
+    - fuzzy (trigram) op part_no en omschrijvingstokens als fallback
+
+    Zoeken leest de huidige snapshot zonder lock. Opbouwen gebeurt door
+    één thread tegelijk; andere requests zoeken intussen in de oude snapshot.
+    """
+
+    def __init__(self):
+        self._rebuild_lock = threading.Lock()
+        self._snapshot = _IndexSnapshot()
+        self._checked_at = 0.0
+
+    @property
+    def rows(self) -> list[dict]:
+        return self._snapshot.rows
+
+    # ----------------------
+    # Opbouw
+    # ----------------------
+    def rebuild(self, db: Session):
+        """
+        Bouw de index opnieuw op (wacht op een lopende opbouw).
+        """
+        with self._rebuild_lock:
+            self._rebuild(db)
+
+    def _rebuild(self, db: Session):
+        started = time.perf_counter()
+        version = catalogue_version(db)
+
+        rows = [
+            dict(zip(ARTICLE_FIELDS, r))
+            for r in (
+                db.query(*[getattr(Article, f) for f in ARTICLE_FIELDS])
+                .filter(Article.active.isnot(False))
+                .order_by(Article.part_no.asc())
+                .all()
+            )
+        ]
+
+        part_keys = []
+        compact_keys = []
+        compact_parts = []
+        token_postings: dict[str, list[int]] = {}
+        part_trigrams: dict[str, list[int]] = {}
+
+        for idx, row in enumerate(rows):
+            part = row["part_no"].lower()
+            compact = _compact(part)
+
+            part_keys.append((part, idx))
+            compact_keys.append((compact, idx))
+            compact_parts.append(compact)
+
+            for tri in _trigrams(compact):
+                part_trigrams.setdefault(tri, []).append(idx)
+
+            for token in set(_TOKEN_RE.findall((row["description"] or "").lower())):
+                token_postings.setdefault(token, []).append(idx)
+
+        vocab = sorted(token_postings)
+        token_trigrams: dict[str, list[int]] = {}
+        for tid, token in enumerate(vocab):
+            for tri in _trigrams(token):
+                token_trigrams.setdefault(tri, []).append(tid)
+
+        part_keys.sort()
+        compact_keys.sort()
+
+        # één referentie-toewijzing: zoekers zien de oude of de nieuwe index
+        self._snapshot = _IndexSnapshot(
+            version=version,
+            rows=rows,
+            part_keys=part_keys,
+            compact_keys=compact_keys,
+            compact_parts=compact_parts,
+            token_postings=token_postings,
+            tokens_sorted=[(t, i) for i, t in enumerate(vocab)],
+            vocab=vocab,
+            part_trigrams=part_trigrams,
+            token_trigrams=token_trigrams,
+        )
+        self._checked_at = time.monotonic()
+
+        log.info(
+            "Artikelindex opgebouwd: %s artikelen in %.2fs",
+            len(rows),
+            time.perf_counter() - started,
+        )
+
+    def ensure_fresh(self, db: Session):
+        """
+        Lazy opbouw + periodieke check of een (andere worker) heeft geïmporteerd.
+        """
+        now = time.monotonic()
+        built = self._snapshot.version is not None
+        if built and now - self._checked_at < INDEX_CHECK_INTERVAL:
+            return
+
+        # eerste opbouw: wachten; daarna: loopt er al een opbouw, dan de oude index gebruiken
+        if not self._rebuild_lock.acquire(blocking=not built):
+            return
+        try:
+            if not built and self._snapshot.version is not None:
+                return  # intussen door een ander request opgebouwd
+            self._checked_at = now
+            version = self._snapshot.version
+            if version is None or catalogue_version(db) != version:
+                self._rebuild(db)
+        finally:
+            self._rebuild_lock.release()
+
+    # ----------------------
+    # Zoeken
+    # ----------------------
+    def _fuzzy(self, value: str, trigram_index: dict, key_of, min_sim: float) -> dict[int, float]:
+        """
+        Trigram-gelijkenis (Dice) van `value` t.o.v. alle keys in de index.
+        """
+        q_tris = _trigrams(value)
+        counts: dict[int, int] = {}
+        for tri in q_tris:
+            posting = trigram_index.get(tri, ())
+            if len(posting) > MAX_CANDIDATES * 4:
+                continue  # te algemeen (bv. "000"), zegt weinig
+            for i in posting:
+                counts[i] = counts.get(i, 0) + 1
+
+        need = max(1, len(q_tris) // 2)
+        out = {}
+        for i, shared in counts.items():
+            if shared < need:
+                continue
+            sim = 2 * shared / (len(q_tris) + len(_trigrams(key_of(i))))
+            if sim >= min_sim:
+                out[i] = sim
+        return out
+
+    def _infix(self, value: str, trigram_index: dict, keys: list[str]) -> list[int]:
+        """
+        Artikelen waarvan de key `value` ergens bevat (via de zeldzaamste trigram).
+        """
+        tris = [value[i:i + 3] for i in range(len(value) - 2)]
+        if not tris:
+            return []
+        rarest = min(tris, key=lambda t: len(trigram_index.get(t, ())))
+        return [i for i in trigram_index.get(rarest, ()) if value in keys[i]][:MAX_CANDIDATES]
+
+    def _token_ids(self, snap: _IndexSnapshot, token: str, is_last: bool) -> tuple[set[int], bool]:
+        """
+        Artikelen bij één zoekterm: exact, prefix (laatste term) of fuzzy.
+        Geeft (ids, fuzzy_gebruikt) terug.
+        """
+        postings = snap.token_postings
+        vocab = snap.vocab
+
+        ids: set[int] = set(postings.get(token, ()))
+        if is_last:
+            for _, tid in _prefix_range(snap.tokens_sorted, token, cap=200):
+                ids.update(postings[vocab[tid]])
+
+        if ids or len(token) < 4:
+            return ids, False
+
+        for tid in self._fuzzy(token, snap.token_trigrams, vocab.__getitem__, min_sim=0.6):
+            ids.update(postings[vocab[tid]])
+        return ids, True
+
+    def search(self, q: str, limit: int, cursor: Optional[str] = None) -> tuple[list[dict], int, Optional[str]]:
+        """
+        Eén pagina treffers op relevantie (hoogste eerst), het totaal aantal
+        treffers en de cursor van de volgende pagina (None = laatste pagina).
+        ValueError bij een ongeldige of verouderde cursor.
+        """
+        # één snapshot voor de hele zoekopdracht (geen lock nodig)
+        snap = self._snapshot
+        after = _decode_cursor(cursor, snap.version) if cursor else None
+
+        q = (q or "").strip().lower()
+        if not q:
+            return [], 0, None
+
+        rows = snap.rows
+        part_keys = snap.part_keys
+        compact_keys = snap.compact_keys
+        compact_parts = snap.compact_parts
+        part_trigrams = snap.part_trigrams
+
+        scores: dict[int, float] = {}
+
+        def bump(idx: int, score: float):
+            if score > scores.get(idx, 0):
+                scores[idx] = score
+
+        # 1️⃣ part_no prefix (exact = hoogst), ook zonder leestekens
+        for key, idx in _prefix_range(part_keys, q):
+            bump(idx, 1000 if key == q else 800 - min(len(key) - len(q), 100))
+
+        q_compact = _compact(q)
+        if q_compact:
+            for key, idx in _prefix_range(compact_keys, q_compact):
+                bump(idx, 950 if key == q_compact else 700 - min(len(key) - len(q_compact), 100))
+
+        # 2️⃣ part_no bevat de zoekterm ergens
+        if len(q_compact) >= 4:
+            for idx in self._infix(q_compact, part_trigrams, compact_parts):
+                bump(idx, 600 - min(len(compact_parts[idx]) - len(q_compact), 100))
+
+        # 3️⃣ omschrijving: alle termen moeten matchen (laatste als prefix, anders fuzzy)
+        q_tokens = _TOKEN_RE.findall(q)
+        matched = None
+        used_fuzzy = False
+        for n, token in enumerate(q_tokens):
+            ids, fuzzy = self._token_ids(snap, token, n == len(q_tokens) - 1)
+            used_fuzzy = used_fuzzy or fuzzy
+            matched = ids if matched is None else matched & ids
+            if not matched:
+                break
+
+        for idx in matched or ():
+            bump(idx, (350 if used_fuzzy else 500) + 10 * len(q_tokens))
+
+        # 4️⃣ fuzzy op part_no als niets anders iets opleverde (typefouten)
+        if not scores and len(q_compact) >= 4:
+            for idx, sim in self._fuzzy(q_compact, part_trigrams, compact_parts.__getitem__, min_sim=0.6).items():
+                bump(idx, 300 * sim)
+
+        # alleen de pagina selecteren, niet alle treffers sorteren
+        ranked = ((-score, rows[idx]["part_no"], idx) for idx, score in scores.items())
+        if after is not None:
+            last = (-after[0], after[1])
+            ranked = (r for r in ranked if r[:2] > last)
+        page = heapq.nsmallest(limit + 1, ranked)
+
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            neg_score, part_no, _ = page[-1]
+            next_cursor = _encode_cursor(snap.version, -neg_score, part_no)
+
+        return [rows[idx] for _, _, idx in page], len(scores), next_cursor
+
+
+article_index = ArticleIndex()
+
+
+def search_articles(db: Session, q: str, limit: int, cursor: Optional[str] = None) -> tuple[list[dict], int, Optional[str]]:
+    """
+    Eén pagina zoekresultaten, totaal aantal treffers en de volgende cursor.
+    """
+    article_index.ensure_fresh(db)
+    return article_index.search(q, limit, cursor)
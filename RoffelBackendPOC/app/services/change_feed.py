@@ -0,0 +1,419 @@
+# app/services/change_feed.py
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, engine
+from app.models.change_event import ChangeEvent
+
+log = logging.getLogger(__name__)
+
+# welke backend de events tussen workers verdeelt (zie BACKENDS):
+# "memory" = alleen dit proces (één uvicorn-worker, tests);
+# "database" = via de tabel change_events, voor meerdere workers en
+# voor events uit aparte processen (bv. mail_worker.py)
+CHANGE_FEED_BACKEND = os.getenv("CHANGE_FEED_BACKEND", "memory")
+# aantal recente events dat bewaard wordt om te hervatten (Last-Event-ID)
+CHANGE_FEED_BUFFER = int(os.getenv("CHANGE_FEED_BUFFER", "5000"))
+# maximaal aantal events dat per abonnee mag wachten (trage client → opnieuw verbinden)
+CHANGE_FEED_QUEUE = int(os.getenv("CHANGE_FEED_QUEUE", "500"))
+# keepalive (sec) zodat proxies een stille verbinding niet afsluiten
+CHANGE_FEED_HEARTBEAT = float(os.getenv("CHANGE_FEED_HEARTBEAT", "15"))
+# database-backend: hoe vaak (sec) een worker nieuwe events ophaalt
+CHANGE_FEED_POLL_INTERVAL = float(os.getenv("CHANGE_FEED_POLL_INTERVAL", "0.5"))
+# database-backend: hoe lang (sec) op een ontbrekend id wordt gewacht (een
+# transactie die nog niet zichtbaar is) voordat het als gat wordt overgeslagen
+CHANGE_FEED_GAP_WAIT = float(os.getenv("CHANGE_FEED_GAP_WAIT", "2"))
+
+# sleutel in Session.info voor events die op de commit wachten
+_PENDING_KEY = "change_feed_pending"
+
+# signaal aan een abonnee dat de stream moet stoppen (overloop / shutdown)
+_CLOSE = object()
+
+
+# ----------------------
+# Backends
+# ----------------------
+class ChangeFeedBackend:
+    """
+    Verdeelt events over alle workers en bewaart een buffer om te hervatten.
+
+    - publish() kent oplopende ids toe en levert (ook in andere workers)
+      af via de `deliver`-callback uit start()
+    - replay(after_id) geeft de gebufferde events na `after_id`, of None
+      als `after_id` al uit de buffer is (client moet alles herladen)
+
+    start() wordt pas aangeroepen bij de eerste abonnee; een proces dat
+    alleen publiceert (mail_worker.py) luistert dus niet mee.
+    """
+
+    def start(self, deliver: Callable[[dict], None]):
+        raise NotImplementedError
+
+    def publish(self, events: list[dict]):
+        raise NotImplementedError
+
+    def replay(self, after_id: int) -> Optional[list[dict]]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InMemoryBackend(ChangeFeedBackend):
+    """
+    Alles binnen dit proces: geschikt voor één worker en voor tests.
+    Ids zijn per proces; bij meerdere workers (of events uit
+    mail_worker.py) CHANGE_FEED_BACKEND=database gebruiken.
+    """
+
+    def __init__(self, buffer_size: int = CHANGE_FEED_BUFFER):
+        self._lock = threading.Lock()
+        self._buffer: deque[dict] = deque(maxlen=buffer_size)
+        self._last_id = 0
+        self._deliver: Optional[Callable[[dict], None]] = None
+
+    def start(self, deliver: Callable[[dict], None]):
+        self._deliver = deliver
+
+    def publish(self, events: list[dict]):
+        # afleveren binnen de lock: abonnees krijgen de ids in volgorde
+        # (stream() slaat een lager id na een hoger over)
+        with self._lock:
+            for e in events:
+                self._last_id += 1
+                e = {"id": self._last_id, **e}
+                self._buffer.append(e)
+                if self._deliver is not None:
+                    self._deliver(e)
+
+    def replay(self, after_id: int) -> Optional[list[dict]]:
+        with self._lock:
+            if after_id == self._last_id:
+                return []
+            # id uit een eerdere run (proces herstart): alles herladen
+            if after_id > self._last_id:
+                return None
+            oldest = self._buffer[0]["id"] if self._buffer else self._last_id + 1
+            # events tussen after_id en de buffer zijn weg
+            if after_id < oldest - 1:
+                return None
+            return [e for e in self._buffer if e["id"] > after_id]
+
+
+class DatabaseBackend(ChangeFeedBackend):
+    """
+    Gedeeld via de tabel change_events: publish() schrijft (eigen korte
+    transactie, na de commit van de request), elke luisterende worker haalt
+    elke CHANGE_FEED_POLL_INTERVAL de nieuwe rijen op. Het id uit de
+    database is het event-id, dus Last-Event-ID werkt over workers heen.
+
+    Ids worden strikt oplopend afgeleverd. Een ontbrekend id (een insert
+    van een andere worker die nog niet zichtbaar is) wordt maximaal
+    CHANGE_FEED_GAP_WAIT seconden afgewacht. De tabel houdt de laatste
+    `buffer_size` events.
+    """
+
+    def __init__(self, buffer_size: int = CHANGE_FEED_BUFFER, poll_interval: float = CHANGE_FEED_POLL_INTERVAL):
+        self.buffer_size = buffer_size
+        self.poll_interval = poll_interval
+        self._deliver: Optional[Callable[[dict], None]] = None
+        self._last_id = 0  # hoogste afgeleverde id in dit proces
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, deliver: Callable[[dict], None]):
+        self._deliver = deliver
+        with engine.connect() as conn:
+            self._last_id = conn.execute(select(func.max(ChangeEvent.id))).scalar() or 0
+        self._thread = threading.Thread(target=self._run, name="change-feed-poll", daemon=True)
+        self._thread.start()
+
+    def publish(self, events: list[dict]):
+        now = datetime.utcnow()
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    insert(ChangeEvent),
+                    [{"payload": json.dumps(e, default=str), "created_at": now} for e in events],
+                )
+        except Exception:
+            # de request is al gecommit; een gemist event kost hooguit een herlaadactie
+            log.exception("Change feed: events niet opgeslagen")
+
+    def _run(self):
+        polls = 0
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+                polls += 1
+                if polls % 120 == 0:
+                    self._prune()
+            except Exception:
+                log.exception("Change feed: ophalen mislukt")
+
+    def poll(self):
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(ChangeEvent.id, ChangeEvent.payload, ChangeEvent.created_at)
+                .where(ChangeEvent.id > self._last_id)
+                .order_by(ChangeEvent.id.asc())
+                .limit(1000)
+            ).all()
+
+        gap_deadline = datetime.utcnow() - timedelta(seconds=CHANGE_FEED_GAP_WAIT)
+        for row in rows:
+            if row.id != self._last_id + 1 and row.created_at > gap_deadline:
+                break  # eerder id nog niet zichtbaar: volgende ronde opnieuw
+            self._last_id = row.id
+            if self._deliver is not None:
+                self._deliver({"id": row.id, **json.loads(row.payload)})
+
+    def _prune(self):
+        with engine.begin() as conn:
+            conn.execute(delete(ChangeEvent).where(ChangeEvent.id <= self._last_id - self.buffer_size))
+
+    def replay(self, after_id: int) -> Optional[list[dict]]:
+        # alleen tot wat deze worker al live heeft afgeleverd; de rest volgt live
+        upto = self._last_id
+        with engine.connect() as conn:
+            oldest, newest = conn.execute(
+                select(func.min(ChangeEvent.id), func.max(ChangeEvent.id))
+            ).one()
+            if newest is None or after_id > newest:
+                return [] if after_id == 0 else None
+            if after_id < oldest - 1:
+                return None
+            rows = conn.execute(
+                select(ChangeEvent.id, ChangeEvent.payload)
+                .where(ChangeEvent.id > after_id, ChangeEvent.id <= upto)
+                .order_by(ChangeEvent.id.asc())
+            ).all()
+        return [{"id": r.id, **json.loads(r.payload)} for r in rows]
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+# naam → factory; een andere gedeelde backend (bv. Redis) registreert zich hier
+BACKENDS: dict[str, Callable[[], ChangeFeedBackend]] = {
+    "memory": InMemoryBackend,
+    "database": DatabaseBackend,
+}
+
+
+def register_backend(name: str, factory: Callable[[], ChangeFeedBackend]):
+    BACKENDS[name] = factory
+
+
+# ----------------------
+# Broker (abonnees in dit proces)
+# ----------------------
+class Subscription:
+    """
+    Eén SSE/WebSocket-verbinding. Leeft in de event loop van de server;
+    events komen (vanuit request-threads) binnen via call_soon_threadsafe.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        so: Optional[str] = None,
+        supplier_id: Optional[int] = None,
+        maxsize: int = CHANGE_FEED_QUEUE,
+    ):
+        self.loop = loop
+        self.so = so
+        self.supplier_id = supplier_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.closed = False
+
+    def matches(self, e: dict) -> bool:
+        if self.so is not None and e.get("so") != self.so:
+            return False
+        if self.supplier_id is not None and e.get("supplier_id") != self.supplier_id:
+            return False
+        return True
+
+    def _put(self, item):
+        # draait in de event loop
+        if self.closed:
+            return
+        if item is _CLOSE:
+            self.closed = True
+        else:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except asyncio.QueueFull:
+                # te traag: stoppen, de client hervat met Last-Event-ID
+                self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_CLOSE)
+
+    def offer(self, item):
+        try:
+            self.loop.call_soon_threadsafe(self._put, item)
+        except RuntimeError:  # event loop is al gesloten
+            self.closed = True
+
+
+class ChangeFeedBroker:
+    def __init__(self, backend: ChangeFeedBackend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._subscribers: set[Subscription] = set()
+        self._started = False
+
+    def _deliver(self, e: dict):
+        with self._lock:
+            subscribers = [s for s in self._subscribers if s.matches(e)]
+        for s in subscribers:
+            s.offer(e)
+
+    def publish(self, events: list[dict]):
+        if events:
+            self.backend.publish(events)
+
+    def subscribe(self, sub: Subscription):
+        with self._lock:
+            self._subscribers.add(sub)
+            if not self._started:
+                # eerste abonnee: pas nu gaan luisteren
+                self._started = True
+                self.backend.start(self._deliver)
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def close(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for s in subscribers:
+            s.offer(_CLOSE)
+        self.backend.close()
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    async def stream(
+        self,
+        so: Optional[str] = None,
+        supplier_id: Optional[int] = None,
+        last_event_id: Optional[int] = None,
+        heartbeat: float = CHANGE_FEED_HEARTBEAT,
+    ):
+        """
+        Async iterator over events voor één client.
+
+        Levert dicts (events), None als keepalive, en {"type": "reset"} als
+        `last_event_id` te oud is om te hervatten (client herlaadt alles).
+        """
+        sub = Subscription(asyncio.get_running_loop(), so, supplier_id)
+        # eerst abonneren, dan de buffer lezen: zo valt er niets tussen
+        self.subscribe(sub)
+        try:
+            sent = last_event_id or 0
+            if last_event_id is not None:
+                # database-backend: query niet in de event loop
+                missed = await asyncio.to_thread(self.backend.replay, last_event_id)
+                if missed is None:
+                    sent = 0
+                    yield {"type": "reset"}
+                else:
+                    for e in missed:
+                        if sub.matches(e):
+                            yield e
+                        sent = max(sent, e["id"])
+
+            while True:
+                try:
+                    item = await asyncio.wait_for(sub.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if item is _CLOSE:
+                    return
+                # al meegestuurd vanuit de buffer
+                if item["id"] <= sent:
+                    continue
+                sent = item["id"]
+                yield item
+        finally:
+            self.unsubscribe(sub)
+
+
+def _make_backend() -> ChangeFeedBackend:
+    factory = BACKENDS.get(CHANGE_FEED_BACKEND)
+    if factory is None:
+        raise RuntimeError(f"Unknown CHANGE_FEED_BACKEND: {CHANGE_FEED_BACKEND}")
+    return factory()
+
+
+change_feed = ChangeFeedBroker(_make_backend())
+
+
+def shutdown_change_feed():
+    change_feed.close()
+
+
+# ----------------------
+# Publiceren na commit
+# ----------------------
+def queue_change(
+    db: Session,
+    type_: str,
+    so: Optional[str],
+    supplier_id: Optional[int] = None,
+    **data,
+):
+    """
+    Zet een event klaar; het gaat pas naar de broker na een geslaagde
+    commit van deze sessie (bij rollback vervalt het).
+    """
+    db.info.setdefault(_PENDING_KEY, []).append({
+        "type": type_,
+        "so": so,
+        "supplier_id": supplier_id,
+        "at": datetime.now(timezone.utc).isoformat(),
+        **data,
+    })
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_after_commit(session: Session):
+    events = session.info.pop(_PENDING_KEY, None)
+    if events:
+        change_feed.publish(events)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _drop_after_rollback(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def format_sse(e: Optional[dict]) -> str:
+    if e is None:
+        return ": keepalive\n\n"
+    lines = []
+    if "id" in e:
+        lines.append(f"id: {e['id']}")
+    lines.append(f"event: {e['type']}")
+    lines.append(f"data: {json.dumps(e, default=str)}")
+    return "\n".join(lines) + "\n\n"
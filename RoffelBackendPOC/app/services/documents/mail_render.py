@@ -0,0 +1,96 @@
+# app/services/documents/mail_render.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+from mako.lookup import TemplateLookup
+
+# Mail-HTML via Mako-templates (app/services/documents/templates/mail).
+#
+# - templates worden bij het opstarten één keer gecompileerd
+#   (load_mail_templates); daarna alleen nog renderen
+# - alle ${...} worden HTML-geëscaped (default filter "h", via MarkupSafe);
+#   een klantnaam of omschrijving met "<" of "&" breekt de mail dus niet meer
+# - gerenderde mails gaan in een kleine cache, gesleuteld op de
+#   inhoudsversie van de order: preview en daarna versturen rendert één keer
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates", "mail")
+
+MAIL_TEMPLATES = (
+    "leadtime.mako",
+    "offer.mako",
+    "order_confirmation.mako",
+    "stock_order.mako",
+)
+
+# hoe lang (sec) een gerenderde mail bewaard blijft; de sleutel bevat de
+# versies, dus dit begrenst alleen het geheugen
+MAIL_RENDER_CACHE_TTL = float(os.getenv("MAIL_RENDER_CACHE_TTL", "900"))
+MAIL_RENDER_CACHE_SIZE = int(os.getenv("MAIL_RENDER_CACHE_SIZE", "500"))
+
+_lookup = TemplateLookup(
+    directories=[TEMPLATE_DIR],
+    default_filters=["h"],
+    strict_undefined=True,
+    filesystem_checks=False,  # geen stat() per render; wijzigen = herstarten
+    input_encoding="utf-8",
+)
+
+
+def load_mail_templates():
+    """
+    Compileer alle mailtemplates (bij het opstarten: een fout in een
+    template valt dan direct op, niet pas bij de eerste mail).
+    """
+    for name in MAIL_TEMPLATES:
+        _lookup.get_template(name)
+
+
+def render_mail(name: str, **context) -> str:
+    return _lookup.get_template(name).render(**context)
+
+
+class MailRenderCache:
+    """
+    sleutel -> gerenderde mail (dict met to / subject / body_html).
+
+    De sleutel bevat alles waar de mail van afhangt (order-id, items_version,
+    pricing_version, ontvanger); een gewijzigde order krijgt dus vanzelf een
+    nieuwe sleutel en er hoeft niets geïnvalideerd te worden.
+    """
+
+    def __init__(self, ttl: float = MAIL_RENDER_CACHE_TTL, size: int = MAIL_RENDER_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[float, dict]] = OrderedDict()
+
+    def get_or_render(self, key: Hashable, render: Callable[[], dict]) -> dict:
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                return dict(entry[1])
+
+        mail = render()
+
+        if self.ttl > 0:
+            with self._lock:
+                self._entries[key] = (time.monotonic() + self.ttl, mail)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+
+        return dict(mail)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+mail_render_cache = MailRenderCache()
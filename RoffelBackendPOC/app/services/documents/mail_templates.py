@@ -1,7 +1,5 @@
 # app/services/documents/mail_templates.py
 
-
-
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 
@@ -11,41 +9,70 @@ from app.models.customer import Customer, CustomerContact
 from app.models.supplier import Supplier
 
 
+from app.services.documents.mail_render import mail_render_cache, render_mail
 from app.services.documents.stock_order import build_stock_order_pdf
 from app.services.pricing import calculate_order_totals
-from app.services.pricing import format_currency
 
+# HTML staat in app/services/documents/templates/mail/*.mako.
+# Hier alleen: gegevens ophalen, controleren en de cache-sleutel bepalen.
+# Alles wat niet in de sleutel zit (items_version / pricing_version van de
+# order, ontvanger) mag de mail niet veranderen.
 
-# ==================================================
-# SULLAIR – LEADTIME REQUEST
-# ==================================================
 
-def build_supplier_leadtime_mail(db: Session, so: str):
+def _get_order(db: Session, so: str) -> ServiceOrder:
     order = db.query(ServiceOrder).filter(ServiceOrder.so == so).first()
     if not order:
         raise HTTPException(404, "Serviceorder not found")
+    return order
 
-    items = db.query(ServiceOrderItem).filter(
-        ServiceOrderItem.serviceorder_id == order.id
-    ).all()
 
-    if not items:
-        raise HTTPException(400, "No items in serviceorder")
+def _get_primary_contact(db: Session, order: ServiceOrder) -> CustomerContact:
+    customer = db.query(Customer).filter(
+        Customer.id == order.customer_id
+    ).first()
+    if not customer:
+        raise HTTPException(400, "Customer not found")
 
-    # ✅ bepaal leverancier 
-    supplier_id = order.supplier_id
-    if not supplier_id:
-        raise HTTPException(400, "Supplier not set for serviceorder")
+    contact = db.query(CustomerContact).filter(
+        CustomerContact.customer_id == customer.id,
+        CustomerContact.is_primary == True
+    ).first()
+    if not contact:
+        raise HTTPException(400, "No primary contact for customer")
+
+    return contact
 
-    supplier = (
-        db.query(Supplier)
-        .filter(Supplier.id == supplier_id)
-        .first()
+
+def _get_items(db: Session, order: ServiceOrder) -> list[ServiceOrderItem]:
+    return (
+        db.query(ServiceOrderItem)
+        .filter(ServiceOrderItem.serviceorder_id == order.id)
+        .order_by(ServiceOrderItem.id.asc())
+        .all()
     )
 
-    if not supplier or not supplier.email_general:
-        raise HTTPException(400, "Supplier or supplier email not configured")
 
+def _order_totals(db: Session, order: ServiceOrder, items: list) -> dict:
+    try:
+        return calculate_order_totals(db, order, items)
+    except ValueError as e:
+        raise HTTPException(
+                status_code=400,
+                detail=f"Pricing fout voor serviceorder {order.so}: {e}"
+        )
+
+
+# ==================================================
+# SULLAIR – LEADTIME REQUEST
+# ==================================================
+
+def build_supplier_leadtime_mail(db: Session, so: str):
+    order = _get_order(db, so)
+
+    # ✅ bepaal leverancier
+    supplier_id = order.supplier_id
+    if not supplier_id:
+        raise HTTPException(400, "Supplier not set for serviceorder")
 
     supplier = db.query(Supplier).filter(
         Supplier.id == supplier_id
@@ -54,51 +81,22 @@ def build_supplier_leadtime_mail(db: Session, so: str):
     if not supplier or not supplier.email_general:
         raise HTTPException(400, "Supplier or supplier email not configured")
 
-    rows = ""
-    for idx, it in enumerate(items, start=1):
-        rows += f"""
-        <tr>
-          <td style="text-align:center;">{idx}</td>
-          <td>{it.part_no}</td>
-          <td>{it.description or ""}</td>
-          <td style="text-align:center;">{it.qty}</td>
-          <td style="text-align:right;">{format_currency(it.list_price)}</td>
-          <td></td>
-          <td></td>
-        </tr>
-        """
-
-    body = f"""
-    <div style="font-family: Arial; font-size:14px;">
-        <p>Dear {supplier.supplier_contact or 'Sir or Madam'},</p>
-
-        <p>
-            We kindly request, with service order number
-            <b>{order.so}</b>, the leadtimes for the following items:
-        </p>
-
-        <table style="border-collapse:collapse;width:100%;">
-            <tr>
-                <th style="border:1px solid #000;padding:6px;">Item</th>
-                <th style="border:1px solid #000;padding:6px;">Part No</th>
-                <th style="border:1px solid #000;padding:6px;">Description</th>
-                <th style="border:1px solid #000;padding:6px;">Qty</th>
-                <th style="border:1px solid #000;padding:6px;">Price Each</th>
-                <th style="border:1px solid #000;padding:6px;">Leadtime NL</th>
-                <th style="border:1px solid #000;padding:6px;">Comments</th>
-            </tr>
-            {rows}
-        </table>
-
-        <p>Kind regards,<br/><b>Maconet B.V.</b></p>
-    </div>
-    """
+    def render():
+        items = _get_items(db, order)
+        if not items:
+            raise HTTPException(400, "No items in serviceorder")
 
-    return {
-        "to": supplier.email_general,
-        "subject": f"Leadtime request service order {order.so}",
-        "body_html": body,
-    }
+        return {
+            "to": supplier.email_general,
+            "subject": f"Leadtime request service order {order.so}",
+            "body_html": render_mail("leadtime.mako", order=order, supplier=supplier, items=items),
+        }
+
+    key = (
+        "leadtime", order.id, order.so, order.items_version,
+        supplier.id, supplier.email_general, supplier.supplier_contact,
+    )
+    return mail_render_cache.get_or_render(key, render)
 
 
 # ==================================================
@@ -106,98 +104,35 @@ def build_supplier_leadtime_mail(db: Session, so: str):
 # ==================================================
 
 def build_offer_mail(db: Session, so: str):
-    order = db.query(ServiceOrder).filter(ServiceOrder.so == so).first()
-    if not order:
-        raise HTTPException(404, "Serviceorder not found")
-
-    try:
-
-        pricing = calculate_order_totals(db, order)
-    except ValueError as e:
-        raise HTTPException(
-                status_code=400,
-                detail=f"Pricing fout voor serviceorder {so}: {e}"
-        )
-
-    items = db.query(ServiceOrderItem).filter(
-        ServiceOrderItem.serviceorder_id == order.id
-    ).all()
-
-    customer = db.query(Customer).filter(
-        Customer.id == order.customer_id
-    ).first()
-    if not customer:
-        raise HTTPException(400, "Customer not found")
-
-    contact = db.query(CustomerContact).filter(
-        CustomerContact.customer_id == customer.id,
-        CustomerContact.is_primary == True
-    ).first()
-    if not contact:
-        raise HTTPException(400, "No primary contact for customer")
-
-    has_leadtimes = any((it.leadtime or "").strip() for it in items)
-
-    rows = ""
-    for idx, it in enumerate(pricing["items"], start=1):
-        db_item = next(x for x in items if x.part_no == it["part_no"])
-        lead = db_item.leadtime or ""
-
-        rows += f"""
-        <tr>
-            <td>{idx}</td>
-            <td>{it['part_no']}</td>
-            <td>{it['description']}</td>
-            <td style="text-align:right;">{it['qty']}</td>
-            <td style="text-align:right;">{format_currency(it['price_each'])}</td>
-            {f"<td>{lead}</td>" if has_leadtimes else ""}
-            <td style="text-align:right;">{format_currency(it['line_total'])}</td>
-        </tr>
-        """
-
-    leadtime_note = (
-        "" if has_leadtimes
-        else "<p><i>Leadtimes are requested from our supplier.</i></p>"
+    order = _get_order(db, so)
+    contact = _get_primary_contact(db, order)
+
+    def render():
+        items = _get_items(db, order)
+        pricing = _order_totals(db, order, items)
+
+        # pricing["items"] volgt de volgorde van `items`
+        lines = [(it, db_item.leadtime) for it, db_item in zip(pricing["items"], items)]
+        has_leadtimes = any((it.leadtime or "").strip() for it in items)
+
+        return {
+            "to": contact.email,
+            "subject": f"Quotation for service order {order.so}",
+            "body_html": render_mail(
+                "offer.mako",
+                order=order,
+                contact=contact,
+                pricing=pricing,
+                lines=lines,
+                has_leadtimes=has_leadtimes,
+            ),
+        }
+
+    key = (
+        "offer", order.id, order.so, order.items_version, order.pricing_version,
+        contact.id, contact.email, contact.contact_name,
     )
-
-    body = f"""
-    <div style="font-family: Arial; font-size:14px;">
-        <p>Dear {contact.contact_name},</p>
-
-        <p>
-            Please find below our quotation for service order
-            <b>{order.so}</b>.
-        </p>
-
-        {leadtime_note}
-
-        <table style="border-collapse:collapse;width:100%;">
-            <tr>
-                <th>Item</th>
-                <th>Part No</th>
-                <th>Description</th>
-                <th>Qty</th>
-                <th>Price</th>
-                {f"<th>Leadtime</th>" if has_leadtimes else ""}
-                <th>Line total</th>
-            </tr>
-            {rows}
-        </table>
-
-        <p>
-            <b>Total ({pricing['price_type']}):
-            {format_currency(pricing['total'])}</b>
-        </p>
-
-        <p>Kind regards,<br/>Maconet B.V.</p>
-    </div>
-    """
-
-    return {
-        "to": contact.email,
-        "subject": f"Quotation for service order {order.so}",
-        "body_html": body,
-    }
+    return mail_render_cache.get_or_render(key, render)
 
 
 # ==================================================
@@ -205,83 +140,34 @@ def build_offer_mail(db: Session, so: str):
 # ==================================================
 
 def build_order_confirmation_mail(db: Session, so: str):
-    order = db.query(ServiceOrder).filter(ServiceOrder.so == so).first()
-    if not order:
-        raise HTTPException(404, "Serviceorder not found")
-
-    pricing = calculate_order_totals(db, order)
-
-    items = db.query(ServiceOrderItem).filter(
-        ServiceOrderItem.serviceorder_id == order.id,
-        ServiceOrderItem.bestellen == True
-    ).all()
-
-    if not items:
-        raise HTTPException(400, "No items marked for ordering")
-
-    customer = db.query(Customer).filter(
-        Customer.name == order.customer.name
-    ).first()
-    if not customer:
-        raise HTTPException(400, "Customer not found")
-
-    contact = db.query(CustomerContact).filter(
-        CustomerContact.customer_id == customer.id,
-        CustomerContact.is_primary == True
-    ).first()
-    if not contact:
-        raise HTTPException(400, "No primary contact for customer")
+    order = _get_order(db, so)
+    contact = _get_primary_contact(db, order)
+
+    def render():
+        items = _get_items(db, order)
+        if not any(it.bestellen for it in items):
+            raise HTTPException(400, "No items marked for ordering")
+
+        pricing = _order_totals(db, order, items)
+
+        return {
+            "to": contact.email,
+            "subject": f"Order confirmation service order {order.so}",
+            "body_html": render_mail(
+                "order_confirmation.mako",
+                order=order,
+                contact=contact,
+                pricing=pricing,
+            ),
+        }
+
+    key = (
+        "order_confirmation", order.id, order.so, order.items_version, order.pricing_version,
+        contact.id, contact.email, contact.contact_name,
+    )
+    return mail_render_cache.get_or_render(key, render)
 
-    rows = ""
-    total = 0.0
-
-    for idx, it in enumerate(pricing["items"], start=1):
-        total += it["line_total"]
-        rows += f"""
-        <tr>
-            <td>{idx}</td>
-            <td>{it['part_no']}</td>
-            <td>{it['description']}</td>
-            <td style="text-align:right;">{it['qty']}</td>
-            <td style="text-align:right;">{format_currency(it['price_each'])}</td>
-            <td style="text-align:right;">{format_currency(it['line_total'])}</td>
-        </tr>
-        """
-
-    body = f"""
-    <div style="font-family: Arial; font-size:14px;">
-        <p>Dear {contact.contact_name},</p>
-
-        <p>
-            Please find below our order confirmation for service order
-            <b>{order.so}</b>.
-        </p>
-
-        <table style="border-collapse:collapse;width:100%;">
-            <tr>
-                <th>Item</th>
-                <th>Part No</th>
-                <th>Description</th>
-                <th>Qty</th>
-                <th>Price</th>
-                <th>Line total</th>
-            </tr>
-            {rows}
-            <tr>
-                <td colspan="5" style="text-align:right;"><b>Total</b></td>
-                <td style="text-align:right;"><b>{format_currency(total)}</b></td>
-            </tr>
-        </table>
-
-        <p>Kind regards,<br/>Maconet B.V.</p>
-    </div>
-    """
 
-    return {
-        "to": contact.email,
-        "subject": f"Order confirmation service order {order.so}",
-        "body_html": body,
-    }
 # ================================================
 # ORDER
 # ================================================
@@ -293,18 +179,12 @@ def build_stock_order_mail(db: Session, order: ServiceOrder):
     if not supplier or not supplier.email_general:
         raise HTTPException(400, "Supplier email not configured")
 
+    # PDF heeft een eigen content-cache (app/services/documents/renderer.py)
     pdf_path = build_stock_order_pdf(db, order)
 
     return {
         "to": supplier.email_general,
         "subject": f"Stock order {order.so}",
-        "body_html": f"""
-        <p>Dear {supplier.supplier_contact or 'Sir or Madam'},</p>
-        <p>
-            Please find attached our stock order for service order
-            <b>{order.so}</b>.
-        </p>
-        <p>Kind regards,<br/>Maconet B.V.</p>
-        """,
+        "body_html": render_mail("stock_order.mako", order=order, supplier=supplier),
         "pdf_path": pdf_path,
     }
@@ -2,7 +2,6 @@
 
 from datetime import date
 import os
-import uuid
 
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
@@ -20,6 +19,7 @@ from app.models.serviceorder import ServiceOrder
 from app.models.serviceorder_item import ServiceOrderItem
 from app.models.customer import Customer
 from app.services.pricing import get_price_for_item, format_currency
+from app.services.documents.renderer import render_pdf
 
 
 # ==================================================
@@ -29,7 +29,7 @@ from app.services.pricing import get_price_for_item, format_currency
 def get_packing_slip_data(db: Session, order: ServiceOrder):
     customer = (
         db.query(Customer)
-        .filter(Customer.name == order.supplier)
+        .filter(Customer.id == order.customer_id)
         .first()
     )
     if not customer:
@@ -73,6 +73,7 @@ def get_packing_slip_data(db: Session, order: ServiceOrder):
         },
         "price_type": customer.price_type or "BRUTO",
         "lines": lines,
+        "today": date.today().strftime("%d-%m-%Y"),
     }
 
 
@@ -80,6 +81,10 @@ def get_packing_slip_data(db: Session, order: ServiceOrder):
 # PDF builder
 # ==================================================
 
+# verhogen bij elke wijziging in de layout → oude cache-entries vervallen
+PACKING_SLIP_TEMPLATE_VERSION = 1
+
+
 def build_packing_slip_pdf(
     db: Session,
     order: ServiceOrder,
@@ -92,7 +97,22 @@ def build_packing_slip_pdf(
     """
 
     data = get_packing_slip_data(db, order)
-    show_prices = (mode == "internal")
+    data["mode"] = mode
+
+    return render_pdf(
+        kind="packing_slip",
+        ref=order.so,
+        template_version=PACKING_SLIP_TEMPLATE_VERSION,
+        data=data,
+        render_fn=render_packing_slip_pdf,
+    )
+
+
+def render_packing_slip_pdf(data: dict, filename: str):
+    """
+    Draait in het renderproces: alleen `data`, geen DB.
+    """
+    show_prices = (data["mode"] == "internal")
 
     styles = getSampleStyleSheet()
     normal = styles["Normal"]
@@ -102,14 +122,6 @@ def build_packing_slip_pdf(
 
     LOGO = os.path.join(BASE_DIR, "assets", "Maconet.png")
 
-    tmp_dir = os.path.join(BASE_DIR, "tmp")
-    os.makedirs(tmp_dir, exist_ok=True)
-
-    filename = os.path.join(
-        tmp_dir,
-        f"packing_slip_{order.so}_{uuid.uuid4().hex}.pdf"
-    )
-
     doc = SimpleDocTemplate(
         filename,
         pagesize=A4,
@@ -117,7 +129,7 @@ def build_packing_slip_pdf(
         rightMargin=18 * mm,
         topMargin=15 * mm,
         bottomMargin=15 * mm,
-        title=f"Packing slip {order.so}",
+        title=f"Packing slip {data['so']}",
     )
 
     elements = []
@@ -151,7 +163,7 @@ def build_packing_slip_pdf(
 
     # ================= Title =================
 
-    today = date.today().strftime("%d-%m-%Y")
+    today = data["today"]
     title = "PACKING SLIP" if not show_prices else "PACKING SLIP (INTERNAL)"
 
     top = Table(
@@ -267,4 +279,3 @@ def build_packing_slip_pdf(
     elements.append(Paragraph("Maconet B.V.", normal))
 
     doc.build(elements)
-    return filename
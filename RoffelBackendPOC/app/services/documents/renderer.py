@@ -0,0 +1,210 @@
+# app/services/documents/renderer.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException
+
+log = logging.getLogger(__name__)
+
+# aantal render-processen; 0 = renderen in de request-thread
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "2"))
+PDF_RENDER_TIMEOUT = int(os.getenv("PDF_RENDER_TIMEOUT", "60"))  # seconden
+
+# grenzen van de PDF-cache (oudste bestanden gaan eerst)
+PDF_CACHE_MAX_FILES = int(os.getenv("PDF_CACHE_MAX_FILES", "500"))
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_MB", "200")) * 1024 * 1024
+
+BASE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "../../../")
+)
+CACHE_DIR = os.path.join(BASE_DIR, "tmp", "pdf_cache")
+
+_executor: ProcessPoolExecutor | None = None
+_inflight: dict[str, Future] = {}
+_lock = threading.Lock()
+
+
+def document_key(kind: str, template_version: int, data: dict) -> str:
+    """
+    Content-hash van een document: zelfde inhoud + template → zelfde PDF.
+    """
+    payload = json.dumps(
+        {"kind": kind, "template_version": template_version, "data": data},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _safe(ref) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]", "_", str(ref))
+
+
+def _get_executor() -> ProcessPoolExecutor | None:
+    global _executor
+
+    if PDF_RENDER_WORKERS <= 0:
+        return None
+
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=PDF_RENDER_WORKERS)
+
+    return _executor
+
+
+def _render_to_file(render_fn, data: dict, path: str) -> str:
+    """
+    Draait in het render-proces. Schrijft eerst naar een tijdelijk
+    bestand zodat een half geschreven PDF nooit vanuit de cache wordt geserveerd.
+    De naam is uniek per aanroep (ook bij inline renderen in meerdere threads).
+    """
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    render_fn(data, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _evict():
+    """
+    LRU-opruiming op basis van mtime (wordt bij elke cache-hit bijgewerkt).
+    """
+    try:
+        entries = [
+            e for e in os.scandir(CACHE_DIR)
+            if e.is_file() and e.name.endswith(".pdf")
+        ]
+    except FileNotFoundError:
+        return
+
+    entries.sort(key=lambda e: e.stat().st_mtime)
+
+    total = sum(e.stat().st_size for e in entries)
+    count = len(entries)
+
+    for e in entries:
+        if count <= PDF_CACHE_MAX_FILES and total <= PDF_CACHE_MAX_BYTES:
+            break
+        try:
+            size = e.stat().st_size
+            os.remove(e.path)
+        except FileNotFoundError:
+            continue
+        total -= size
+        count -= 1
+
+
+def render_pdf(kind: str, ref, template_version: int, data: dict, render_fn) -> str:
+    """
+    Geef het pad naar de PDF voor `data`; render alleen als die nog niet in de cache staat.
+
+    - render_fn(data, path) moet een module-level functie zijn (picklable)
+      en mag alleen `data` gebruiken (geen DB-sessie).
+    - Gelijktijdige aanvragen voor hetzelfde document delen één render-job.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    key = document_key(kind, template_version, data)
+    path = os.path.join(CACHE_DIR, f"{kind}_{_safe(ref)}_{key[:24]}.pdf")
+
+    render_inline = False
+    pool = None
+    with _lock:
+        if os.path.exists(path):
+            os.utime(path)  # LRU: recent gebruikt
+            return path
+
+        future = _inflight.get(path)
+        if future is not None:
+            pool = _executor  # de pool waar de lopende job in draait
+        else:
+            pool = _get_executor()
+            if pool is None:
+                future = Future()
+                render_inline = True
+            else:
+                future = pool.submit(_render_to_file, render_fn, data, path)
+            _inflight[path] = future
+
+    try:
+        if render_inline:
+            # buiten de lock: andere documenten en cache-hits wachten hier niet op;
+            # aanvragen voor hetzelfde document wachten op deze Future
+            _render_inline(future, render_fn, data, path)
+
+        try:
+            _wait(future)
+        except BrokenProcessPool:
+            # render-proces is gecrasht → pool opnieuw opbouwen; één thread
+            # rendert dit document inline, de andere wachten daarop
+            log.exception("PDF render pool broken (%s)", path)
+            _discard_pool(pool)
+
+            with _lock:
+                current = _inflight.get(path)
+                render_inline = current is None or current is future
+                if render_inline:
+                    current = Future()
+                    _inflight[path] = current
+            future = current
+
+            if render_inline:
+                _render_inline(future, render_fn, data, path)
+            _wait(future)
+    finally:
+        with _lock:
+            if _inflight.get(path) is future:
+                del _inflight[path]
+
+    _evict()
+    return path
+
+
+def _render_inline(future: Future, render_fn, data: dict, path: str):
+    try:
+        future.set_result(_render_to_file(render_fn, data, path))
+    except Exception as e:
+        future.set_exception(e)
+
+
+def _wait(future: Future):
+    try:
+        future.result(timeout=PDF_RENDER_TIMEOUT)
+    except FutureTimeout:
+        raise HTTPException(504, "PDF genereren duurt te lang, probeer het later opnieuw")
+
+
+def _discard_pool(pool: ProcessPoolExecutor | None):
+    """
+    Gooi een kapotte pool weg (de volgende render maakt een nieuwe).
+    Alleen als het nog de huidige pool is: een andere thread kan al
+    een nieuwe hebben gestart.
+    """
+    global _executor
+
+    with _lock:
+        if pool is None or _executor is not pool:
+            return
+        _executor = None
+
+    # alle jobs van een kapotte pool zijn al mislukt; niets te annuleren
+    pool.shutdown(wait=False)
+
+
+def shutdown_renderer():
+    global _executor
+
+    with _lock:
+        executor, _executor = _executor, None
+
+    if executor is not None:
+        # lopende en wachtende renders maken hun werk af
+        executor.shutdown(wait=False)
@@ -1,7 +1,6 @@
 # app/services/documents/stock_order.py
 
 import os
-import uuid
 from datetime import date
 
 from sqlalchemy.orm import Session
@@ -20,6 +19,7 @@ from app.models.serviceorder import ServiceOrder
 from app.models.serviceorder_item import ServiceOrderItem
 from app.models.supplier import Supplier
 from app.services.pricing import format_currency
+from app.services.documents.renderer import render_pdf
 
 # ===============================
 # Helper
@@ -117,7 +117,15 @@ def get_stock_order_items_from_serviceorders(
 # PDF
 # ==================================================
 
-def build_stock_order_pdf(db: Session, order) -> str:
+# verhogen bij elke wijziging in de layout → oude cache-entries vervallen
+STOCK_ORDER_TEMPLATE_VERSION = 1
+
+
+def get_stock_order_data(db: Session, order) -> dict:
+    """
+    Alle gegevens voor de Stock Order PDF als platte dict
+    (input voor het renderproces én voor de cache-sleutel).
+    """
     supplier = get_supplier_for_order(db, order)
 
     if not supplier:
@@ -138,6 +146,40 @@ def build_stock_order_pdf(db: Session, order) -> str:
         so_refs = [order.so]
         ref = order.so
 
+    return {
+        "ref": ref,
+        "is_po": is_po,
+        "so_refs": so_refs,
+        "supplier_id": supplier.id,
+        "supplier_contact": supplier.supplier_contact,
+        "lines": lines,
+        "total_net": total_net,
+        "today": date.today().strftime("%d-%m-%Y"),
+    }
+
+
+def build_stock_order_pdf(db: Session, order) -> str:
+    data = get_stock_order_data(db, order)
+
+    return render_pdf(
+        kind="stockorder",
+        ref=data["ref"],
+        template_version=STOCK_ORDER_TEMPLATE_VERSION,
+        data=data,
+        render_fn=render_stock_order_pdf,
+    )
+
+
+def render_stock_order_pdf(data: dict, filename: str):
+    """
+    Draait in het renderproces: alleen `data`, geen DB.
+    """
+    ref = data["ref"]
+    is_po = data["is_po"]
+    so_refs = data["so_refs"]
+    lines = data["lines"]
+    total_net = data["total_net"]
+
     # ------------------------------------------------
     # Layout
     # ------------------------------------------------
@@ -149,14 +191,6 @@ def build_stock_order_pdf(db: Session, order) -> str:
     )
     LOGO = os.path.join(BASE_DIR, "assets", "Maconet.png")
 
-    tmp_dir = os.path.join(BASE_DIR, "tmp")
-    os.makedirs(tmp_dir, exist_ok=True)
-
-    filename = os.path.join(
-        tmp_dir,
-        f"stockorder_{ref}_{uuid.uuid4().hex}.pdf"
-    )
-
     doc = SimpleDocTemplate(
         filename,
         pagesize=A4,
@@ -198,7 +232,7 @@ def build_stock_order_pdf(db: Session, order) -> str:
 
     # ================= Reference =================
 
-    today = date.today().strftime("%d-%m-%Y")
+    today = data["today"]
 
     if is_po:
         ref_table = Table(
@@ -223,7 +257,7 @@ def build_stock_order_pdf(db: Session, order) -> str:
     elements.append(Spacer(1, 12))
 
     elements.append(Paragraph(
-        f"Dear {supplier.supplier_contact or 'Sir or Madam'},", normal
+        f"Dear {data['supplier_contact'] or 'Sir or Madam'},", normal
     ))
     elements.append(Spacer(1, 6))
     elements.append(Paragraph(
@@ -281,5 +315,4 @@ def build_stock_order_pdf(db: Session, order) -> str:
     elements.append(Paragraph("Maconet B.V.", normal))
 
     doc.build(elements)
-    return filename
 
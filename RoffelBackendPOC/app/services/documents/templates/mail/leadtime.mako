@@ -0,0 +1,38 @@
+<%doc>
+    Leadtime-aanvraag aan de leverancier.
+    Context: order, supplier, items
+</%doc>
+<%! from app.services.pricing import format_currency %>
+<div style="font-family: Arial; font-size:14px;">
+    <p>Dear ${supplier.supplier_contact or 'Sir or Madam'},</p>
+
+    <p>
+        We kindly request, with service order number
+        <b>${order.so}</b>, the leadtimes for the following items:
+    </p>
+
+    <table style="border-collapse:collapse;width:100%;">
+        <tr>
+            <th style="border:1px solid #000;padding:6px;">Item</th>
+            <th style="border:1px solid #000;padding:6px;">Part No</th>
+            <th style="border:1px solid #000;padding:6px;">Description</th>
+            <th style="border:1px solid #000;padding:6px;">Qty</th>
+            <th style="border:1px solid #000;padding:6px;">Price Each</th>
+            <th style="border:1px solid #000;padding:6px;">Leadtime NL</th>
+            <th style="border:1px solid #000;padding:6px;">Comments</th>
+        </tr>
+% for idx, it in enumerate(items, start=1):
+        <tr>
+            <td style="text-align:center;">${idx}</td>
+            <td>${it.part_no}</td>
+            <td>${it.description or ""}</td>
+            <td style="text-align:center;">${it.qty}</td>
+            <td style="text-align:right;">${format_currency(it.list_price)}</td>
+            <td></td>
+            <td></td>
+        </tr>
+% endfor
+    </table>
+
+    <p>Kind regards,<br/><b>Maconet B.V.</b></p>
+</div>
@@ -0,0 +1,51 @@
+<%doc>
+    Offerte aan de klant.
+    Context: order, contact, pricing, lines (prijsregel, leadtime), has_leadtimes
+</%doc>
+<%! from app.services.pricing import format_currency %>
+<div style="font-family: Arial; font-size:14px;">
+    <p>Dear ${contact.contact_name},</p>
+
+    <p>
+        Please find below our quotation for service order
+        <b>${order.so}</b>.
+    </p>
+
+% if not has_leadtimes:
+    <p><i>Leadtimes are requested from our supplier.</i></p>
+% endif
+
+    <table style="border-collapse:collapse;width:100%;">
+        <tr>
+            <th>Item</th>
+            <th>Part No</th>
+            <th>Description</th>
+            <th>Qty</th>
+            <th>Price</th>
+% if has_leadtimes:
+            <th>Leadtime</th>
+% endif
+            <th>Line total</th>
+        </tr>
+% for idx, (it, lead) in enumerate(lines, start=1):
+        <tr>
+            <td>${idx}</td>
+            <td>${it['part_no']}</td>
+            <td>${it['description'] or ""}</td>
+            <td style="text-align:right;">${it['qty']}</td>
+            <td style="text-align:right;">${format_currency(it['price_each'])}</td>
+    % if has_leadtimes:
+            <td>${lead or ""}</td>
+    % endif
+            <td style="text-align:right;">${format_currency(it['line_total'])}</td>
+        </tr>
+% endfor
+    </table>
+
+    <p>
+        <b>Total (${pricing['price_type']}):
+        ${format_currency(pricing['total'])}</b>
+    </p>
+
+    <p>Kind regards,<br/>Maconet B.V.</p>
+</div>
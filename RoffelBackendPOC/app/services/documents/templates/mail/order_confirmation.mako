@@ -0,0 +1,40 @@
+<%doc>
+    Orderbevestiging aan de klant.
+    Context: order, contact, pricing
+</%doc>
+<%! from app.services.pricing import format_currency %>
+<div style="font-family: Arial; font-size:14px;">
+    <p>Dear ${contact.contact_name},</p>
+
+    <p>
+        Please find below our order confirmation for service order
+        <b>${order.so}</b>.
+    </p>
+
+    <table style="border-collapse:collapse;width:100%;">
+        <tr>
+            <th>Item</th>
+            <th>Part No</th>
+            <th>Description</th>
+            <th>Qty</th>
+            <th>Price</th>
+            <th>Line total</th>
+        </tr>
+% for idx, it in enumerate(pricing['items'], start=1):
+        <tr>
+            <td>${idx}</td>
+            <td>${it['part_no']}</td>
+            <td>${it['description'] or ""}</td>
+            <td style="text-align:right;">${it['qty']}</td>
+            <td style="text-align:right;">${format_currency(it['price_each'])}</td>
+            <td style="text-align:right;">${format_currency(it['line_total'])}</td>
+        </tr>
+% endfor
+        <tr>
+            <td colspan="5" style="text-align:right;"><b>Total</b></td>
+            <td style="text-align:right;"><b>${format_currency(sum(it['line_total'] for it in pricing['items']))}</b></td>
+        </tr>
+    </table>
+
+    <p>Kind regards,<br/>Maconet B.V.</p>
+</div>
@@ -0,0 +1,10 @@
+<%doc>
+    Begeleidende mail bij de Stock Order PDF.
+    Context: order, supplier
+</%doc>
+<p>Dear ${supplier.supplier_contact or 'Sir or Madam'},</p>
+<p>
+    Please find attached our stock order for service order
+    <b>${order.so}</b>.
+</p>
+<p>Kind regards,<br/>Maconet B.V.</p>
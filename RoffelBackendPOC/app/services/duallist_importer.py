@@ -1,7 +1,13 @@
 import logging
+import os
+from typing import Callable, Optional
+
 import openpyxl
 from sqlalchemy.orm import Session
+
+from app.database import dialect_name
 from app.models.article import Article
+from app.services.article_cache import article_cache
 
 log = logging.getLogger(__name__)
 
@@ -13,132 +19,222 @@ BRUTO_FACTOR = 1.50
 WVK_FACTOR = 1.25
 EDMAC_FACTOR = 1.05
 
+# aantal Excel-regels per upsert + commit
+IMPORT_CHUNK_SIZE = int(os.getenv("DUALLIST_IMPORT_CHUNK_SIZE", "2000"))
+
+# velden die bij een bestaand artikel worden bijgewerkt
+UPDATE_FIELDS = (
+    "description",
+    "list_price",
+    "price_purchase",
+    "price_bruto",
+    "price_wvk",
+    "price_edmac",
+)
+
 
 # ======================
-# IMPORTER
+# UPSERT
 # ======================
-def import_duallist_from_excel(file_path: str, db: Session) -> dict:
-    wb = openpyxl.load_workbook(file_path, data_only=True)
-
-    # ----------------------
-    # Sheet bepalen
-    # ----------------------
-    if "Duallist" in wb.sheetnames:
-        ws = wb["Duallist"]
-        sheet_used = "Duallist"
+def _native_upsert_insert(db: Session):
+    """
+    Dialect-specifieke INSERT met ON CONFLICT-ondersteuning, of None.
+    """
+    name = dialect_name(db)
+
+    if name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+
+    return None
+
+
+def _upsert_chunk(db: Session, rows: list[dict], existing: dict[str, Optional[int]]):
+    """
+    Schrijf één chunk weg in één transactie.
+    `existing` (part_no -> id) wordt bijgewerkt met nieuwe artikelen.
+    """
+    insert = _native_upsert_insert(db)
+
+    if insert is not None:
+        stmt = insert(Article)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Article.part_no],
+            set_={f: stmt.excluded[f] for f in UPDATE_FIELDS},
+        )
+        db.execute(stmt, [{**r, "active": True} for r in rows])
+        for r in rows:
+            existing.setdefault(r["part_no"], None)
     else:
-        ws = wb[wb.sheetnames[0]]
-        sheet_used = wb.sheetnames[0]
-
-    log.info("Duallist import gestart (sheet=%s)", sheet_used)
-
-    created = 0
-    updated = 0
-    skipped = 0
-    duplicates_in_file = 0
-
-    seen_part_nos: set[str] = set()
-
-    # ----------------------
-    # Loop door Excel
-    # ----------------------
-    for row_idx, row in enumerate(
-        ws.iter_rows(min_row=2, values_only=True),
-        start=2,
-    ):
-        part_no = row[0]
-        description = row[1]
-        list_price = row[2]
-
-        # Basisvalidatie
-        if not part_no or list_price is None:
-            skipped += 1
-            log.debug("Rij %s overgeslagen (lege part_no of prijs)", row_idx)
-            continue
-
-        part_no = str(part_no).strip()
-
-        # 🔥 DEDUPLICATIE BINNEN HET BESTAND
-        if part_no in seen_part_nos:
-            duplicates_in_file += 1
-            log.warning(
-                "Dubbele artikelcode in bestand (%s) op rij %s",
-                part_no,
-                row_idx,
-            )
-            continue
-
-        seen_part_nos.add(part_no)
-
-        try:
-            list_price = float(list_price)
-        except (TypeError, ValueError):
-            skipped += 1
-            log.warning(
-                "Ongeldige list_price voor %s op rij %s",
-                part_no,
-                row_idx,
-            )
-            continue
+        new_rows = [
+            {**r, "active": True}
+            for r in rows if r["part_no"] not in existing
+        ]
+        upd_rows = [
+            {**r, "id": existing[r["part_no"]]}
+            for r in rows if r["part_no"] in existing
+        ]
+        if new_rows:
+            db.bulk_insert_mappings(Article, new_rows)
+        if upd_rows:
+            db.bulk_update_mappings(Article, upd_rows)
+        for r in new_rows:
+            existing[r["part_no"]] = None
+
+    db.commit()
+
 
+# ======================
+# IMPORTER
+# ======================
+def import_duallist_from_excel(
+    file_path: str,
+    db: Session,
+    progress: Callable[[dict], None] | None = None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> dict:
+    """
+    Streaming import van de Sullair Duallist.
+
+    - Excel wordt read-only (rij voor rij) gelezen
+    - bestaande part_no's worden in één query vooraf geladen
+    - upsert + commit per chunk; `progress(stats)` wordt na elke chunk aangeroepen
+    """
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+
+    try:
         # ----------------------
-        # Prijzen berekenen
+        # Sheet bepalen
         # ----------------------
-        price_purchase = list_price * PURCHASE_FACTOR
-        price_bruto = list_price * BRUTO_FACTOR
-        price_wvk = list_price * WVK_FACTOR
-        price_edmac = list_price * EDMAC_FACTOR
+        if "Duallist" in wb.sheetnames:
+            ws = wb["Duallist"]
+            sheet_used = "Duallist"
+        else:
+            ws = wb[wb.sheetnames[0]]
+            sheet_used = wb.sheetnames[0]
+
+        log.info("Duallist import gestart (sheet=%s)", sheet_used)
 
         # ----------------------
-        # UPSERT
+        # Bestaande artikelen (één query)
         # ----------------------
-        existing = (
-            db.query(Article)
-            .filter(Article.part_no == part_no)
-            .first()
+        existing: dict[str, Optional[int]] = dict(
+            db.query(Article.part_no, Article.id).all()
         )
 
-        if existing:
-            existing.description = description or ""
-            existing.list_price = list_price
-            existing.price_purchase = price_purchase
-            existing.price_bruto = price_bruto
-            existing.price_wvk = price_wvk
-            existing.price_edmac = price_edmac
-            updated += 1
-        else:
-            db.add(
-                Article(
-                    part_no=part_no,
-                    description=description or "",
-                    list_price=list_price,
-                    price_purchase=price_purchase,
-                    price_bruto=price_bruto,
-                    price_wvk=price_wvk,
-                    price_edmac=price_edmac,
-                    active=True,
-                )
+        stats = {
+            "sheet_used": sheet_used,
+            "total_rows": (ws.max_row - 1) if ws.max_row else None,
+            "rows_processed": 0,
+            "created": 0,
+            "updated": 0,
+            "skipped": 0,
+            "duplicates_in_file": 0,
+        }
+
+        seen_part_nos: set[str] = set()
+        chunk: list[dict] = []
+
+        def flush():
+            if not chunk:
+                return
+            for r in chunk:
+                if r["part_no"] in existing:
+                    stats["updated"] += 1
+                else:
+                    stats["created"] += 1
+            _upsert_chunk(db, chunk, existing)
+            article_cache.invalidate(r["part_no"] for r in chunk)
+            chunk.clear()
+
+            log.info(
+                "Duallist import: %s/%s regels verwerkt",
+                stats["rows_processed"],
+                stats["total_rows"] or "?",
             )
-            created += 1
+            if progress:
+                progress(dict(stats))
 
-    # ----------------------
-    # Commit
-    # ----------------------
-    db.commit()
+        # ----------------------
+        # Loop door Excel
+        # ----------------------
+        for row_idx, row in enumerate(
+            ws.iter_rows(min_row=2, max_col=3, values_only=True),
+            start=2,
+        ):
+            stats["rows_processed"] += 1
+
+            part_no = row[0] if len(row) > 0 else None
+            description = row[1] if len(row) > 1 else None
+            list_price = row[2] if len(row) > 2 else None
+
+            # Basisvalidatie
+            if not part_no or list_price is None:
+                stats["skipped"] += 1
+                log.debug("Rij %s overgeslagen (lege part_no of prijs)", row_idx)
+                continue
+
+            part_no = str(part_no).strip()
+
+            # 🔥 DEDUPLICATIE BINNEN HET BESTAND
+            if part_no in seen_part_nos:
+                stats["duplicates_in_file"] += 1
+                log.warning(
+                    "Dubbele artikelcode in bestand (%s) op rij %s",
+                    part_no,
+                    row_idx,
+                )
+                continue
+
+            seen_part_nos.add(part_no)
+
+            try:
+                list_price = float(list_price)
+            except (TypeError, ValueError):
+                stats["skipped"] += 1
+                log.warning(
+                    "Ongeldige list_price voor %s op rij %s",
+                    part_no,
+                    row_idx,
+                )
+                continue
+
+            # ----------------------
+            # Prijzen berekenen
+            # ----------------------
+            chunk.append({
+                "part_no": part_no,
+                "description": description or "",
+                "list_price": list_price,
+                "price_purchase": list_price * PURCHASE_FACTOR,
+                "price_bruto": list_price * BRUTO_FACTOR,
+                "price_wvk": list_price * WVK_FACTOR,
+                "price_edmac": list_price * EDMAC_FACTOR,
+            })
+
+            if len(chunk) >= chunk_size:
+                flush()
+
+        flush()
+    finally:
+        wb.close()
 
     log.info(
         "Duallist import afgerond: created=%s updated=%s skipped=%s duplicates=%s",
-        created,
-        updated,
-        skipped,
-        duplicates_in_file,
+        stats["created"],
+        stats["updated"],
+        stats["skipped"],
+        stats["duplicates_in_file"],
     )
 
     return {
         "sheet_used": sheet_used,
-        "created": created,
-        "updated": updated,
-        "skipped": skipped,
-        "duplicates_in_file": duplicates_in_file,
-        "total_processed": created + updated,
+        "created": stats["created"],
+        "updated": stats["updated"],
+        "skipped": stats["skipped"],
+        "duplicates_in_file": stats["duplicates_in_file"],
+        "total_processed": stats["created"] + stats["updated"],
     }
@@ -0,0 +1,160 @@
+# app/services/import_jobs.py
+
+import logging
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.import_job import ImportJob, ImportJobStatus
+from app.services.duallist_importer import import_duallist_from_excel
+from app.services.article_search import article_index
+from app.services.order_pricing import run_reprice_after_import
+
+log = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "../../")
+)
+IMPORT_UPLOAD_DIR = os.path.join(BASE_DIR, "tmp", "imports")
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+# één import tegelijk per worker; imports zijn write-zwaar
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="import-job")
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+def save_upload(fileobj, suffix: str) -> str:
+    """
+    Schrijf een upload in blokken naar schijf (nooit in één keer in geheugen).
+    """
+    os.makedirs(IMPORT_UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(IMPORT_UPLOAD_DIR, f"{uuid.uuid4().hex}{suffix}")
+
+    with open(path, "wb") as out:
+        shutil.copyfileobj(fileobj, out, UPLOAD_CHUNK_SIZE)
+
+    return path
+
+
+def create_job(db: Session, kind: str, filename: str | None, created_by: str | None) -> ImportJob:
+    job = ImportJob(
+        id=uuid.uuid4().hex,
+        kind=kind,
+        filename=filename,
+        status=ImportJobStatus.QUEUED,
+        created_by=created_by,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def submit_duallist_import(job_id: str, file_path: str):
+    _executor.submit(_run_duallist_import, job_id, file_path)
+
+
+def request_cancel(db: Session, job: ImportJob) -> ImportJob:
+    """
+    Markeer een job als te annuleren; de runner stopt na de lopende chunk.
+    Al verwerkte chunks blijven staan.
+    """
+    if job.status in (ImportJobStatus.QUEUED, ImportJobStatus.RUNNING):
+        job.cancel_requested = True
+        db.commit()
+        db.refresh(job)
+    return job
+
+
+def _run_duallist_import(job_id: str, file_path: str):
+    job_db = SessionLocal()
+    import_db = SessionLocal()
+
+    try:
+        job = job_db.get(ImportJob, job_id)
+        if job is None:
+            return
+
+        if job.cancel_requested:
+            job.status = ImportJobStatus.CANCELLED
+            return
+
+        job.status = ImportJobStatus.RUNNING
+        job.started_at = datetime.utcnow()
+        job_db.commit()
+
+        def progress(stats: dict):
+            job_db.refresh(job)  # haalt o.a. cancel_requested opnieuw op
+
+            job.sheet_used = stats["sheet_used"]
+            job.total_rows = stats["total_rows"]
+            job.rows_processed = stats["rows_processed"]
+            job.created = stats["created"]
+            job.updated = stats["updated"]
+            job.skipped = stats["skipped"]
+            job.duplicates_in_file = stats["duplicates_in_file"]
+            job_db.commit()
+
+            if job.cancel_requested:
+                raise ImportCancelled()
+
+        result = import_duallist_from_excel(file_path, import_db, progress=progress)
+
+        job.sheet_used = result["sheet_used"]
+        job.created = result["created"]
+        job.updated = result["updated"]
+        job.skipped = result["skipped"]
+        job.duplicates_in_file = result["duplicates_in_file"]
+        job.status = ImportJobStatus.DONE
+        job.finished_at = datetime.utcnow()
+        job_db.commit()
+
+        # zoekindex van deze worker direct verversen (andere workers zien de nieuwe import zelf)
+        try:
+            article_index.rebuild(import_db)
+        except Exception:
+            log.exception("Artikelindex verversen na import %s mislukt", job_id)
+
+        # nieuwe artikelprijzen op open orders overnemen (volgende job in de rij)
+        _executor.submit(run_reprice_after_import)
+
+    except ImportCancelled:
+        import_db.rollback()
+        job.status = ImportJobStatus.CANCELLED
+        log.info("Import job %s geannuleerd", job_id)
+
+    except Exception as e:
+        import_db.rollback()
+        job_db.rollback()
+        log.exception("Import job %s mislukt", job_id)
+        job = job_db.get(ImportJob, job_id)
+        if job is not None:
+            job.status = ImportJobStatus.FAILED
+            job.error = str(e)
+
+    finally:
+        job = job_db.get(ImportJob, job_id)
+        if job is not None:
+            job.finished_at = job.finished_at or datetime.utcnow()
+            job_db.commit()
+
+        job_db.close()
+        import_db.close()
+
+        try:
+            os.unlink(file_path)
+        except FileNotFoundError:
+            pass
+
+
+def shutdown_import_jobs():
+    _executor.shutdown(wait=False, cancel_futures=True)
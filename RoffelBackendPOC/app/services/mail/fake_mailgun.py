@@ -0,0 +1,152 @@
+# app/services/mail/fake_mailgun.py
+#
+# Lokale nep-Mailgun voor tests en ontwikkeling: accepteert
+# POST /v3/<domein>/messages en onthoudt de berichten.
+#
+# Gebruik:
+#   python -m app.services.mail.fake_mailgun [--port 8025] [--fail-rate 0.2]
+#   MAILGUN_BASE_URL=http://127.0.0.1:8025/v3 MAIL_PROVIDER=mailgun \
+#   MAILGUN_API_KEY=test MAILGUN_DOMAIN=example.test MAIL_ENABLED=true \
+#   python mail_worker.py
+#
+# Of vanuit een test:
+#   with FakeMailgun() as fake:
+#       os.environ["MAILGUN_BASE_URL"] = fake.base_url
+#       fake.fail_next(2, status=503)
+#       ...
+#       assert fake.messages[0]["to"] == "klant@example.com"
+
+import argparse
+import json
+import random
+import threading
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+def _parse_form(content_type: str, body: bytes) -> dict:
+    """
+    Velden uit urlencoded of multipart/form-data (bijlagen als bestandsnaam + grootte).
+    """
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        return {k: v[0] if len(v) == 1 else v for k, v in parse_qs(body.decode()).items()}
+
+    msg = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    fields: dict = {"attachments": []}
+    for part in msg.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        filename = part.get_filename()
+        payload = part.get_payload(decode=True) or b""
+        if filename:
+            fields["attachments"].append({"filename": filename, "size": len(payload)})
+        elif name:
+            fields[name] = payload.decode()
+    return fields
+
+
+class FakeMailgun:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, fail_rate: float = 0.0):
+        self.messages: list[dict] = []
+        self.requests = 0
+        self.fail_rate = fail_rate
+        self._fail_queue: list[int] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v3"
+
+    def fail_next(self, count: int = 1, status: int = 500):
+        """
+        De volgende `count` requests met `status` beantwoorden.
+        """
+        with self._lock:
+            self._fail_queue.extend([status] * count)
+
+    def _next_failure(self) -> int | None:
+        with self._lock:
+            self.requests += 1
+            if self._fail_queue:
+                return self._fail_queue.pop(0)
+        if self.fail_rate and random.random() < self.fail_rate:
+            return 503
+        return None
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, zoals de echte API
+
+            def _reply(self, status: int, payload: dict):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+                parts = self.path.strip("/").split("/")
+                if len(parts) != 3 or parts[0] != "v3" or parts[2] != "messages":
+                    return self._reply(404, {"message": "Not found"})
+                if not self.headers.get("Authorization", "").startswith("Basic "):
+                    return self._reply(401, {"message": "Forbidden"})
+
+                failure = fake._next_failure()
+                if failure:
+                    return self._reply(failure, {"message": "Simulated failure"})
+
+                fields = _parse_form(self.headers.get("Content-Type", ""), body)
+                if not fields.get("to"):
+                    return self._reply(400, {"message": "'to' parameter is missing"})
+
+                message_id = f"<{uuid.uuid4().hex}@{parts[1]}>"
+                with fake._lock:
+                    fake.messages.append({"id": message_id, "domain": parts[1], **fields})
+                self._reply(200, {"id": message_id, "message": "Queued. Thank you."})
+
+            def log_message(self, fmt, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeMailgun":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nep-Mailgun voor lokale tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeMailgun(args.host, args.port, args.fail_rate)
+    print(f"Fake Mailgun op {fake.base_url} (fail-rate {args.fail_rate})")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
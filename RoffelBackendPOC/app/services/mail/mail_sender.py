@@ -1,28 +1,81 @@
 # app/services/mail/mail_sender.py
 
+import logging
 import os
+import threading
 import requests
-from fastapi import HTTPException
+from requests.adapters import HTTPAdapter
 from contextlib import ExitStack
 
+log = logging.getLogger(__name__)
+
 MAIL_ENABLED = os.getenv("MAIL_ENABLED", "false").lower() == "true"
 
+# (connect, read) in seconden
+MAIL_HTTP_TIMEOUT = (
+    float(os.getenv("MAIL_HTTP_CONNECT_TIMEOUT", "5")),
+    float(os.getenv("MAIL_HTTP_READ_TIMEOUT", "30")),
+)
+# keep-alive verbindingen per host; minstens het aantal gelijktijdige verzendingen
+MAIL_HTTP_POOL_SIZE = int(os.getenv("MAIL_HTTP_POOL_SIZE", "8"))
+
+
+class MailDeliveryError(Exception):
+    """
+    Verzenden mislukt. `retryable`: later opnieuw proberen heeft zin
+    (timeout, verbinding, 429, 5xx); anders gaat de mail naar de dead-letter.
+    """
+
+    def __init__(self, message: str, retryable: bool, status_code: int | None = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status_code = status_code
+
 
-def send_mail(
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """
+    Gedeelde requests.Session met connection pool (keep-alive, thread-safe
+    genoeg voor gelijktijdige verzendingen vanuit de worker).
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=MAIL_HTTP_POOL_SIZE,
+                    max_retries=0,  # retries doet de outbox, met backoff
+                )
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _session = s
+    return _session
+
+
+def close_http_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def deliver_mail(
     to: str,
     subject: str,
     body_html: str,
     attachment_path: str | None = None,
-):
+    outbox_key: str | None = None,
+) -> str | None:
     """
-    Generic mail sender.
-    Respects MAIL_ENABLED flag.
+    Verstuur via de ingestelde provider. Geeft het bericht-id van de
+    provider terug; gooit MailDeliveryError bij een fout.
     """
-
-    if not MAIL_ENABLED:
-        print(f"[MAIL] disabled → to={to}, subject={subject}")
-        return {"status": "disabled"}
-
     provider = os.getenv("MAIL_PROVIDER")
 
     if provider == "mailgun":
@@ -31,9 +84,10 @@ def send_mail(
             subject=subject,
             body_html=body_html,
             attachment_path=attachment_path,
+            outbox_key=outbox_key,
         )
 
-    raise HTTPException(500, "Mail provider not configured")
+    raise MailDeliveryError("Mail provider not configured", retryable=False)
 
 
 def send_via_mailgun(
@@ -41,12 +95,15 @@ def send_via_mailgun(
     subject: str,
     body_html: str,
     attachment_path: str | None,
-):
+    outbox_key: str | None = None,
+) -> str | None:
     api_key = os.getenv("MAILGUN_API_KEY")
     domain = os.getenv("MAILGUN_DOMAIN")
+    # te overschrijven voor tests (app/services/mail/fake_mailgun.py)
+    base_url = os.getenv("MAILGUN_BASE_URL", "https://api.eu.mailgun.net/v3").rstrip("/")
 
     if not api_key or not domain:
-        raise HTTPException(500, "Mailgun not configured")
+        raise MailDeliveryError("Mailgun not configured", retryable=False)
 
     from_name = os.getenv("MAIL_FROM_NAME", "Maconet")
     from_addr = os.getenv("MAIL_FROM_ADDRESS", f"noreply@{domain}")
@@ -57,30 +114,43 @@ def send_via_mailgun(
         "subject": subject,
         "html": body_html,
     }
+    if outbox_key:
+        # terug te vinden in de Mailgun-logs / webhooks
+        data["v:outbox_key"] = outbox_key
 
-    print(f"[MAIL] sending via Mailgun → to={to}, subject={subject}")
+    log.info("Sending via Mailgun → to=%s, subject=%s", to, subject)
 
     with ExitStack() as stack:
         files = None
 
         if attachment_path:
-            file_handle = stack.enter_context(open(attachment_path, "rb"))
+            try:
+                file_handle = stack.enter_context(open(attachment_path, "rb"))
+            except OSError as e:
+                raise MailDeliveryError(f"Attachment not readable: {e}", retryable=False)
             files = [("attachment", file_handle)]
 
-        resp = requests.post(
-            f"https://api.eu.mailgun.net/v3/{domain}/messages",
-            auth=("api", api_key),
-            data=data,
-            files=files,
-            timeout=10,
-        )
+        try:
+            resp = http_session().post(
+                f"{base_url}/{domain}/messages",
+                auth=("api", api_key),
+                data=data,
+                files=files,
+                timeout=MAIL_HTTP_TIMEOUT,
+            )
+        except requests.RequestException as e:
+            # timeout / verbinding: later opnieuw
+            raise MailDeliveryError(f"Mailgun unreachable: {e}", retryable=True)
 
     if resp.status_code >= 300:
-        print(f"[MAIL][ERROR] Mailgun response: {resp.status_code} {resp.text}")
-        raise HTTPException(
-            status_code=500,
-            detail="Mail sending failed",
+        raise MailDeliveryError(
+            f"Mailgun response: {resp.status_code} {resp.text[:500]}",
+            retryable=resp.status_code == 429 or resp.status_code >= 500,
+            status_code=resp.status_code,
         )
 
-    print(f"[MAIL] sent successfully → to={to}")
-    return {"status": "sent"}
+    log.info("Sent via Mailgun → to=%s", to)
+    try:
+        return resp.json().get("id")
+    except ValueError:
+        return None
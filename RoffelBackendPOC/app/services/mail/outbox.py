@@ -0,0 +1,372 @@
+# app/services/mail/outbox.py
+
+import logging
+import os
+import random
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, event, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, dialect_name
+from app.models.mail_outbox import MailOutbox, MailOutboxStatus
+from app.models.serviceorder import ServiceOrder
+from app.services.mail import mail_sender
+from app.services.mail.mail_sender import MailDeliveryError, deliver_mail
+from app.services.orders import log_event
+
+log = logging.getLogger(__name__)
+
+# Transactionele outbox: requests zetten mails alleen in mail_outbox (in
+# dezelfde commit als bv. de statuswijziging); een aparte worker
+# (mail_worker.py) verstuurt ze. Een herstart verliest dus niets en de
+# responstijd hangt niet af van de mailprovider.
+#
+# Levering is at-least-once: crasht een worker tijdens het versturen, dan
+# pakt een andere de mail op na MAIL_LEASE_SECONDS.
+
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "8"))
+MAIL_RETRY_BASE_DELAY = float(os.getenv("MAIL_RETRY_BASE_DELAY", "30"))     # sec
+MAIL_RETRY_MAX_DELAY = float(os.getenv("MAIL_RETRY_MAX_DELAY", "3600"))     # sec
+# claim per mail; ruim boven de HTTP-timeouts
+MAIL_LEASE_SECONDS = float(os.getenv("MAIL_LEASE_SECONDS", "300"))
+MAIL_WORKER_BATCH = int(os.getenv("MAIL_WORKER_BATCH", "20"))
+MAIL_WORKER_CONCURRENCY = int(os.getenv("MAIL_WORKER_CONCURRENCY", "4"))
+MAIL_WORKER_POLL_INTERVAL = float(os.getenv("MAIL_WORKER_POLL_INTERVAL", "2"))
+
+# bijlagen van mails in de wachtrij; eigen map, want tmp/pdf_cache ruimt
+# bestanden op (LRU) terwijl een mail nog kan wachten op een nieuwe poging
+BASE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "../../../")
+)
+ATTACHMENT_DIR = os.getenv("MAIL_ATTACHMENT_DIR", os.path.join(BASE_DIR, "tmp", "mail_outbox"))
+
+# sleutel in Session.info: gekopieerde bijlagen om bij een rollback op te ruimen
+_ATTACHMENTS_KEY = "mail_outbox_attachments"
+
+
+# ----------------------
+# In de wachtrij zetten
+# ----------------------
+def mail_idempotency_key(mail_type: str, order: ServiceOrder) -> str:
+    """
+    Sleutel per (order, mailtype, inhoudsversie): nogmaals op "versturen"
+    klikken geeft dezelfde mail, na een wijziging van regels of prijzen
+    mag hij opnieuw.
+    """
+    return f"{mail_type}:{order.id}:v{order.items_version or 0}.{order.pricing_version or 0}"
+
+
+def _own_attachment(db: Session, path: str) -> str:
+    """
+    Kopieer een bijlage naar ATTACHMENT_DIR; de outbox-rij verwijst naar de kopie.
+    """
+    # eigen submap per mail: de bestandsnaam in de mail blijft gelijk
+    folder = os.path.join(ATTACHMENT_DIR, uuid.uuid4().hex)
+    os.makedirs(folder)
+    owned = os.path.join(folder, os.path.basename(path))
+    shutil.copyfile(path, owned)
+    db.info.setdefault(_ATTACHMENTS_KEY, []).append(owned)
+    return owned
+
+
+def _remove_attachment(path: Optional[str]):
+    if not path:
+        return
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _keep_attachments(session: Session):
+    session.info.pop(_ATTACHMENTS_KEY, None)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _drop_attachments(session: Session):
+    for path in session.info.pop(_ATTACHMENTS_KEY, ()):
+        _remove_attachment(path)
+
+
+def _insert(db: Session):
+    return {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(dialect_name(db))
+
+
+def enqueue_mail(
+    db: Session,
+    mail_type: str,
+    to: str,
+    subject: str,
+    body_html: str,
+    serviceorder_id: Optional[int] = None,
+    idempotency_key: Optional[str] = None,
+    attachment_path: Optional[str] = None,
+) -> tuple[MailOutbox, bool]:
+    """
+    Zet een mail klaar (niet gecommit). Geeft (rij, nieuw) terug; bestaat de
+    idempotency_key al, dan de bestaande rij en False.
+
+    Een bijlage wordt gekopieerd naar ATTACHMENT_DIR; de worker verwijdert
+    de kopie zodra de mail SENT, SKIPPED of DEAD is.
+    """
+    if idempotency_key is not None:
+        existing = db.query(MailOutbox).filter(MailOutbox.idempotency_key == idempotency_key).first()
+        if existing:
+            return existing, False
+
+    if attachment_path:
+        attachment_path = _own_attachment(db, attachment_path)
+
+    values = {
+        "mail_type": mail_type,
+        "serviceorder_id": serviceorder_id,
+        "idempotency_key": idempotency_key,
+        "to": to,
+        "subject": subject,
+        "body_html": body_html,
+        "attachment_path": attachment_path,
+        "status": MailOutboxStatus.PENDING,
+        "attempts": 0,
+        "next_attempt_at": datetime.utcnow(),
+        "created_at": datetime.utcnow(),
+    }
+
+    if idempotency_key is None:
+        row = MailOutbox(**values)
+        db.add(row)
+        db.flush()
+        return row, True
+
+    dialect_insert = _insert(db)
+    if dialect_insert is None:
+        raise RuntimeError(f"mail_outbox: no upsert for {dialect_name(db)}")
+
+    # gelijktijdig request met dezelfde sleutel: niets doen, bestaande rij gebruiken
+    result = db.execute(
+        dialect_insert(MailOutbox)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=["idempotency_key"])
+    )
+    row = db.query(MailOutbox).filter(MailOutbox.idempotency_key == idempotency_key).one()
+    if not result.rowcount:
+        _remove_attachment(attachment_path)
+    return row, bool(result.rowcount)
+
+
+def retry_dead_mails(db: Session, ids: Optional[list[int]] = None) -> int:
+    """
+    Dead-letter mails opnieuw in de wachtrij (alle, of alleen `ids`). Commit zelf.
+    """
+    stmt = (
+        update(MailOutbox)
+        .where(MailOutbox.status == MailOutboxStatus.DEAD)
+        .values(
+            status=MailOutboxStatus.PENDING,
+            attempts=0,
+            next_attempt_at=datetime.utcnow(),
+            locked_until=None,
+            claim_token=None,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if ids is not None:
+        stmt = stmt.where(MailOutbox.id.in_(ids))
+    count = db.execute(stmt).rowcount
+    db.commit()
+    return count
+
+
+# ----------------------
+# Worker
+# ----------------------
+def retry_delay(attempts: int) -> timedelta:
+    """
+    Exponentiële backoff met jitter: 30s, 1m, 2m, 4m, ... (max MAIL_RETRY_MAX_DELAY).
+    """
+    delay = min(MAIL_RETRY_MAX_DELAY, MAIL_RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0)))
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def _due_filter(now: datetime):
+    return or_(
+        and_(
+            MailOutbox.status == MailOutboxStatus.PENDING,
+            MailOutbox.next_attempt_at <= now,
+        ),
+        # claim van een gecrashte worker verlopen
+        and_(
+            MailOutbox.status == MailOutboxStatus.SENDING,
+            MailOutbox.locked_until < now,
+        ),
+    )
+
+
+def claim_due_mails(db: Session, limit: int = MAIL_WORKER_BATCH) -> tuple[str, list[dict]]:
+    """
+    Claim maximaal `limit` mails die aan de beurt zijn (één conditionele
+    UPDATE, veilig met meerdere workers) en commit de claim.
+    """
+    now = datetime.utcnow()
+    token = uuid.uuid4().hex
+
+    due_ids = (
+        select(MailOutbox.id)
+        .where(_due_filter(now))
+        .order_by(MailOutbox.next_attempt_at.asc(), MailOutbox.id.asc())
+        .limit(limit)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(MailOutbox)
+        .where(MailOutbox.id.in_(due_ids), _due_filter(now))
+        .values(
+            status=MailOutboxStatus.SENDING,
+            locked_until=now + timedelta(seconds=MAIL_LEASE_SECONDS),
+            claim_token=token,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    # platte dicts: de verzendthreads raken geen sessie aan
+    rows = [
+        {
+            "id": m.id,
+            "to": m.to,
+            "subject": m.subject,
+            "body_html": m.body_html,
+            "attachment_path": m.attachment_path,
+            "idempotency_key": m.idempotency_key,
+            "attempts": m.attempts,
+        }
+        for m in db.query(MailOutbox).filter(MailOutbox.claim_token == token)
+    ]
+    return token, rows
+
+
+def _send_one(mail: dict) -> dict:
+    if not mail_sender.MAIL_ENABLED:
+        log.info("Mail %s niet verstuurd (MAIL_ENABLED=false): to=%s, subject=%s", mail["id"], mail["to"], mail["subject"])
+        return {"id": mail["id"], "status": MailOutboxStatus.SKIPPED}
+
+    try:
+        message_id = deliver_mail(
+            mail["to"],
+            mail["subject"],
+            mail["body_html"],
+            mail["attachment_path"],
+            outbox_key=mail["idempotency_key"] or str(mail["id"]),
+        )
+    except MailDeliveryError as e:
+        return {"id": mail["id"], "status": None, "error": str(e), "retryable": e.retryable}
+    except Exception as e:  # noqa: BLE001 - nooit de worker laten vallen
+        log.exception("Mail %s: onverwachte fout", mail["id"])
+        return {"id": mail["id"], "status": None, "error": repr(e), "retryable": True}
+
+    return {"id": mail["id"], "status": MailOutboxStatus.SENT, "message_id": message_id}
+
+
+def _record_results(db: Session, token: str, mails: dict[int, dict], results: list[dict]) -> list[int]:
+    """
+    Schrijf de uitkomsten weg (alleen zolang onze claim nog geldt).
+    Geeft de ids terug die naar de dead-letter zijn gegaan.
+    """
+    now = datetime.utcnow()
+    dead: dict[int, str] = {}
+    finished: list[Optional[str]] = []  # bijlagen van afgehandelde mails
+
+    for r in results:
+        mail = mails[r["id"]]
+        values: dict = {"locked_until": None, "claim_token": None}
+
+        if r["status"] is not None:
+            values.update(status=r["status"], sent_at=now, last_error=None)
+            if r.get("message_id"):
+                values["provider_message_id"] = r["message_id"]
+        else:
+            attempts = mail["attempts"] + 1
+            values.update(attempts=attempts, last_error=r["error"][:1000])
+            if r["retryable"] and attempts < MAIL_MAX_ATTEMPTS:
+                values.update(status=MailOutboxStatus.PENDING, next_attempt_at=now + retry_delay(attempts))
+            else:
+                values.update(status=MailOutboxStatus.DEAD)
+                dead[r["id"]] = r["error"]
+
+        result = db.execute(
+            update(MailOutbox)
+            .where(MailOutbox.id == r["id"], MailOutbox.claim_token == token)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount and values.get("status") != MailOutboxStatus.PENDING:
+            finished.append(mail["attachment_path"])
+
+    if dead:
+        # zichtbaar in de log van de order
+        for m, order in (
+            db.query(MailOutbox, ServiceOrder)
+            .join(ServiceOrder, ServiceOrder.id == MailOutbox.serviceorder_id)
+            .filter(MailOutbox.id.in_(list(dead)))
+        ):
+            log_event(db, order, "MAIL_MISLUKT", f"Mail '{m.subject}' aan {m.to} kon niet worden verstuurd: {dead[m.id]}")
+
+    for mail_id, error in dead.items():
+        log.warning("Mail %s naar dead-letter: %s", mail_id, error)
+
+    db.commit()
+
+    for path in finished:
+        _remove_attachment(path)
+
+    return list(dead)
+
+
+def process_due_mails(pool: ThreadPoolExecutor, limit: int = MAIL_WORKER_BATCH) -> int:
+    """
+    Eén ronde: claimen, gelijktijdig versturen (gedeelde keep-alive sessie),
+    uitkomsten wegschrijven. Geeft het aantal behandelde mails terug.
+    """
+    db = SessionLocal()
+    try:
+        token, mails = claim_due_mails(db, limit)
+        if not mails:
+            return 0
+
+        results = list(pool.map(_send_one, mails))
+        _record_results(db, token, {m["id"]: m for m in mails}, results)
+        return len(mails)
+    finally:
+        db.close()
+
+
+def run_mail_worker(stop: Optional[threading.Event] = None, once: bool = False):
+    """
+    Verstuur mails tot `stop` gezet wordt (of, met once=True, tot er niets
+    meer aan de beurt is).
+    """
+    stop = stop or threading.Event()
+    with ThreadPoolExecutor(
+        max_workers=MAIL_WORKER_CONCURRENCY,
+        thread_name_prefix="mail-send",
+    ) as pool:
+        try:
+            while not stop.is_set():
+                try:
+                    handled = process_due_mails(pool)
+                except Exception:
+                    log.exception("Mail-worker: ronde mislukt")
+                    handled = 0
+
+                if once:
+                    if handled == 0:
+                        break
+                    continue
+                if handled < MAIL_WORKER_BATCH:
+                    stop.wait(MAIL_WORKER_POLL_INTERVAL)
+        finally:
+            mail_sender.close_http_session()
@@ -0,0 +1,286 @@
+# app/services/number_allocator.py
+
+import os
+import socket
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import lock_for_write
+
+
+# Nummers in een proces-pool staan als RESERVED met reserved_by = "POOL:<host>:<pid>"
+POOL_PREFIX = "POOL:"
+
+NUMBER_POOL_SIZE = int(os.getenv("NUMBER_POOL_SIZE", "5"))
+
+# pool-nummers die langer dan dit vastzitten (bv. na een crash) worden bij startup vrijgegeven
+NUMBER_POOL_MAX_AGE = timedelta(hours=int(os.getenv("NUMBER_POOL_MAX_AGE_HOURS", "24")))
+
+
+def not_pooled(column):
+    """
+    Filter om pool-nummers uit overzichten te houden.
+    """
+    return or_(column.is_(None), ~column.like(f"{POOL_PREFIX}%"))
+
+
+class NumberAllocator:
+    """
+    Geeft nummers uit een reeks (SO / PO) uit in blokken.
+
+    Eén transactie per blok: eerst FREE nummers binnen de periode
+    hergebruiken, daarna een aaneengesloten reeks nieuwe sequences.
+    """
+
+    def __init__(self, model, status_enum, number_attr: str, period_attrs: tuple, formatter):
+        self.model = model
+        self.status_enum = status_enum
+        self.number_col = getattr(model, number_attr)
+        self.number_attr = number_attr
+        self.period_attrs = period_attrs    # bv. ("year",) of ("year", "month")
+        self.formatter = formatter          # formatter(year, month, sequence) -> str
+
+    def period_key(self, now: datetime) -> tuple:
+        return tuple(getattr(now, attr) for attr in self.period_attrs)
+
+    def _period_filters(self, now: datetime) -> list:
+        return [
+            getattr(self.model, attr) == getattr(now, attr)
+            for attr in self.period_attrs
+        ]
+
+    def allocate(
+        self,
+        db: Session,
+        reserved_by: str,
+        count: int,
+        now: datetime | None = None,
+        max_attempts: int = 5,
+    ) -> list[str]:
+        """
+        Reserveer `count` nummers in één transactie.
+        Geeft de nummers (strings) terug in oplopende volgorde.
+        """
+        now = now or datetime.utcnow()
+        status_enum = self.status_enum
+
+        for attempt in range(1, max_attempts + 1):
+            # 🔒 write-lock (alleen SQLite); PostgreSQL: FREE rijen worden met
+            # FOR UPDATE SKIP LOCKED geclaimd en nieuwe sequences worden
+            # beschermd door de unique constraint + retry
+            lock_for_write(db)
+
+            # 1️⃣ hergebruik eerst FREE nummers binnen deze periode
+            free = (
+                db.query(self.model)
+                .filter(
+                    *self._period_filters(now),
+                    self.model.status == status_enum.FREE,
+                )
+                .order_by(self.model.sequence.asc())
+                .limit(count)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+
+            numbers = []
+            for rec in free:
+                rec.status = status_enum.RESERVED
+                rec.reserved_by = reserved_by
+                rec.reserved_at = now
+                numbers.append(getattr(rec, self.number_attr))
+
+            # 2️⃣ de rest als aaneengesloten blok nieuwe sequences
+            missing = count - len(free)
+            if missing:
+                last_seq = (
+                    db.query(self.model.sequence)
+                    .filter(*self._period_filters(now))
+                    .order_by(self.model.sequence.desc())
+                    .limit(1)
+                    .scalar()
+                ) or 0
+
+                for seq in range(last_seq + 1, last_seq + 1 + missing):
+                    number = self.formatter(now.year, now.month, seq)
+                    db.add(
+                        self.model(
+                            **{self.number_attr: number},
+                            year=now.year,
+                            month=now.month,
+                            sequence=seq,
+                            date=now,
+                            status=status_enum.RESERVED,
+                            reserved_by=reserved_by,
+                            reserved_at=now,
+                        )
+                    )
+                    numbers.append(number)
+
+            try:
+                db.commit()
+            except IntegrityError:
+                # een andere worker was ons voor met deze sequences → opnieuw
+                db.rollback()
+                if attempt == max_attempts:
+                    raise HTTPException(503, "Could not reserve number, try again")
+                continue
+
+            return numbers
+
+    def release(self, db: Session, numbers: list[str], reserved_by: str) -> int:
+        """
+        Zet nummers die nog door `reserved_by` gereserveerd zijn terug op FREE.
+        """
+        if not numbers:
+            return 0
+
+        status_enum = self.status_enum
+
+        released = (
+            db.query(self.model)
+            .filter(
+                self.number_col.in_(numbers),
+                self.model.status == status_enum.RESERVED,
+                self.model.reserved_by == reserved_by,
+            )
+            .update(
+                {
+                    self.model.status: status_enum.FREE,
+                    self.model.reserved_by: None,
+                    self.model.reserved_at: None,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return released
+
+    def release_stale_pool_numbers(self, db: Session, max_age: timedelta = NUMBER_POOL_MAX_AGE) -> int:
+        """
+        Geef pool-nummers vrij die achterbleven na een crash/kill van een worker.
+        """
+        status_enum = self.status_enum
+
+        released = (
+            db.query(self.model)
+            .filter(
+                self.model.status == status_enum.RESERVED,
+                self.model.reserved_by.like(f"{POOL_PREFIX}%"),
+                self.model.reserved_at < datetime.utcnow() - max_age,
+            )
+            .update(
+                {
+                    self.model.status: status_enum.FREE,
+                    self.model.reserved_by: None,
+                    self.model.reserved_at: None,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return released
+
+
+class NumberPool:
+    """
+    Per-proces voorraad vooraf gereserveerde nummers.
+
+    Een losse reservering kost zo meestal alleen een korte UPDATE op één rij
+    i.p.v. een write-lock + scan. Het uitgeven gebeurt conditioneel
+    (alleen als de rij nog van deze pool is), dus een nummer dat intussen
+    is vrijgegeven wordt nooit dubbel uitgegeven.
+    """
+
+    def __init__(self, allocator: NumberAllocator, size: int = NUMBER_POOL_SIZE):
+        self.allocator = allocator
+        self.size = size
+
+        self._lock = threading.Lock()
+        self._numbers: deque[str] = deque()
+        self._period = None
+
+        _POOLS.append(self)
+
+    @property
+    def marker(self) -> str:
+        # pid pas bij gebruik bepalen (uvicorn workers kunnen na import forken)
+        return f"{POOL_PREFIX}{socket.gethostname()}:{os.getpid()}"
+
+    def take(self, db: Session, reserved_by: str, now: datetime | None = None) -> str:
+        now = now or datetime.utcnow()
+
+        if self.size <= 0:
+            return self.allocator.allocate(db, reserved_by, 1, now)[0]
+
+        model = self.allocator.model
+        status_enum = self.allocator.status_enum
+
+        with self._lock:
+            # nieuwe periode (jaar/maand) → oude voorraad teruggeven
+            period = self.allocator.period_key(now)
+            if period != self._period:
+                self._release_locked(db)
+                self._period = period
+
+            while True:
+                if not self._numbers:
+                    self._numbers.extend(
+                        self.allocator.allocate(db, self.marker, self.size, now)
+                    )
+
+                number = self._numbers.popleft()
+
+                claimed = (
+                    db.query(model)
+                    .filter(
+                        self.allocator.number_col == number,
+                        model.status == status_enum.RESERVED,
+                        model.reserved_by == self.marker,
+                    )
+                    .update(
+                        {
+                            model.reserved_by: reserved_by,
+                            model.reserved_at: now,
+                        },
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+
+                if claimed:
+                    return number
+
+    def release(self, db: Session) -> int:
+        with self._lock:
+            return self._release_locked(db)
+
+    def _release_locked(self, db: Session) -> int:
+        numbers = list(self._numbers)
+        self._numbers.clear()
+        return self.allocator.release(db, numbers, self.marker)
+
+
+_POOLS: list[NumberPool] = []
+
+
+def release_number_pools(db: Session):
+    """
+    Geef alle nog ongebruikte pool-nummers van dit proces terug (shutdown).
+    """
+    for pool in _POOLS:
+        pool.release(db)
+
+
+def release_stale_number_pools(db: Session):
+    """
+    Ruim pool-nummers op van processen die niet netjes zijn afgesloten (startup).
+    """
+    for pool in _POOLS:
+        pool.allocator.release_stale_pool_numbers(db)
@@ -0,0 +1,253 @@
+# app/services/order_pricing.py
+
+import logging
+import os
+from typing import Iterable
+
+from sqlalchemy import event, func, inspect, or_, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.article import Article
+from app.models.customer import Customer
+from app.models.serviceorder import ServiceOrder
+from app.models.serviceorder_item import ServiceOrderItem
+from app.services.orders import log_event
+from app.services.price_rule_cache import invalidate_customer
+from app.services.pricing import calculate_totals_for_orders
+
+log = logging.getLogger(__name__)
+
+# Bewaarde prijsberekening op de order (pricing_total / pricing_price_type /
+# pricing_version).
+#
+# Wie regels, klant of prijsregels wijzigt, zet de betrokken orders klaar
+# (queue_reprice / queue_reprice_customer); vlak voor de commit worden ze
+# set-based herberekend, in dezelfde transactie als de wijziging.
+# Een nieuwe order en een andere klant op de order worden automatisch opgepikt,
+# net als een ander standaard-prijstype van een klant.
+
+# sleutels in Session.info
+_ORDERS_KEY = "reprice_orders"
+_CUSTOMERS_KEY = "reprice_customers"
+
+# orders per herberekening (IN-lijst)
+REPRICE_CHUNK_SIZE = 500
+
+# statussen waarin regelprijzen na een Duallist-import worden bijgewerkt;
+# daarna is er al een offerte / bestelling met de oude prijzen
+REPRICE_STATUSES = tuple(
+    s.strip() for s in os.getenv("REPRICE_STATUSES", "OPEN,AANGEVRAAGD").split(",") if s.strip()
+)
+
+ITEM_PRICE_FIELDS = ("list_price", "price_bruto", "price_wvk", "price_edmac", "price_purchase")
+
+
+# ----------------------
+# Klaarzetten
+# ----------------------
+def queue_reprice(db: Session, orders: Iterable):
+    """
+    Orders (objecten of ids) opnieuw laten prijzen bij de commit.
+    """
+    pending = db.info.setdefault(_ORDERS_KEY, [])
+    pending.extend(orders)
+
+
+def queue_reprice_customer(db: Session, customer_id: int):
+    """
+    Prijsregels / standaard-prijstype van een klant gewijzigd: zijn gecachete
+    tiers vergeten en al zijn orders opnieuw prijzen bij de commit.
+    """
+    invalidate_customer(db, customer_id)
+    db.info.setdefault(_CUSTOMERS_KEY, set()).add(customer_id)
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _track_orm_changes(session: Session, flush_context, instances):
+    for obj in session.new:
+        if isinstance(obj, ServiceOrder):
+            # id is pas na de flush bekend
+            queue_reprice(session, [obj])
+
+    for obj in session.dirty:
+        if isinstance(obj, ServiceOrder):
+            if inspect(obj).attrs.customer_id.history.has_changes():
+                queue_reprice(session, [obj])
+        elif isinstance(obj, Customer):
+            if inspect(obj).attrs.price_type.history.has_changes():
+                queue_reprice_customer(session, obj.id)
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _reprice_before_commit(session: Session):
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+
+    pending = session.info.pop(_ORDERS_KEY, None) or []
+    customer_ids = session.info.pop(_CUSTOMERS_KEY, None)
+
+    order_ids = {o if isinstance(o, int) else o.id for o in pending}
+    if customer_ids:
+        order_ids.update(
+            oid for (oid,) in
+            session.query(ServiceOrder.id).filter(ServiceOrder.customer_id.in_(customer_ids))
+        )
+    order_ids.discard(None)
+
+    if order_ids:
+        reprice_orders(session, order_ids)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _drop_after_rollback(session: Session):
+    session.info.pop(_ORDERS_KEY, None)
+    session.info.pop(_CUSTOMERS_KEY, None)
+
+
+# ----------------------
+# Herberekenen
+# ----------------------
+def reprice_orders(db: Session, order_ids: Iterable[int]) -> int:
+    """
+    Herbereken en bewaar totaal + prijstype van `order_ids` (niet gecommit).
+
+    Per chunk: één query voor de orders, de aggregaten van
+    calculate_totals_for_orders, één bulk-UPDATE en één versie-UPDATE.
+    Alleen orders waarvan totaal of prijstype echt verandert (of die nog
+    nooit geprijsd zijn) worden bijgewerkt en krijgen een nieuwe
+    pricing_version; die versie zit in de idempotency-sleutel van mails.
+    Orders zonder klant krijgen geen totaal / prijstype.
+    """
+    order_ids = sorted(order_ids)
+
+    for i in range(0, len(order_ids), REPRICE_CHUNK_SIZE):
+        chunk = order_ids[i:i + REPRICE_CHUNK_SIZE]
+
+        orders = (
+            db.query(
+                ServiceOrder.id,
+                ServiceOrder.customer_id,
+                ServiceOrder.pricing_total,
+                ServiceOrder.pricing_price_type,
+                ServiceOrder.pricing_version,
+            )
+            .filter(ServiceOrder.id.in_(chunk))
+            .all()
+        )
+        totals = calculate_totals_for_orders(db, orders)
+
+        changed = []
+        for o in orders:
+            total = totals.get(o.id, {}).get("total")
+            price_type = totals.get(o.id, {}).get("price_type")
+            if (
+                not o.pricing_version
+                or total != o.pricing_total
+                or price_type != o.pricing_price_type
+            ):
+                changed.append(
+                    {"id": o.id, "pricing_total": total, "pricing_price_type": price_type}
+                )
+
+        if not changed:
+            continue
+
+        db.execute(update(ServiceOrder), changed)
+        db.execute(
+            update(ServiceOrder)
+            .where(ServiceOrder.id.in_([c["id"] for c in changed]))
+            .values(pricing_version=ServiceOrder.pricing_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    return len(order_ids)
+
+
+def reprice_stale_orders(db: Session) -> int:
+    """
+    Orders die nog nooit geprijsd zijn (bv. van vóór deze kolommen). Commit zelf.
+    """
+    order_ids = [
+        oid for (oid,) in
+        db.query(ServiceOrder.id).filter(ServiceOrder.pricing_version == 0)
+    ]
+    reprice_orders(db, order_ids)
+    db.commit()
+    return len(order_ids)
+
+
+# ----------------------
+# Na een Duallist-import
+# ----------------------
+def refresh_item_prices_from_articles(db: Session) -> list[int]:
+    """
+    Neem gewijzigde artikelprijzen over op regels van orders in
+    REPRICE_STATUSES en herbereken die orders. Commit zelf.
+    Geeft de ids van de bijgewerkte orders terug.
+    """
+    rows = (
+        db.query(ServiceOrderItem.id, ServiceOrderItem.serviceorder_id, Article)
+        .join(ServiceOrder, ServiceOrder.id == ServiceOrderItem.serviceorder_id)
+        .join(Article, Article.part_no == ServiceOrderItem.part_no)
+        .filter(
+            ServiceOrder.status.in_(REPRICE_STATUSES),
+            or_(*[
+                func.coalesce(getattr(ServiceOrderItem, f), -1)
+                != func.coalesce(getattr(Article, f), -1)
+                for f in ITEM_PRICE_FIELDS
+            ]),
+        )
+        .all()
+    )
+    if not rows:
+        return []
+
+    db.execute(
+        update(ServiceOrderItem),
+        [
+            {"id": item_id, **{f: getattr(article, f) for f in ITEM_PRICE_FIELDS}}
+            for item_id, _, article in rows
+        ],
+    )
+
+    lines_per_order: dict[int, int] = {}
+    for _, order_id, _ in rows:
+        lines_per_order[order_id] = lines_per_order.get(order_id, 0) + 1
+    order_ids = sorted(lines_per_order)
+
+    # regels zijn gewijzigd: open editors moeten herladen (PATCH → 409)
+    db.execute(
+        update(ServiceOrder)
+        .where(ServiceOrder.id.in_(order_ids))
+        .values(items_version=ServiceOrder.items_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+    for order in db.query(ServiceOrder).filter(ServiceOrder.id.in_(order_ids)):
+        n = lines_per_order[order.id]
+        log_event(
+            db,
+            order,
+            "PRIJZEN_BIJGEWERKT",
+            f"Prijzen van {n} {'regel' if n == 1 else 'regels'} bijgewerkt na Duallist-import",
+        )
+
+    queue_reprice(db, order_ids)
+    db.commit()
+    return order_ids
+
+
+def run_reprice_after_import():
+    """
+    Achtergrondjob na een geslaagde Duallist-import (eigen sessie).
+    """
+    db = SessionLocal()
+    try:
+        order_ids = refresh_item_prices_from_articles(db)
+        log.info("Na import %s serviceorder(s) opnieuw geprijsd", len(order_ids))
+    except Exception:
+        db.rollback()
+        log.exception("Opnieuw prijzen na import mislukt")
+    finally:
+        db.close()
@@ -1,18 +1,31 @@
 # app/services/orders.py
 
+from fastapi import HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from datetime import datetime
 
 from app.models.serviceorder import ServiceOrder
 from app.models.serviceorder_log import ServiceOrderLog
+from app.schemas.serviceorder import (
+    ServiceOrderStatusEnum,
+    SERVICEORDER_ALLOWED_TRANSITIONS,
+)
+from app.services.change_feed import queue_change
+from app.services.serviceorder_stats import order_key, stage_order_moved
 
+# Unit of work: deze functies zetten wijzigingen alleen klaar in de sessie.
+# De router doet aan het eind van het request één db.commit(); gaat er
+# daarvoor iets mis, dan wordt er niets weggeschreven (get_db sluit → rollback).
+# Change-feed events gaan pas na die commit de deur uit.
 
-def log_event(
+
+def _add_log(
     db: Session,
     order: ServiceOrder,
     action: str,
     message: str,
-):
+) -> ServiceOrderLog:
     log = ServiceOrderLog(
         serviceorder_id=order.id,
         action=action,
@@ -20,7 +33,28 @@ def log_event(
         created_at=datetime.utcnow(),
     )
     db.add(log)
-    db.commit()
+    return log
+
+
+def _queue_status_change(db: Session, order: ServiceOrder, message: str):
+    queue_change(
+        db, "status", order.so, order.supplier_id,
+        status=order.status, action=order.status, message=message,
+    )
+
+
+def log_event(
+    db: Session,
+    order: ServiceOrder,
+    action: str,
+    message: str,
+) -> ServiceOrderLog:
+    log = _add_log(db, order, action, message)
+    queue_change(
+        db, "log", order.so, order.supplier_id,
+        status=order.status, action=action, message=message,
+    )
+    return log
 
 
 def set_order_status(
@@ -31,11 +65,50 @@ def set_order_status(
 ):
     order.status = status
 
-    log_event(
-        db=db,
-        order=order,
-        action=status,
-        message=message,
+    _add_log(db, order, action=status, message=message)
+    _queue_status_change(db, order, message)
+
+
+def transition_order_status(
+    db: Session,
+    order: ServiceOrder,
+    target: ServiceOrderStatusEnum,
+    message: str | None = None,
+):
+    """
+    Statuswijziging volgens de state machine.
+
+    - niet toegestane overgang → 400, er wordt niets klaargezet
+    - de UPDATE is conditioneel op de status die we gelezen hebben;
+      heeft een ander request de status intussen gewijzigd → 409
+    """
+    try:
+        current = ServiceOrderStatusEnum(order.status)
+    except ValueError:
+        raise HTTPException(400, f"Status {order.status} has no transitions")
+
+    if target not in SERVICEORDER_ALLOWED_TRANSITIONS.get(current, []):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Transition {current.value} → {target.value} not allowed",
+        )
+
+    old_key = order_key(order)
+    updated = (
+        db.query(ServiceOrder)
+        .filter(
+            ServiceOrder.id == order.id,
+            ServiceOrder.status == current.value,
+        )
+        .update({ServiceOrder.status: target.value}, synchronize_session=False)
     )
+    if not updated:
+        raise HTTPException(409, "Status was changed by someone else, reload and try again")
+
+    # al weggeschreven via de UPDATE hierboven; niet nogmaals laten flushen
+    set_committed_value(order, "status", target.value)
+    stage_order_moved(db, order.id, old_key, order_key(order))
 
-    db.commit()
+    message = message or f"Status gewijzigd van {current.value} naar {target.value}"
+    _add_log(db, order, action=target.value, message=message)
+    _queue_status_change(db, order, message)
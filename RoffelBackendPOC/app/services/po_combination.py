@@ -0,0 +1,214 @@
+# app/services/po_combination.py
+
+import os
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.serviceorder import ServiceOrder
+from app.models.serviceorder_log import ServiceOrderLog
+from app.models.supplier import Supplier
+from app.services.purchaseorder_orders import serviceorder_order_rows
+
+# Combinatie-engine voor orders in WACHT_OP_COMBINATIE.
+#
+# Per leverancier worden de wachtende orders (met hun in SQL berekende
+# inkooptotaal) over PO's verdeeld die elk het minimum van die leverancier
+# halen. Heuristiek (bin covering):
+#   - een PO begint altijd met de langst wachtende order
+#   - daarna: de kleinste order die het tekort in één keer dekt (best fit,
+#     minste overschot); bestaat die niet, dan de volgende oudste order
+# Wat overblijft (de jongste orders, samen onder het minimum) wacht op
+# de volgende PO; orders die al MAX_COMBINATION_WAIT_DAYS wachten gaan
+# toch mee met de laatste PO.
+
+WAITING_STATUS = "WACHT_OP_COMBINATIE"
+
+DEFAULT_MIN_ORDER_AMOUNT = float(os.getenv("DEFAULT_MIN_ORDER_AMOUNT", "500"))
+MAX_COMBINATION_WAIT_DAYS = float(os.getenv("MAX_COMBINATION_WAIT_DAYS", "14"))
+
+
+@dataclass
+class WaitingOrder:
+    id: int
+    so: str
+    supplier_id: Optional[int]
+    order_total: float
+    waiting_since: datetime
+
+
+@dataclass
+class SupplierCombination:
+    supplier_id: Optional[int]
+    supplier_name: Optional[str]
+    min_order_amount: float
+    purchase_orders: list[list[WaitingOrder]] = field(default_factory=list)
+    waiting: list[WaitingOrder] = field(default_factory=list)
+
+
+def min_order_amount(db: Session, supplier_id: Optional[int]) -> float:
+    """
+    Minimum van de leverancier, of DEFAULT_MIN_ORDER_AMOUNT.
+    """
+    if supplier_id is None:
+        return DEFAULT_MIN_ORDER_AMOUNT
+    value = db.query(Supplier.min_order_amount).filter(Supplier.id == supplier_id).scalar()
+    return DEFAULT_MIN_ORDER_AMOUNT if value is None else value
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def load_waiting_orders(db: Session, supplier_id: Optional[int] = None) -> list[WaitingOrder]:
+    """
+    Wachtende orders met te bestellen regels, met inkooptotaal en het
+    moment waarop ze in WACHT_OP_COMBINATIE kwamen (laatste logregel met die
+    actie, anders created_at). Twee queries, ongeacht het aantal orders.
+    """
+    query = serviceorder_order_rows(db).filter(ServiceOrder.status == WAITING_STATUS)
+    if supplier_id is not None:
+        query = query.filter(ServiceOrder.supplier_id == supplier_id)
+    query = query.add_columns(ServiceOrder.created_at).group_by(ServiceOrder.created_at)
+
+    rows = [r for r in query.all() if r.order_lines]
+    if not rows:
+        return []
+
+    since = dict(
+        db.query(ServiceOrderLog.serviceorder_id, func.max(ServiceOrderLog.created_at))
+        .filter(
+            ServiceOrderLog.serviceorder_id.in_([r.id for r in rows]),
+            ServiceOrderLog.action == WAITING_STATUS,
+        )
+        .group_by(ServiceOrderLog.serviceorder_id)
+        .all()
+    )
+
+    now = datetime.utcnow()
+    return [
+        WaitingOrder(
+            id=r.id,
+            so=r.so,
+            supplier_id=r.supplier_id,
+            order_total=round(float(r.order_total or 0.0), 2),
+            waiting_since=_naive_utc(since.get(r.id) or r.created_at) or now,
+        )
+        for r in rows
+    ]
+
+
+def combine_orders(
+    orders: list[WaitingOrder],
+    minimum: float,
+    now: Optional[datetime] = None,
+    max_wait: timedelta = timedelta(days=MAX_COMBINATION_WAIT_DAYS),
+) -> tuple[list[list[WaitingOrder]], list[WaitingOrder]]:
+    """
+    Verdeel `orders` (één leverancier) over PO's die elk `minimum` halen.
+    Geeft (PO's, overblijvende orders) terug. O(n²) in het slechtste geval,
+    met bisect voor de best-fit stap; honderden orders is geen probleem.
+    """
+    now = now or datetime.utcnow()
+
+    # oudste eerst; bij gelijke wachttijd het grootste bedrag
+    by_age = sorted(orders, key=lambda o: (o.waiting_since, -o.order_total, o.so))
+    # (totaal, positie in by_age) voor best fit
+    by_total = sorted((o.order_total, i) for i, o in enumerate(by_age))
+    used = [False] * len(by_age)
+    remaining_total = sum(o.order_total for o in by_age)
+    oldest = 0
+
+    def _take(i: int):
+        nonlocal remaining_total
+        used[i] = True
+        remaining_total -= by_age[i].order_total
+        del by_total[bisect_left(by_total, (by_age[i].order_total, i))]
+
+    def _next_oldest() -> int:
+        nonlocal oldest
+        while used[oldest]:
+            oldest += 1
+        return oldest
+
+    purchase_orders: list[list[WaitingOrder]] = []
+
+    while by_total and remaining_total >= minimum:
+        i = _next_oldest()
+        _take(i)
+        po = [by_age[i]]
+        total = by_age[i].order_total
+
+        while total < minimum and by_total:
+            need = minimum - total
+            pos = bisect_left(by_total, (need, -1))
+            if pos < len(by_total):
+                i = by_total[pos][1]  # kleinste order die het tekort dekt
+            else:
+                i = _next_oldest()
+            _take(i)
+            po.append(by_age[i])
+            total += by_age[i].order_total
+
+        purchase_orders.append(po)
+
+    waiting = [o for i, o in enumerate(by_age) if not used[i]]
+
+    # te lang gewacht: mee met de laatste PO
+    if purchase_orders:
+        overdue = [o for o in waiting if now - o.waiting_since >= max_wait]
+        if overdue:
+            purchase_orders[-1].extend(overdue)
+            waiting = [o for o in waiting if now - o.waiting_since < max_wait]
+
+    return purchase_orders, waiting
+
+
+def suggest_combinations(db: Session, supplier_id: Optional[int] = None) -> list[SupplierCombination]:
+    """
+    Voorstellen per leverancier (drie queries in totaal).
+    """
+    orders = load_waiting_orders(db, supplier_id)
+
+    per_supplier: dict[Optional[int], list[WaitingOrder]] = {}
+    for o in orders:
+        per_supplier.setdefault(o.supplier_id, []).append(o)
+
+    suppliers = {
+        s.id: s
+        for s in db.query(Supplier).filter(
+            Supplier.id.in_([sid for sid in per_supplier if sid is not None])
+        )
+    } if per_supplier else {}
+
+    now = datetime.utcnow()
+    result = []
+    oldest: dict[Optional[int], datetime] = {}
+    for sid, supplier_orders in per_supplier.items():
+        oldest[sid] = min(o.waiting_since for o in supplier_orders)
+        supplier = suppliers.get(sid)
+        minimum = (
+            supplier.min_order_amount
+            if supplier is not None and supplier.min_order_amount is not None
+            else DEFAULT_MIN_ORDER_AMOUNT
+        )
+        purchase_orders, waiting = combine_orders(supplier_orders, minimum, now=now)
+        result.append(
+            SupplierCombination(
+                supplier_id=sid,
+                supplier_name=supplier.name if supplier else None,
+                min_order_amount=minimum,
+                purchase_orders=purchase_orders,
+                waiting=waiting,
+            )
+        )
+
+    # leveranciers met een klaarstaande PO eerst, dan de langst wachtende
+    result.sort(key=lambda c: (not c.purchase_orders, oldest[c.supplier_id]))
+    return result
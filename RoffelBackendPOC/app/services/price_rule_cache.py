@@ -0,0 +1,201 @@
+# app/services/price_rule_cache.py
+
+import os
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.customer import Customer, CustomerPriceRule
+
+# hoe lang (sec) een klant in het geheugen blijft; andere workers zien
+# gewijzigde prijsregels uiterlijk na deze tijd
+PRICE_RULE_CACHE_TTL = float(os.getenv("PRICE_RULE_CACHE_TTL", "60"))
+PRICE_RULE_CACHE_SIZE = int(os.getenv("PRICE_RULE_CACHE_SIZE", "5000"))
+
+# klanten per IN-query
+LOAD_CHUNK_SIZE = 500
+
+FALLBACK_PRICE_TYPE = "BRUTO"
+
+# sleutel in Session.info: klanten om na commit / rollback nogmaals te vergeten
+_INVALIDATE_KEY = "price_rule_cache_invalidate"
+
+
+@dataclass(frozen=True)
+class PriceTiers:
+    """
+    Prijsregels van één klant als gesorteerde arrays.
+    thresholds[i] = min_amount, price_types[i] = prijstype vanaf dat bedrag.
+    """
+    customer_id: int
+    default_price_type: Optional[str]
+    thresholds: tuple[float, ...]
+    price_types: tuple[str, ...]
+
+    @property
+    def base_price_type(self) -> str:
+        """
+        Prijstype waarmee het basistotaal voor de regelkeuze berekend wordt.
+        """
+        return self.default_price_type or FALLBACK_PRICE_TYPE
+
+    def resolve(self, order_total: float) -> str:
+        """
+        De laatste regel waarvan min_amount bereikt is wint
+        (bisect op de gesorteerde drempels, O(log n)).
+        """
+        i = bisect_right(self.thresholds, order_total) - 1
+        if i >= 0:
+            return self.price_types[i]
+        return self.base_price_type
+
+
+class PriceRuleCache:
+    """
+    customer_id -> PriceTiers (met het standaard-prijstype van de klant).
+
+    - /customers/{id}/price-rules en PUT /customers/{id} invalideren via
+      invalidate_customer (direct in deze worker)
+    - onbekende klanten worden niet gecachet (zodat een nieuwe klant meteen werkt)
+    """
+
+    def __init__(self, ttl: float = PRICE_RULE_CACHE_TTL, size: int = PRICE_RULE_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[int, tuple[float, PriceTiers]] = OrderedDict()
+
+    def get(self, db: Session, customer_id: Optional[int]) -> Optional[PriceTiers]:
+        if customer_id is None:
+            return None
+        return self.get_many(db, [customer_id]).get(customer_id)
+
+    def get_many(self, db: Session, customer_ids: Iterable[int]) -> dict[int, PriceTiers]:
+        """
+        Tiers per klant; onbekende klanten ontbreken in het resultaat.
+        Missers kosten samen één query voor klanten en één voor regels
+        (per LOAD_CHUNK_SIZE).
+        """
+        now = time.monotonic()
+        found: dict[int, PriceTiers] = {}
+        todo: list[int] = []
+
+        with self._lock:
+            for cid in dict.fromkeys(c for c in customer_ids if c is not None):
+                entry = self._entries.get(cid)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(cid)
+                    found[cid] = entry[1]
+                else:
+                    todo.append(cid)
+
+        if not todo:
+            return found
+
+        loaded: dict[int, PriceTiers] = {}
+        for i in range(0, len(todo), LOAD_CHUNK_SIZE):
+            loaded.update(self._load(db, todo[i:i + LOAD_CHUNK_SIZE]))
+
+        if self.ttl > 0:
+            with self._lock:
+                expires = time.monotonic() + self.ttl
+                for cid, tiers in loaded.items():
+                    self._entries[cid] = (expires, tiers)
+                    self._entries.move_to_end(cid)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+
+        found.update(loaded)
+        return found
+
+    def _load(self, db: Session, customer_ids: list[int]) -> dict[int, PriceTiers]:
+        defaults = dict(
+            db.query(Customer.id, Customer.price_type)
+            .filter(Customer.id.in_(customer_ids))
+            .all()
+        )
+
+        rules: dict[int, list[tuple[float, str]]] = {}
+        for cid, min_amount, price_type in (
+            db.query(
+                CustomerPriceRule.customer_id,
+                CustomerPriceRule.min_amount,
+                CustomerPriceRule.price_type,
+            )
+            .filter(CustomerPriceRule.customer_id.in_(list(defaults)))
+            .order_by(
+                CustomerPriceRule.customer_id.asc(),
+                CustomerPriceRule.min_amount.asc(),
+                CustomerPriceRule.id.asc(),
+            )
+        ):
+            rules.setdefault(cid, []).append((min_amount, price_type))
+
+        return {
+            cid: PriceTiers(
+                customer_id=cid,
+                default_price_type=default,
+                thresholds=tuple(r[0] for r in rules.get(cid, [])),
+                price_types=tuple(r[1] for r in rules.get(cid, [])),
+            )
+            for cid, default in defaults.items()
+        }
+
+    def invalidate(self, customer_id: Optional[int] = None):
+        """
+        Vergeet één klant, of alles als `customer_id` None is.
+        """
+        with self._lock:
+            if customer_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(customer_id, None)
+
+
+price_rule_cache = PriceRuleCache()
+
+
+def invalidate_customer(db: Session, customer_id: int):
+    """
+    Prijsregels of standaard-prijstype van een klant gewijzigd in `db`.
+
+    Direct vergeten (zodat deze sessie de nieuwe regels leest) en na de
+    commit / rollback nog eens: wat tussendoor geladen is kan uit de
+    niet-gecommitte transactie komen.
+    """
+    price_rule_cache.invalidate(customer_id)
+    db.info.setdefault(_INVALIDATE_KEY, set()).add(customer_id)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_after_commit(session: Session):
+    for customer_id in session.info.pop(_INVALIDATE_KEY, ()):
+        price_rule_cache.invalidate(customer_id)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _invalidate_after_rollback(session: Session):
+    for customer_id in session.info.pop(_INVALIDATE_KEY, ()):
+        price_rule_cache.invalidate(customer_id)
+
+
+def resolve_price_types(
+    db: Session,
+    requests: list[tuple[int, float]],
+) -> list[Optional[str]]:
+    """
+    Batch: prijstype per (customer_id, totaal), in de volgorde van de aanvraag.
+    None voor onbekende klanten.
+    """
+    tiers = price_rule_cache.get_many(db, [cid for cid, _ in requests])
+    return [
+        tiers[cid].resolve(total) if cid in tiers else None
+        for cid, total in requests
+    ]
@@ -1,9 +1,9 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 from typing import Optional
 
 from app.models.serviceorder_item import ServiceOrderItem
-from app.models.customer import Customer
-from app.models.customer import CustomerPriceRule
+from app.services.price_rule_cache import price_rule_cache
 
 
 def format_currency(value: Optional[float]) -> str:
@@ -30,76 +30,56 @@ def get_price_for_item(item: ServiceOrderItem, price_type: str) -> Optional[floa
     return price_map.get(price_type)
 
 
-def determine_price_type_for_customer(
-    db: Session,
-    customer_id: int,
-    order_total: float,
-    default_price_type: Optional[str],
-) -> str:
-    """
-    Determine the correct price_type based on:
-    - customer price rules
-    - order total
-    - fallback to customer's default price_type
-    """
-
-    rules = (
-        db.query(CustomerPriceRule)
-        .filter(CustomerPriceRule.customer_id == customer_id)
-        .order_by(CustomerPriceRule.min_amount.asc())
-        .all()
-    )
-
-    selected = default_price_type
-
-    for rule in rules:
-        if order_total >= rule.min_amount:
-            selected = rule.price_type
-
-    return selected or default_price_type or "BRUTO"
+# Zelfde mapping als get_price_for_item, maar op kolomniveau (voor SQL-aggregaties)
+PRICE_COLUMNS = {
+    "LIST": ServiceOrderItem.list_price,
+    "BRUTO": ServiceOrderItem.price_bruto,
+    "WVK": ServiceOrderItem.price_wvk,
+    "EDMAC": ServiceOrderItem.price_edmac,
+    "PURCHASE": ServiceOrderItem.price_purchase,
+}
 
 
 def calculate_order_totals(
     db: Session,
     order,
+    items: Optional[list] = None,
 ):
     """
     Calculate pricing for a service order.
+    Pass `items` when they are already loaded to skip the item query.
+    Uses the order's stored price_type (app/services/order_pricing.py)
+    when available, so price rules are only evaluated when it is missing.
     Returns:
     - final price_type
     - total amount
     - per-item pricing breakdown
     """
 
-    items = (
-        db.query(ServiceOrderItem)
-        .filter(ServiceOrderItem.serviceorder_id == order.id)
-        .all()
-    )
+    if items is None:
+        items = (
+            db.query(ServiceOrderItem)
+            .filter(ServiceOrderItem.serviceorder_id == order.id)
+            .all()
+        )
 
-    customer = (
-        db.query(Customer)
-        .filter(Customer.name == order.customer.name)
-        .first()
-    )
+    final_price_type = getattr(order, "pricing_price_type", None)
 
-    if not customer:
-        raise ValueError("Customer not found for serviceorder")
+    if final_price_type is None:
+        tiers = price_rule_cache.get(db, order.customer_id)
 
-    # Step 1: base total for price-rule selection
-    base_total = 0.0
-    for item in items:
-        price = get_price_for_item(item, customer.price_type or "BRUTO")
-        if price:
-            base_total += price * (item.qty or 0)
-
-    # Step 2: determine final price type
-    final_price_type = determine_price_type_for_customer(
-        db=db,
-        customer_id=customer.id,
-        order_total=base_total,
-        default_price_type=customer.price_type,
-    )
+        if not tiers:
+            raise ValueError("Customer not found for serviceorder")
+
+        # Step 1: base total for price-rule selection
+        base_total = 0.0
+        for item in items:
+            price = get_price_for_item(item, tiers.base_price_type)
+            if price:
+                base_total += price * (item.qty or 0)
+
+        # Step 2: determine final price type
+        final_price_type = tiers.resolve(base_total)
 
     # Step 3: calculate final totals
     final_total = 0.0
@@ -113,6 +93,7 @@ def calculate_order_totals(
         final_total += line_total
 
         priced_items.append({
+            "item_id": item.id,
             "part_no": item.part_no,
             "description": item.description,
             "qty": qty,
@@ -125,3 +106,71 @@ def calculate_order_totals(
         "total": round(final_total, 2),
         "items": priced_items,
     }
+
+
+def calculate_totals_for_orders(
+    db: Session,
+    orders: list,
+) -> dict[int, dict]:
+    """
+    Set-based variant of calculate_order_totals for list views.
+
+    Uses one aggregate query over the items (grouped by serviceorder_id);
+    customers and price rules come from the tier cache (at most one query
+    each for the customers not cached yet), regardless of the number of
+    orders.
+
+    Returns {serviceorder_id: {"price_type": ..., "total": ...}}.
+    Orders without a (known) customer are left out.
+    """
+    order_ids = [o.id for o in orders]
+    if not order_ids:
+        return {}
+
+    price_types = list(PRICE_COLUMNS.keys())
+
+    # 1️⃣ per order de som per prijskolom
+    rows = (
+        db.query(
+            ServiceOrderItem.serviceorder_id,
+            *[
+                func.coalesce(
+                    func.sum(func.coalesce(ServiceOrderItem.qty, 0) * col),
+                    0.0,
+                )
+                for col in PRICE_COLUMNS.values()
+            ],
+        )
+        .filter(ServiceOrderItem.serviceorder_id.in_(order_ids))
+        .group_by(ServiceOrderItem.serviceorder_id)
+        .all()
+    )
+
+    sums_per_order = {
+        row[0]: dict(zip(price_types, row[1:]))
+        for row in rows
+    }
+
+    # 2️⃣ prijsregels per klant (cache)
+    tiers_per_customer = price_rule_cache.get_many(
+        db, {o.customer_id for o in orders if o.customer_id}
+    )
+
+    # 3️⃣ prijstype + totaal per order
+    result = {}
+
+    for order in orders:
+        tiers = tiers_per_customer.get(order.customer_id)
+        if not tiers:
+            continue
+
+        sums = sums_per_order.get(order.id, {})
+
+        final_price_type = tiers.resolve(sums.get(tiers.base_price_type) or 0.0)
+
+        result[order.id] = {
+            "price_type": final_price_type,
+            "total": round(sums.get(final_price_type) or 0.0, 2),
+        }
+
+    return result
@@ -1,8 +1,8 @@
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from app.models.purchaseorder_number import PurchaseOrderNumber, PurchaseOrderNrStatus
+from app.services.number_allocator import NumberAllocator, NumberPool
 
 
 def _format_po_number(year: int, month: int, seq: int) -> str:
@@ -12,33 +12,34 @@ def _format_po_number(year: int, month: int, seq: int) -> str:
     return f"{yy}{mm}{xxx}"
 
 
+PO_NUMBER_ALLOCATOR = NumberAllocator(
+    model=PurchaseOrderNumber,
+    status_enum=PurchaseOrderNrStatus,
+    number_attr="po_number",
+    period_attrs=("year", "month"),     # sequence begint elke maand opnieuw
+    formatter=_format_po_number,
+)
+
+po_number_pool = NumberPool(PO_NUMBER_ALLOCATOR)
+
+
 def reserve_next_purchaseorder_number(db: Session, reserved_by: str) -> PurchaseOrderNumber:
-    now = datetime.utcnow()
-    year = now.year
-    month = now.month
-
-    max_seq = (
-        db.query(func.max(PurchaseOrderNumber.sequence))
-        .filter(PurchaseOrderNumber.year == year)
-        .filter(PurchaseOrderNumber.month == month)
-        .scalar()
-    ) or 0
-
-    next_seq = max_seq + 1
-    po_number = _format_po_number(year, month, next_seq)
-
-    rec = PurchaseOrderNumber(
-        po_number=po_number,
-        year=year,
-        month=month,
-        sequence=next_seq,
-        date=now,
-        status=PurchaseOrderNrStatus.RESERVED,
-        reserved_by=reserved_by,
-        reserved_at=now,
+    po_number = po_number_pool.take(db, reserved_by)
+
+    return (
+        db.query(PurchaseOrderNumber)
+        .filter(PurchaseOrderNumber.po_number == po_number)
+        .one()
     )
 
-    db.add(rec)
-    db.commit()
-    db.refresh(rec)
-    return rec
+
+def reserve_purchaseorder_numbers(
+    db: Session,
+    reserved_by: str,
+    count: int,
+    date_: datetime | None = None,
+) -> list[str]:
+    """
+    Reserveer een blok PO-nummers in één transactie.
+    """
+    return PO_NUMBER_ALLOCATOR.allocate(db, reserved_by, count, date_)
@@ -1,36 +1,258 @@
+from sqlalchemy import case, delete, func, insert, update
 from sqlalchemy.orm import Session
 from datetime import datetime
 
-from app.models.purchaseorder_number import PurchaseOrderNumber, PurchaseOrderNrStatus
+from app.models.purchaseorder_number import PurchaseOrderNumber, PurchaseOrderServiceOrderLink, PurchaseOrderNrStatus
 from app.models.serviceorder_item import ServiceOrderItem
 from app.models.serviceorder import ServiceOrder
+from app.models.serviceorder_log import ServiceOrderLog
+from app.services.change_feed import queue_change
+from app.services.serviceorder_stats import stats_key, stage_order_moved
+
+ORDERED_STATUS = "BESTELD"
+
+# Bestellen van een PO is set-based: het aantal queries hangt niet af van
+# het aantal gekoppelde serviceorders (2 of 200).
 
 
 def collect_order_items_from_serviceorders(
     db: Session,
     so_numbers: list[str],
 ):
-    items = []
+    """
+    Te bestellen regels van de serviceorders `so_numbers` (één query).
+    """
+    if not so_numbers:
+        return []
+
+    return (
+        db.query(ServiceOrderItem)
+        .join(ServiceOrder, ServiceOrder.id == ServiceOrderItem.serviceorder_id)
+        .filter(ServiceOrder.so.in_(so_numbers))
+        .filter(ServiceOrderItem.bestellen == True)
+        .all()
+    )
+
+
+def serviceorder_order_rows(db: Session):
+    """
+    Per serviceorder: id, so, status, supplier_id, employee en (in SQL
+    berekend) het aantal te bestellen regels, het aantal daarvan nog open
+    en het inkooptotaal van de te bestellen regels.
+    """
+    return (
+        db.query(
+            ServiceOrder.id,
+            ServiceOrder.so,
+            ServiceOrder.status,
+            ServiceOrder.supplier_id,
+            ServiceOrder.employee,
+            func.count(ServiceOrderItem.id).label("order_lines"),
+            func.coalesce(
+                func.sum(case((ServiceOrderItem.ontvangen == False, 1), else_=0)),
+                0,
+            ).label("open_lines"),
+            func.coalesce(
+                func.sum(
+                    func.coalesce(ServiceOrderItem.price_purchase, 0)
+                    * func.coalesce(ServiceOrderItem.qty, 0)
+                ),
+                0.0,
+            ).label("order_total"),
+        )
+        .outerjoin(
+            ServiceOrderItem,
+            (ServiceOrderItem.serviceorder_id == ServiceOrder.id)
+            & (ServiceOrderItem.bestellen == True),
+        )
+        .group_by(
+            ServiceOrder.id,
+            ServiceOrder.so,
+            ServiceOrder.status,
+            ServiceOrder.supplier_id,
+            ServiceOrder.employee,
+        )
+    )
+
+
+def collect_po_serviceorders(db: Session, purchase_order_id: int) -> list:
+    """
+    Eén query over purchase_order_serviceorders → serviceorders →
+    serviceorder_items; zie serviceorder_order_rows voor de kolommen.
+    Gekoppelde SO-nummers zonder serviceorder vallen weg.
+    """
+    return (
+        serviceorder_order_rows(db)
+        .join(
+            PurchaseOrderServiceOrderLink,
+            PurchaseOrderServiceOrderLink.so_number == ServiceOrder.so,
+        )
+        .filter(PurchaseOrderServiceOrderLink.purchase_order_id == purchase_order_id)
+        .order_by(ServiceOrder.so.asc())
+        .all()
+    )
+
+
+def po_order_total(db: Session, purchase_order_id: int) -> float:
+    """
+    Inkooptotaal van de te bestellen regels van alle gekoppelde serviceorders
+    (één aggregaat-query).
+    """
+    total = (
+        db.query(
+            func.coalesce(
+                func.sum(
+                    func.coalesce(ServiceOrderItem.price_purchase, 0)
+                    * func.coalesce(ServiceOrderItem.qty, 0)
+                ),
+                0.0,
+            )
+        )
+        .select_from(PurchaseOrderServiceOrderLink)
+        .join(ServiceOrder, ServiceOrder.so == PurchaseOrderServiceOrderLink.so_number)
+        .join(ServiceOrderItem, ServiceOrderItem.serviceorder_id == ServiceOrder.id)
+        .filter(
+            PurchaseOrderServiceOrderLink.purchase_order_id == purchase_order_id,
+            ServiceOrderItem.bestellen == True,
+        )
+        .scalar()
+    )
+    return round(total or 0.0, 2)
+
+
+def sync_po_serviceorder_links(
+    db: Session,
+    purchase_order_id: int,
+    so_numbers: list[str],
+) -> tuple[list[str], list[str], list[str]]:
+    """
+    Maak de koppelingen van een PO gelijk aan `so_numbers` door alleen het
+    verschil weg te schrijven: één DELETE voor wat weg moet, één bulk-insert
+    voor wat erbij komt. Commit niet.
+
+    Geeft (toegevoegd, verwijderd, onbekende SO-nummers) terug; bij onbekende
+    nummers wordt er niets gewijzigd.
+    """
+    wanted = list(dict.fromkeys(so_numbers))
 
-    for so in so_numbers:
-        so_items = (
-            db.query(ServiceOrderItem)
-            .filter(ServiceOrderItem.serviceorder_id == so)
-            .filter(ServiceOrderItem.bestellen == True)
-            .all()
+    # 1️⃣ alle nummers in één IN-query valideren
+    known = {
+        so for (so,) in
+        db.query(ServiceOrder.so).filter(ServiceOrder.so.in_(wanted))
+    } if wanted else set()
+    unknown = [so for so in wanted if so not in known]
+    if unknown:
+        return [], [], unknown
+
+    # 2️⃣ verschil met de huidige koppelingen
+    current = {
+        so for (so,) in
+        db.query(PurchaseOrderServiceOrderLink.so_number)
+        .filter(PurchaseOrderServiceOrderLink.purchase_order_id == purchase_order_id)
+    }
+    added = [so for so in wanted if so not in current]
+    removed = sorted(current - set(wanted))
+
+    # 3️⃣ alleen de wijzigingen
+    if removed:
+        db.execute(
+            delete(PurchaseOrderServiceOrderLink)
+            .where(
+                PurchaseOrderServiceOrderLink.purchase_order_id == purchase_order_id,
+                PurchaseOrderServiceOrderLink.so_number.in_(removed),
+            )
+            .execution_options(synchronize_session=False)
+        )
+    if added:
+        db.execute(
+            insert(PurchaseOrderServiceOrderLink),
+            [{"purchase_order_id": purchase_order_id, "so_number": so} for so in added],
         )
-        items.extend(so_items)
 
-    return items
+    return added, removed, []
 
 
-def mark_serviceorder_as_ordered(db: Session, so_number: str):
-    so = (
-        db.query(ServiceOrder)
-        .filter(ServiceOrder.so == so_number)
-        .first()
+def mark_serviceorders_as_ordered(
+    db: Session,
+    rows: list,
+    po_number: str | None = None,
+):
+    """
+    Zet de serviceorders uit collect_po_serviceorders op BESTELD:
+    één UPDATE, één bulk-insert van logregels, stats-delta's en
+    change-feed events (na de commit). Commit niet.
+    """
+    if not rows:
+        return
+
+    # 1️⃣ stats: delta's uit de rijen die we al hebben (geen extra queries)
+    for r in rows:
+        stage_order_moved(
+            db,
+            r.id,
+            stats_key(r.status, r.supplier_id, r.employee),
+            stats_key(ORDERED_STATUS, r.supplier_id, r.employee),
+            open_lines=r.open_lines,
+        )
+
+    # 2️⃣ statussen in één keer
+    db.execute(
+        update(ServiceOrder)
+        .where(ServiceOrder.id.in_([r.id for r in rows]))
+        .values(status=ORDERED_STATUS)
+        .execution_options(synchronize_session="fetch")
     )
 
-    if so:
-        so.status = "BESTELD"
-        db.add(so)
+    # 3️⃣ logregels in één keer
+    message = f"Besteld via PO {po_number}" if po_number else "Besteld"
+    now = datetime.utcnow()
+    db.execute(
+        insert(ServiceOrderLog),
+        [
+            {
+                "serviceorder_id": r.id,
+                "action": ORDERED_STATUS,
+                "message": message,
+                "created_at": now,
+            }
+            for r in rows
+        ],
+    )
+
+    for r in rows:
+        queue_change(
+            db, "po_placed", r.so, r.supplier_id,
+            status=ORDERED_STATUS, action=ORDERED_STATUS, po_number=po_number,
+        )
+
+
+def mark_serviceorder_as_ordered(db: Session, so_number: str, po_number: str | None = None):
+    """
+    Losse serviceorder op BESTELD zetten (zelfde pad als een hele PO).
+    """
+    rows = serviceorder_order_rows(db).filter(ServiceOrder.so == so_number).all()
+    mark_serviceorders_as_ordered(db, rows, po_number)
+
+
+def confirm_purchaseorder(db: Session, po: PurchaseOrderNumber, order_total: float) -> bool:
+    """
+    RESERVED → CONFIRMED, conditioneel op de status (twee keer tegelijk
+    bestellen kan niet). False als een ander request de PO al bevestigd heeft.
+    """
+    confirmed_at = datetime.utcnow()
+    updated = (
+        db.query(PurchaseOrderNumber)
+        .filter(
+            PurchaseOrderNumber.id == po.id,
+            PurchaseOrderNumber.status == PurchaseOrderNrStatus.RESERVED,
+        )
+        .update(
+            {
+                PurchaseOrderNumber.status: PurchaseOrderNrStatus.CONFIRMED,
+                PurchaseOrderNumber.order_total: order_total,
+                PurchaseOrderNumber.confirmed_at: confirmed_at,
+            },
+            synchronize_session="fetch",
+        )
+    )
+    return bool(updated)
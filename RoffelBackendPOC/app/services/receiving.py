@@ -0,0 +1,276 @@
+# app/services/receiving.py
+
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from app.database import lock_for_write
+from app.models.serviceorder import ServiceOrder
+from app.models.serviceorder_item import ServiceOrderItem
+from app.models.serviceorder_log import ServiceOrderLog
+from app.services.change_feed import queue_change
+from app.services.serviceorder_stats import (
+    order_key,
+    stage_open_lines,
+    stage_order_moved,
+    stats_key,
+)
+
+
+def _open_qty(item: ServiceOrderItem) -> int:
+    return max((item.qty or 0) - (item.qty_received or 0), 0)
+
+
+def _apply_receipts(
+    db: Session,
+    receipts: list[tuple[ServiceOrderItem, int]],
+    orders: dict[int, ServiceOrder],
+) -> dict:
+    """
+    Boek ontvangsten, logregels en statuswijzigingen (nog niet gecommit).
+
+    `receipts` = [(item, aantal)], `orders` = {serviceorder_id: order}.
+    Aantal statements: één UPDATE per regel-batch, één telling voor alle
+    orders samen, één status-UPDATE, één INSERT voor alle logregels.
+    """
+    now = datetime.utcnow()
+
+    # 1️⃣ regels bijwerken (bulk UPDATE op primary key)
+    item_rows = []
+    received = []
+    closed_lines: dict[int, int] = {}
+    for item, qty in receipts:
+        qty_received = (item.qty_received or 0) + qty
+        done = qty_received >= (item.qty or 0)
+        if done and not item.ontvangen:
+            closed_lines[item.serviceorder_id] = closed_lines.get(item.serviceorder_id, 0) + 1
+        item_rows.append({
+            "id": item.id,
+            "qty_received": qty_received,
+            "ontvangen": done,
+            "received_at": now if done else item.received_at,
+        })
+        received.append((item, qty))
+
+    if item_rows:
+        db.execute(update(ServiceOrderItem), item_rows)
+
+    order_ids = list(dict.fromkeys(item.serviceorder_id for item, _ in received))
+    if not order_ids:
+        return {"received": [], "orders": []}
+
+    # 2️⃣ resterende bestelde regels per order (één query)
+    remaining = dict(
+        db.query(ServiceOrderItem.serviceorder_id, func.count(ServiceOrderItem.id))
+        .filter(
+            ServiceOrderItem.serviceorder_id.in_(order_ids),
+            ServiceOrderItem.bestellen == True,
+            ServiceOrderItem.ontvangen == False,
+        )
+        .group_by(ServiceOrderItem.serviceorder_id)
+        .all()
+    )
+
+    # 3️⃣ status + log per order
+    complete = [oid for oid in order_ids if not remaining.get(oid)]
+
+    # dashboard-tellers; vóór de status-UPDATE, die ook de orders in de sessie bijwerkt
+    for oid in order_ids:
+        order = orders[oid]
+        stage_open_lines(db, order_key(order), -closed_lines.get(oid, 0))
+        if oid in complete:
+            stage_order_moved(
+                db, oid, order_key(order),
+                stats_key("ONTVANGEN", order.supplier_id, order.employee),
+                open_lines=remaining.get(oid, 0),
+            )
+
+    if complete:
+        db.execute(
+            update(ServiceOrder)
+            .where(ServiceOrder.id.in_(complete))
+            .values(status="ONTVANGEN")
+        )
+
+    db.execute(
+        update(ServiceOrder)
+        .where(ServiceOrder.id.in_(order_ids))
+        .values(items_version=ServiceOrder.items_version + 1)
+    )
+
+    parts_per_order: dict[int, list[str]] = {}
+    for item, qty in received:
+        label = item.part_no if qty == (item.qty or 0) else f"{item.part_no} ({qty}x)"
+        parts_per_order.setdefault(item.serviceorder_id, []).append(label)
+
+    log_rows = []
+    for oid in order_ids:
+        parts = ", ".join(parts_per_order[oid])
+        if oid in complete:
+            log_rows.append({
+                "serviceorder_id": oid,
+                "action": "ONTVANGEN",
+                "message": "Alle bestelde artikelen zijn ontvangen",
+                "created_at": now,
+            })
+        else:
+            log_rows.append({
+                "serviceorder_id": oid,
+                "action": "DEELONTVANGST",
+                "message": (
+                    f"Artikel {parts} ontvangen"
+                    if len(parts_per_order[oid]) == 1
+                    else f"Artikelen {parts} ontvangen"
+                ),
+                "created_at": now,
+            })
+    db.execute(insert(ServiceOrderLog), log_rows)
+
+    for row in log_rows:
+        order = orders[row["serviceorder_id"]]
+        queue_change(
+            db, "receipt", order.so, order.supplier_id,
+            status="ONTVANGEN" if row["action"] == "ONTVANGEN" else order.status,
+            action=row["action"],
+            message=row["message"],
+            parts=parts_per_order[row["serviceorder_id"]],
+        )
+
+    # nu opbouwen; na de commit van de router zijn de ORM-objecten verlopen
+    return {
+        "received": [
+            {
+                "so": orders[item.serviceorder_id].so,
+                "item_id": item.id,
+                "part_no": item.part_no,
+                "qty": qty,
+            }
+            for item, qty in received
+        ],
+        "orders": [
+            {
+                "so": orders[oid].so,
+                "status": "ONTVANGEN" if oid in complete else orders[oid].status,
+                "remaining": remaining.get(oid, 0),
+            }
+            for oid in order_ids
+        ],
+    }
+
+
+def receive_order_items(
+    db: Session,
+    order: ServiceOrder,
+    lines: list[tuple[int, Optional[int]]],
+) -> dict:
+    """
+    Ontvangst van regels binnen één order: [(item_id, aantal of None = rest)].
+    """
+    lock_for_write(db)
+
+    item_ids = [item_id for item_id, _ in lines]
+    items = {
+        i.id: i
+        for i in (
+            db.query(ServiceOrderItem)
+            .filter(
+                ServiceOrderItem.serviceorder_id == order.id,
+                ServiceOrderItem.id.in_(item_ids),
+            )
+            .with_for_update()
+            .all()
+        )
+    }
+
+    missing = [item_id for item_id in item_ids if item_id not in items]
+    if missing:
+        raise HTTPException(404, f"Items not found on this serviceorder: {missing}")
+
+    receipts: dict[int, int] = {}
+    for item_id, qty in lines:
+        item = items[item_id]
+        if not item.bestellen:
+            raise HTTPException(400, f"Item {item.part_no} was not ordered")
+
+        open_qty = _open_qty(item) - receipts.get(item_id, 0)
+        qty = open_qty if qty is None else qty
+        if qty <= 0 and open_qty <= 0:
+            raise HTTPException(400, f"Item {item.part_no} is already received")
+        if qty <= 0 or qty > open_qty:
+            raise HTTPException(
+                400,
+                f"Invalid quantity for {item.part_no}: {qty} (open: {open_qty})",
+            )
+        receipts[item_id] = receipts.get(item_id, 0) + qty
+
+    return _apply_receipts(
+        db,
+        [(items[item_id], qty) for item_id, qty in receipts.items()],
+        {order.id: order},
+    )
+
+
+def receive_delivery(
+    db: Session,
+    lines: list[tuple[str, int]],
+    supplier_id: Optional[int] = None,
+) -> dict:
+    """
+    Leveringsbon over meerdere orders: [(part_no, aantal)].
+
+    Aantallen worden verdeeld over openstaande bestelde regels van
+    orders met status BESTELD, oudste order eerst. Wat niet past komt
+    terug als `unmatched`.
+    """
+    lock_for_write(db)
+
+    wanted: dict[str, int] = {}
+    for part_no, qty in lines:
+        if qty <= 0:
+            raise HTTPException(400, f"Invalid quantity for {part_no}: {qty}")
+        wanted[part_no] = wanted.get(part_no, 0) + qty
+
+    query = (
+        db.query(ServiceOrderItem, ServiceOrder)
+        .join(ServiceOrder, ServiceOrder.id == ServiceOrderItem.serviceorder_id)
+        .filter(
+            ServiceOrderItem.part_no.in_(list(wanted)),
+            ServiceOrderItem.bestellen == True,
+            ServiceOrderItem.ontvangen == False,
+            ServiceOrder.status == "BESTELD",
+        )
+    )
+    if supplier_id is not None:
+        query = query.filter(ServiceOrder.supplier_id == supplier_id)
+
+    rows = (
+        query
+        .order_by(ServiceOrder.created_at.asc(), ServiceOrder.id.asc(), ServiceOrderItem.id.asc())
+        .with_for_update()
+        .all()
+    )
+
+    receipts: list[tuple[ServiceOrderItem, int]] = []
+    orders: dict[int, ServiceOrder] = {}
+
+    for item, order in rows:
+        left = wanted.get(item.part_no, 0)
+        if left <= 0:
+            continue
+        qty = min(left, _open_qty(item))
+        if qty <= 0:
+            continue
+        wanted[item.part_no] = left - qty
+        receipts.append((item, qty))
+        orders[order.id] = order
+
+    result = _apply_receipts(db, receipts, orders)
+    result["unmatched"] = [
+        {"part_no": part_no, "qty": qty}
+        for part_no, qty in wanted.items()
+        if qty > 0
+    ]
+    return result
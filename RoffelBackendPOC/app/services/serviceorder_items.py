@@ -0,0 +1,164 @@
+# app/services/serviceorder_items.py
+
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session
+
+from app.models.serviceorder import ServiceOrder
+from app.models.serviceorder_item import ServiceOrderItem
+from app.schemas.serviceorder_item import ServiceOrderItemIn, ServiceOrderItemsPatch, ServiceOrderItemOut
+from app.services.order_pricing import queue_reprice
+from app.services.serviceorder_stats import count_open_lines, order_key, stage_open_lines
+
+
+def bump_items_version(db: Session, order: ServiceOrder, expected: Optional[int] = None) -> int:
+    """
+    Verhoog items_version van een order (in de lopende transactie).
+
+    Met `expected` alleen als de versie nog gelijk is → anders 409.
+    De UPDATE zet meteen een write-lock op de order, zodat gelijktijdige
+    wijzigingen op dezelfde order na elkaar worden uitgevoerd.
+    """
+    query = db.query(ServiceOrder).filter(ServiceOrder.id == order.id)
+    if expected is not None:
+        query = query.filter(ServiceOrder.items_version == expected)
+
+    updated = query.update(
+        {ServiceOrder.items_version: ServiceOrder.items_version + 1},
+        synchronize_session=False,
+    )
+    if not updated:
+        raise HTTPException(
+            409,
+            "Items were changed by someone else, reload and try again",
+        )
+
+    return db.query(ServiceOrder.items_version).filter(ServiceOrder.id == order.id).scalar()
+
+
+def item_insert_values(item: ServiceOrderItemIn) -> dict:
+    """
+    Kolomwaarden voor een nieuwe regel. Een regel die als ontvangen binnenkomt
+    is volledig ontvangen (ontvangst en open-regeltellers gaan uit van
+    ontvangen ⇔ qty_received >= qty).
+    """
+    values = item.model_dump()
+    if values.get("ontvangen"):
+        values["qty_received"] = max(values["qty_received"], values["qty"] or 0)
+    return values
+
+
+def apply_items_patch(db: Session, order: ServiceOrder, patch: ServiceOrderItemsPatch) -> dict:
+    """
+    Zet toegevoegde / gewijzigde / verwijderde regels klaar (de router commit).
+
+    Het aantal statements hangt af van de soorten wijzigingen,
+    niet van het aantal regels in de order.
+    """
+    changed_ids = [c.id for c in patch.changed]
+    removed_ids = list(dict.fromkeys(patch.removed))
+
+    if set(changed_ids) & set(removed_ids):
+        raise HTTPException(400, "Item cannot be both changed and removed")
+    if len(set(changed_ids)) != len(changed_ids):
+        raise HTTPException(400, "Item changed more than once")
+    if any("part_no" in c.model_fields_set and not c.part_no for c in patch.changed):
+        raise HTTPException(400, "part_no cannot be empty")
+
+    version = bump_items_version(db, order, patch.expected_version)
+
+    # 1️⃣ alle genoemde ids moeten bij deze order horen (één IN-query)
+    referenced = set(changed_ids) | set(removed_ids)
+    if referenced:
+        known = {
+            row[0]
+            for row in db.query(ServiceOrderItem.id).filter(
+                ServiceOrderItem.serviceorder_id == order.id,
+                ServiceOrderItem.id.in_(referenced),
+            )
+        }
+        unknown = referenced - known
+        if unknown:
+            raise HTTPException(
+                404,
+                f"Items not found on this serviceorder: {sorted(unknown)}",
+            )
+
+    open_before = count_open_lines(db, [order.id]).get(order.id, 0)
+
+    # 2️⃣ verwijderen
+    if removed_ids:
+        db.execute(
+            delete(ServiceOrderItem)
+            .where(
+                ServiceOrderItem.serviceorder_id == order.id,
+                ServiceOrderItem.id.in_(removed_ids),
+            )
+        )
+
+    # 3️⃣ wijzigen (bulk UPDATE op primary key, alleen meegestuurde velden)
+    if patch.changed:
+        now = datetime.utcnow()
+
+        # huidige ontvangst van regels waarvan qty of ontvangen wijzigt
+        touched = [c.id for c in patch.changed if {"qty", "ontvangen"} & c.model_fields_set]
+        current = {
+            row.id: row
+            for row in db.query(
+                ServiceOrderItem.id,
+                ServiceOrderItem.qty,
+                ServiceOrderItem.qty_received,
+                ServiceOrderItem.ontvangen,
+            ).filter(ServiceOrderItem.id.in_(touched))
+        } if touched else {}
+
+        rows = []
+        for change in patch.changed:
+            values = change.model_dump(exclude_unset=True)
+            cur = current.get(change.id)
+            if cur is not None:
+                # ontvangen en qty_received blijven met elkaar kloppen
+                qty = (values["qty"] if "qty" in values else cur.qty) or 0
+                if "ontvangen" in values:
+                    values["ontvangen"] = bool(values["ontvangen"])
+                    values["qty_received"] = qty if values["ontvangen"] else 0
+                elif cur.qty_received:
+                    values["ontvangen"] = cur.qty_received >= qty
+
+                if "ontvangen" in values and (
+                    values["ontvangen"] != bool(cur.ontvangen) or "ontvangen" in change.model_fields_set
+                ):
+                    values["received_at"] = now if values["ontvangen"] else None
+            if len(values) > 1:
+                rows.append(values)
+        if rows:
+            db.execute(update(ServiceOrderItem), rows)
+
+    # 4️⃣ toevoegen (bulk INSERT ... RETURNING)
+    added = []
+    if patch.added:
+        inserted = db.scalars(
+            insert(ServiceOrderItem).returning(ServiceOrderItem),
+            [
+                {"serviceorder_id": order.id, **item_insert_values(item)}
+                for item in patch.added
+            ],
+        ).all()
+        # vóór de commit serialiseren (anders per regel een refresh-query)
+        added = [ServiceOrderItemOut.model_validate(i) for i in inserted]
+
+    # 5️⃣ dashboard-tellers + bewaarde prijs
+    if patch.added or patch.changed or removed_ids:
+        open_after = count_open_lines(db, [order.id]).get(order.id, 0)
+        stage_open_lines(db, order_key(order), open_after - open_before)
+        queue_reprice(db, [order.id])
+
+    return {
+        "items_version": version,
+        "added": added,
+        "changed": changed_ids,
+        "removed": removed_ids,
+    }
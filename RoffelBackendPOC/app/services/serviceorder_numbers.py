@@ -3,6 +3,7 @@ from datetime import datetime
 from fastapi import HTTPException
 
 from app.models.serviceorder_number import ServiceOrderNumber, ServiceOrderNrStatus
+from app.services.number_allocator import NumberAllocator, NumberPool
 
 
 
@@ -13,65 +14,46 @@ def format_so_number(year: int, month: int, sequence: int) -> str:
     seq = f"{sequence:04d}"
     return f"{yy}{mm}{seq}"
 
+SO_NUMBER_ALLOCATOR = NumberAllocator(
+    model=ServiceOrderNumber,
+    status_enum=ServiceOrderNrStatus,
+    number_attr="so_number",
+    period_attrs=("year",),     # sequence loopt per jaar door
+    formatter=format_so_number,
+)
+
+so_number_pool = NumberPool(SO_NUMBER_ALLOCATOR)
+
+
 def reserve_next_serviceorder_number(
     db: Session,
     reserved_by: str,
     date_: datetime | None = None,
 ) -> ServiceOrderNumber:
 
-    now = date_ or datetime.utcnow()
-    year = now.year
-    month = now.month
+    if date_:
+        # afwijkende datum → buiten de pool om
+        so_number = SO_NUMBER_ALLOCATOR.allocate(db, reserved_by, 1, date_)[0]
+    else:
+        so_number = so_number_pool.take(db, reserved_by)
 
-    # 🔒 SQLite write-lock
-    db.connection().exec_driver_sql("BEGIN IMMEDIATE")
-
-    # 1️⃣ hergebruik eerst FREE nummers binnen dit jaar
-    free = (
+    return (
         db.query(ServiceOrderNumber)
-        .filter(
-            ServiceOrderNumber.year == year,
-            ServiceOrderNumber.status == ServiceOrderNrStatus.FREE
-        )
-        .order_by(ServiceOrderNumber.sequence.asc())
-        .first()
-    )
-
-    if free:
-        free.status = ServiceOrderNrStatus.RESERVED
-        free.reserved_by = reserved_by
-        free.reserved_at = now
-        db.commit()
-        return free
-
-    # 2️⃣ bepaal volgende sequence binnen dit jaar
-    last_seq = (
-        db.query(ServiceOrderNumber.sequence)
-        .filter(ServiceOrderNumber.year == year)
-        .order_by(ServiceOrderNumber.sequence.desc())
-        .first()
-    )
-
-    next_seq = last_seq[0] + 1 if last_seq else 1
-
-    so_number = format_so_number(year, month, next_seq)
-
-    rec = ServiceOrderNumber(
-        so_number=so_number,
-        year=year,
-        month=month,
-        sequence=next_seq,
-        date=now,
-        status=ServiceOrderNrStatus.RESERVED,
-        reserved_by=reserved_by,
-        reserved_at=now,
+        .filter(ServiceOrderNumber.so_number == so_number)
+        .one()
     )
 
-    db.add(rec)
-    db.commit()
-    db.refresh(rec)
 
-    return rec
+def reserve_serviceorder_numbers(
+    db: Session,
+    reserved_by: str,
+    count: int,
+    date_: datetime | None = None,
+) -> list[str]:
+    """
+    Reserveer een blok nummers in één transactie (bv. voor de werkplaats).
+    """
+    return SO_NUMBER_ALLOCATOR.allocate(db, reserved_by, count, date_)
 
 
 def confirm_serviceorder_number(
@@ -0,0 +1,277 @@
+# app/services/serviceorder_queries.py
+
+import base64
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.serviceorder import ServiceOrder
+from app.models.serviceorder_item import ServiceOrderItem
+from app.models.serviceorder_log import ServiceOrderLog
+from app.models.customer import Customer
+from app.models.supplier import Supplier
+from app.schemas.serviceorder import (
+    ServiceOrderStatusEnum,
+    SERVICEORDER_ALLOWED_TRANSITIONS,
+)
+from app.services.pricing import calculate_order_totals
+
+
+# platte kolommen voor het overzicht (geen ORM-objecten / relaties)
+OVERVIEW_COLUMNS = (
+    ServiceOrder.id,
+    ServiceOrder.so,
+    ServiceOrder.supplier_id,
+    ServiceOrder.customer_id,
+    ServiceOrder.customer_ref,
+    ServiceOrder.po,
+    ServiceOrder.status,
+    ServiceOrder.price_type,
+    ServiceOrder.employee,
+    ServiceOrder.pricing_total,
+    ServiceOrder.created_at,
+)
+
+
+# ----------------------
+# Cursor (created_at, id)
+# ----------------------
+def encode_cursor(created_at: datetime, id_: int) -> str:
+    raw = f"{created_at.isoformat()}|{id_}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, id_ = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(id_)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(400, "Invalid cursor")
+
+
+# ----------------------
+# Overzicht
+# ----------------------
+def serviceorder_overview_page(
+    db: Session,
+    status: Optional[list[str]] = None,
+    supplier_id: Optional[int] = None,
+    customer_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    q: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> dict:
+    """
+    Eén pagina van het serviceorder-overzicht, nieuwste eerst.
+
+    - keyset-paginering op (created_at, id): elke pagina kost evenveel,
+      ongeacht hoe ver er gescrold is
+    - rijen zijn platte kolommen; leveranciers/klanten staan één keer
+      in `suppliers` / `customers` (op id)
+    """
+    query = db.query(*OVERVIEW_COLUMNS)
+
+    if status:
+        query = query.filter(ServiceOrder.status.in_(status))
+    if supplier_id is not None:
+        query = query.filter(ServiceOrder.supplier_id == supplier_id)
+    if customer_id is not None:
+        query = query.filter(ServiceOrder.customer_id == customer_id)
+    if date_from is not None:
+        query = query.filter(ServiceOrder.created_at >= date_from)
+    if date_to is not None:
+        query = query.filter(ServiceOrder.created_at < date_to)
+
+    if q and q.strip():
+        term = f"%{q.strip()}%"
+        query = query.filter(
+            or_(
+                ServiceOrder.so.ilike(term),
+                ServiceOrder.po.ilike(term),
+                ServiceOrder.customer_ref.ilike(term),
+                ServiceOrder.employee.ilike(term),
+                ServiceOrder.remarks.ilike(term),
+                ServiceOrder.customer_id.in_(
+                    db.query(Customer.id).filter(Customer.name.ilike(term))
+                ),
+                ServiceOrder.supplier_id.in_(
+                    db.query(Supplier.id).filter(Supplier.name.ilike(term))
+                ),
+            )
+        )
+
+    if cursor:
+        last_created_at, last_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                ServiceOrder.created_at < last_created_at,
+                and_(
+                    ServiceOrder.created_at == last_created_at,
+                    ServiceOrder.id < last_id,
+                ),
+            )
+        )
+
+    # één rij extra om te weten of er nog een pagina is
+    rows = (
+        query
+        .order_by(ServiceOrder.created_at.desc(), ServiceOrder.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # ----------------------
+    # Lookup-tabellen (één query per tabel)
+    # ----------------------
+    supplier_ids = {r.supplier_id for r in rows if r.supplier_id is not None}
+    customer_ids = {r.customer_id for r in rows if r.customer_id is not None}
+
+    suppliers = {
+        s.id: {"id": s.id, "name": s.name}
+        for s in (
+            db.query(Supplier.id, Supplier.name)
+            .filter(Supplier.id.in_(supplier_ids))
+            .all()
+        )
+    } if supplier_ids else {}
+
+    customers = {
+        c.id: {"id": c.id, "name": c.name, "city": c.city}
+        for c in (
+            db.query(Customer.id, Customer.name, Customer.city)
+            .filter(Customer.id.in_(customer_ids))
+            .all()
+        )
+    } if customer_ids else {}
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return {
+        "items": [r._asdict() for r in rows],
+        "suppliers": suppliers,
+        "customers": customers,
+        "next_cursor": next_cursor,
+    }
+
+
+# ----------------------
+# Detail (één request)
+# ----------------------
+FULL_SECTIONS = ("order", "items", "pricing", "log", "transitions")
+
+
+def parse_include(include: Optional[str]) -> set[str]:
+    """
+    "items,log" → {"items", "log"}; leeg = alle secties.
+    """
+    if not include:
+        return set(FULL_SECTIONS)
+
+    sections = {s.strip() for s in include.split(",") if s.strip()}
+    unknown = sections - set(FULL_SECTIONS)
+    if unknown:
+        raise HTTPException(
+            400,
+            f"Unknown include: {', '.join(sorted(unknown))} "
+            f"(allowed: {', '.join(FULL_SECTIONS)})",
+        )
+    return sections
+
+
+def allowed_transitions(status: Optional[str]) -> dict:
+    """
+    Zelfde uitkomst als /allowed-statuses; statussen buiten de state machine
+    (bv. LEADTIME_AANGEVRAAGD) hebben geen vervolgstappen.
+    """
+    try:
+        current = ServiceOrderStatusEnum(status or ServiceOrderStatusEnum.OPEN)
+    except ValueError:
+        return {"current": status, "allowed": []}
+
+    return {
+        "current": current,
+        "allowed": SERVICEORDER_ALLOWED_TRANSITIONS.get(current, []),
+    }
+
+
+def serviceorder_full(
+    db: Session,
+    so: str,
+    include: set[str],
+    log_limit: int = 50,
+    log_before: Optional[int] = None,
+) -> dict:
+    """
+    Order, regels, prijzen, logpagina en statusovergangen in één keer.
+
+    Order wordt één keer opgezocht (met klant); de regels worden één keer
+    geladen en ook voor de prijsberekening gebruikt.
+    """
+    order = (
+        db.query(ServiceOrder)
+        .options(joinedload(ServiceOrder.customer))
+        .filter(ServiceOrder.so == so)
+        .first()
+    )
+    if not order:
+        raise HTTPException(404, "Serviceorder not found")
+
+    out: dict = {"so": order.so}
+
+    if "order" in include:
+        out["order"] = order
+
+    items = None
+    if include & {"items", "pricing"}:
+        items = (
+            db.query(ServiceOrderItem)
+            .filter(ServiceOrderItem.serviceorder_id == order.id)
+            .order_by(ServiceOrderItem.id.asc())
+            .all()
+        )
+        if "items" in include:
+            out["items"] = items
+
+    if "pricing" in include:
+        # zonder (bekende) klant geen prijsregels → geen prijzen
+        out["pricing"] = None
+        if order.customer is not None:
+            try:
+                out["pricing"] = calculate_order_totals(db, order, items=items)
+            except ValueError:
+                pass
+
+    if "log" in include:
+        query = db.query(ServiceOrderLog).filter(
+            ServiceOrderLog.serviceorder_id == order.id
+        )
+        if log_before is not None:
+            query = query.filter(ServiceOrderLog.id < log_before)
+
+        logs = (
+            query
+            .order_by(ServiceOrderLog.id.desc())
+            .limit(log_limit + 1)
+            .all()
+        )
+        out["log"] = {
+            "items": logs[:log_limit],
+            "next_before": logs[log_limit - 1].id if len(logs) > log_limit else None,
+        }
+
+    if "transitions" in include:
+        out["transitions"] = allowed_transitions(order.status)
+
+    return out
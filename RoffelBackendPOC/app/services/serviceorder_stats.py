@@ -0,0 +1,331 @@
+# app/services/serviceorder_stats.py
+
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, event, func, inspect, insert, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, dialect_name, lock_for_write
+from app.models.serviceorder import ServiceOrder
+from app.models.serviceorder_item import ServiceOrderItem
+from app.models.serviceorder_stats import ServiceOrderStat
+
+# Tellers per (status, leverancier, medewerker) in serviceorder_stats.
+#
+# Wijzigingen worden per sessie als delta's verzameld en vlak voor de
+# commit in één upsert weggeschreven (zelfde transactie als de wijziging
+# zelf; bij een rollback vervallen ze).
+#
+# - ORM-wijzigingen op ServiceOrder (status / supplier_id / employee,
+#   nieuwe en verwijderde orders) worden automatisch opgepikt (before_flush)
+# - bulk-statements (conditionele status-UPDATE, ontvangsten, regel-patch)
+#   melden hun delta zelf via stage_order_moved / stage_open_lines
+
+# sleutel in Session.info voor nog niet weggeschreven delta's
+_PENDING_KEY = "serviceorder_stats_pending"
+
+StatsKey = tuple[str, int, str]
+
+
+def stats_key(status: Optional[str], supplier_id: Optional[int], employee: Optional[str]) -> StatsKey:
+    return (status or "", supplier_id or 0, employee or "")
+
+
+def order_key(order: ServiceOrder) -> StatsKey:
+    return stats_key(order.status, order.supplier_id, order.employee)
+
+
+def _open_lines_filter():
+    return (
+        ServiceOrderItem.bestellen == True,
+        ServiceOrderItem.ontvangen == False,
+    )
+
+
+def count_open_lines(db: Session, order_ids: Iterable[int]) -> dict[int, int]:
+    """
+    Openstaande bestelde regels per order (één GROUP BY-query).
+    """
+    order_ids = [oid for oid in order_ids if oid is not None]
+    if not order_ids:
+        return {}
+    return dict(
+        db.query(ServiceOrderItem.serviceorder_id, func.count(ServiceOrderItem.id))
+        .filter(ServiceOrderItem.serviceorder_id.in_(order_ids), *_open_lines_filter())
+        .group_by(ServiceOrderItem.serviceorder_id)
+        .all()
+    )
+
+
+# ----------------------
+# Delta's klaarzetten
+# ----------------------
+def _stage(db: Session, key: StatsKey, orders: int = 0, open_lines: int = 0):
+    if not orders and not open_lines:
+        return
+    pending = db.info.setdefault(_PENDING_KEY, {})
+    current = pending.get(key, (0, 0))
+    pending[key] = (current[0] + orders, current[1] + open_lines)
+
+
+def stage_open_lines(db: Session, key: StatsKey, delta: int):
+    """
+    Open regels van een order met sleutel `key` veranderd met `delta`.
+    """
+    _stage(db, key, open_lines=delta)
+
+
+def stage_order_moved(
+    db: Session,
+    order_id: int,
+    old_key: StatsKey,
+    new_key: StatsKey,
+    open_lines: Optional[int] = None,
+):
+    """
+    Order verhuist van `old_key` naar `new_key` (bv. statuswijziging),
+    inclusief zijn openstaande regels (geteld als `open_lines` None is).
+    """
+    if old_key == new_key:
+        return
+    if open_lines is None:
+        open_lines = count_open_lines(db, [order_id]).get(order_id, 0)
+    _stage(db, old_key, orders=-1, open_lines=-open_lines)
+    _stage(db, new_key, orders=1, open_lines=open_lines)
+
+
+_KEY_ATTRS = ("status", "supplier_id", "employee")
+
+
+def _old_key(session: Session, obj: ServiceOrder) -> StatsKey:
+    """
+    Sleutel zoals die in de database staat (vóór deze flush).
+    """
+    state = inspect(obj)
+    values = []
+    for attr in _KEY_ATTRS:
+        hist = state.attrs[attr].history
+        if hist.deleted:
+            values.append(hist.deleted[0])
+        elif hist.unchanged:
+            values.append(hist.unchanged[0])
+        elif hist.added:
+            # overschreven zonder dat de oude waarde geladen was
+            row = (
+                session.query(*[getattr(ServiceOrder, a) for a in _KEY_ATTRS])
+                .filter(ServiceOrder.id == obj.id)
+                .one()
+            )
+            return stats_key(*row)
+        else:
+            values.append(getattr(obj, attr))
+    return stats_key(*values)
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _track_orm_changes(session: Session, flush_context, instances):
+    for obj in session.new:
+        if isinstance(obj, ServiceOrder):
+            _stage(session, order_key(obj), orders=1)
+
+    for obj in session.deleted:
+        if isinstance(obj, ServiceOrder):
+            open_lines = count_open_lines(session, [obj.id]).get(obj.id, 0)
+            _stage(session, _old_key(session, obj), orders=-1, open_lines=-open_lines)
+
+    for obj in session.dirty:
+        if not isinstance(obj, ServiceOrder) or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[a].history.has_changes() for a in _KEY_ATTRS):
+            continue
+        stage_order_moved(session, obj.id, _old_key(session, obj), order_key(obj))
+
+
+# ----------------------
+# Wegschrijven (vlak voor de commit)
+# ----------------------
+def _upsert(db: Session):
+    return {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(dialect_name(db))
+
+
+def write_pending_stats(db: Session):
+    pending = db.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    rows = [
+        {
+            "status": key[0],
+            "supplier_id": key[1],
+            "employee": key[2],
+            "order_count": orders,
+            "open_lines": open_lines,
+        }
+        for key, (orders, open_lines) in pending.items()
+        if orders or open_lines
+    ]
+    if not rows:
+        return
+
+    dialect_insert = _upsert(db)
+    if dialect_insert is None:
+        raise RuntimeError(f"serviceorder_stats: no upsert for {dialect_name(db)}")
+
+    stmt = dialect_insert(ServiceOrderStat)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["status", "supplier_id", "employee"],
+        set_={
+            "order_count": ServiceOrderStat.order_count + stmt.excluded.order_count,
+            "open_lines": ServiceOrderStat.open_lines + stmt.excluded.open_lines,
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt, rows)
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _write_before_commit(session: Session):
+    # eerst flushen: before_flush zet dan de ORM-delta's nog klaar
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    write_pending_stats(session)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _drop_after_rollback(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# ----------------------
+# Lezen
+# ----------------------
+def serviceorder_stats(db: Session) -> dict:
+    """
+    Tellers voor het dashboard. Leest alleen de rollup (aantal rijen =
+    statussen × leveranciers × medewerkers), niet de orders zelf.
+    """
+    rows = (
+        db.query(
+            ServiceOrderStat.status,
+            ServiceOrderStat.supplier_id,
+            ServiceOrderStat.employee,
+            ServiceOrderStat.order_count,
+            ServiceOrderStat.open_lines,
+        )
+        .filter((ServiceOrderStat.order_count != 0) | (ServiceOrderStat.open_lines != 0))
+        .all()
+    )
+
+    def _counter():
+        return {"orders": 0, "open_lines": 0}
+
+    def _add(counter, r):
+        counter["orders"] += r.order_count
+        counter["open_lines"] += r.open_lines
+
+    totals = _counter()
+    by_status: dict[str, dict] = {}
+    by_supplier: dict[int, dict] = {}
+    by_employee: dict[str, dict] = {}
+
+    for r in rows:
+        _add(totals, r)
+        _add(by_status.setdefault(r.status, _counter()), r)
+        _add(by_supplier.setdefault(r.supplier_id, {}).setdefault(r.status, _counter()), r)
+        _add(by_employee.setdefault(r.employee, {}).setdefault(r.status, _counter()), r)
+
+    return {
+        "totals": totals,
+        "by_status": by_status,
+        "by_supplier": by_supplier,
+        "by_employee": by_employee,
+    }
+
+
+# ----------------------
+# Herberekenen
+# ----------------------
+def compute_serviceorder_stats(db: Session) -> dict[StatsKey, tuple[int, int]]:
+    """
+    Tellers vanaf nul uit serviceorders / serviceorder_items.
+    """
+    status = func.coalesce(ServiceOrder.status, "")
+    supplier_id = func.coalesce(ServiceOrder.supplier_id, 0)
+    employee = func.coalesce(ServiceOrder.employee, "")
+
+    orders = (
+        db.query(status, supplier_id, employee, func.count(ServiceOrder.id))
+        .group_by(status, supplier_id, employee)
+        .all()
+    )
+    open_lines = (
+        db.query(status, supplier_id, employee, func.count(ServiceOrderItem.id))
+        .join(ServiceOrderItem, ServiceOrderItem.serviceorder_id == ServiceOrder.id)
+        .filter(*_open_lines_filter())
+        .group_by(status, supplier_id, employee)
+        .all()
+    )
+
+    result: dict[StatsKey, tuple[int, int]] = {}
+    for s, sup, emp, n in orders:
+        result[(s, sup, emp)] = (n, 0)
+    for s, sup, emp, n in open_lines:
+        result[(s, sup, emp)] = (result.get((s, sup, emp), (0, 0))[0], n)
+    return result
+
+
+def rebuild_serviceorder_stats(db: Session, commit: bool = True) -> list[dict]:
+    """
+    Vervang de rollup door een herberekening en geef de afwijkingen terug
+    (leeg = de incrementele tellers klopten). Met commit=False wordt er
+    alleen vergeleken.
+    """
+    # schrijvers even tegenhouden, anders kan een delta tussen lezen en
+    # vervangen wegvallen
+    lock_for_write(db)
+    if dialect_name(db) == "postgresql":
+        db.execute(text("LOCK TABLE serviceorder_stats IN SHARE ROW EXCLUSIVE MODE"))
+
+    expected = compute_serviceorder_stats(db)
+    current = {
+        (r.status, r.supplier_id, r.employee): (r.order_count, r.open_lines)
+        for r in db.query(ServiceOrderStat).all()
+    }
+
+    differences = []
+    for key in sorted(set(expected) | set(current)):
+        exp = expected.get(key, (0, 0))
+        cur = current.get(key, (0, 0))
+        if exp != cur:
+            differences.append({
+                "status": key[0],
+                "supplier_id": key[1],
+                "employee": key[2],
+                "expected": {"orders": exp[0], "open_lines": exp[1]},
+                "actual": {"orders": cur[0], "open_lines": cur[1]},
+            })
+
+    if not commit:
+        db.rollback()
+        return differences
+
+    db.execute(delete(ServiceOrderStat))
+    if expected:
+        db.execute(
+            insert(ServiceOrderStat),
+            [
+                {
+                    "status": key[0],
+                    "supplier_id": key[1],
+                    "employee": key[2],
+                    "order_count": orders,
+                    "open_lines": open_lines,
+                }
+                for key, (orders, open_lines) in expected.items()
+            ],
+        )
+    db.info.pop(_PENDING_KEY, None)
+    db.commit()
+    return differences
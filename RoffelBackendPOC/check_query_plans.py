@@ -0,0 +1,197 @@
+# check_query_plans.py
+#
+# Draait de veelgebruikte queries uit routers/services tegen een gevulde
+# (tijdelijke) SQLite-database en controleert met EXPLAIN QUERY PLAN dat
+# geen ervan terugvalt op een full table scan.
+#
+# Gebruik:  python check_query_plans.py [-v]
+#   -v  toon het plan van elke query
+# Exit code 1 als een query een tabel volledig scant.
+
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+# altijd een eigen database: nooit tegen de echte data draaien
+_tmp = tempfile.mkdtemp(prefix="query-plans-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/plans.db"
+
+from sqlalchemy import event  # noqa: E402
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+import app.models  # noqa: E402,F401  triggert alle model-registraties
+from app.models.customer import Customer, CustomerContact, CustomerPriceRule  # noqa: E402
+from app.models.serviceorder import ServiceOrder  # noqa: E402
+from app.models.serviceorder_item import ServiceOrderItem  # noqa: E402
+from app.models.serviceorder_log import ServiceOrderLog  # noqa: E402
+from app.models.supplier import Supplier  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.routers.customer_contacts import get_contacts_for_customer  # noqa: E402
+from app.services.price_rule_cache import price_rule_cache  # noqa: E402
+from app.services.pricing import calculate_totals_for_orders  # noqa: E402
+from app.services.mail.outbox import claim_due_mails  # noqa: E402
+from app.services.po_combination import suggest_combinations  # noqa: E402
+from app.services.purchaseorder_orders import collect_po_serviceorders  # noqa: E402
+from app.services.receiving import receive_delivery  # noqa: E402
+from app.services.serviceorder_logs import get_serviceorder_logs  # noqa: E402
+from app.services.serviceorder_queries import (  # noqa: E402
+    encode_cursor,
+    parse_include,
+    serviceorder_full,
+    serviceorder_overview_page,
+)
+from app.services.serviceorder_stats import count_open_lines  # noqa: E402
+
+# tabellen die klein zijn of bewust volledig gelezen worden
+ALLOW_FULL_SCAN = {
+    "serviceorder_stats",  # rollup: statussen × leveranciers × medewerkers
+}
+
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+ORDERS = 300
+ITEMS_PER_ORDER = 5
+LOGS_PER_ORDER = 4
+
+
+def seed(db):
+    suppliers = [Supplier(name=f"Leverancier {i}") for i in range(5)]
+    customers = [Customer(name=f"Klant {i}") for i in range(20)]
+    db.add_all(suppliers + customers)
+    db.flush()
+
+    for c in customers:
+        db.add_all([
+            CustomerContact(customer_id=c.id, contact_name=f"Contact {c.id}-{n}",
+                            email=f"c{c.id}-{n}@example.com", is_primary=(n == 0))
+            for n in range(3)
+        ])
+        db.add_all([
+            CustomerPriceRule(customer_id=c.id, min_amount=amount, price_type=pt)
+            for amount, pt in ((0, "bruto"), (1000, "wvk"), (5000, "edmac"))
+        ])
+
+    db.add_all([
+        User(email=f"user{i}@example.com", password_hash="x", reset_token=f"token-{i}")
+        for i in range(50)
+    ])
+
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    statuses = ["OPEN", "AANGEVRAAGD", "WACHT_OP_COMBINATIE", "BESTELD", "ONTVANGEN", "AFGEHANDELD"]
+    for i in range(ORDERS):
+        order = ServiceOrder(
+            so=f"SO{i:05d}",
+            supplier_id=suppliers[i % len(suppliers)].id,
+            customer_id=customers[i % len(customers)].id,
+            status=statuses[i % len(statuses)],
+            employee=f"Medewerker {i % 7}",
+            created_at=start + timedelta(hours=i),
+        )
+        db.add(order)
+        db.flush()
+        db.add_all([
+            ServiceOrderItem(serviceorder_id=order.id, part_no=f"P{(i + n) % 400:04d}",
+                             qty=2, price_bruto=10.0, bestellen=True)
+            for n in range(ITEMS_PER_ORDER)
+        ])
+        db.add_all([
+            ServiceOrderLog(serviceorder_id=order.id, action="OPEN", message="Seed")
+            for _ in range(LOGS_PER_ORDER)
+        ])
+
+    db.commit()
+
+
+def hot_queries(db):
+    """
+    (naam, functie) per hot path; de functie voert de echte code uit.
+    """
+    some_order = db.query(ServiceOrder).filter(ServiceOrder.so == "SO00150").one()
+    customer_id = some_order.customer_id
+    cursor = encode_cursor(some_order.created_at, some_order.id)
+
+    return [
+        ("overview", lambda: serviceorder_overview_page(db, limit=50)),
+        ("overview per status", lambda: serviceorder_overview_page(db, status=["BESTELD"], limit=50)),
+        ("overview volgende pagina", lambda: serviceorder_overview_page(db, cursor=cursor, limit=50)),
+        ("serviceorder full", lambda: serviceorder_full(db, "SO00150", parse_include(None))),
+        ("serviceorder log", lambda: get_serviceorder_logs(db, "SO00150")),
+        ("open regels per order", lambda: count_open_lines(db, [some_order.id])),
+        ("prijsregels klant", lambda: price_rule_cache._load(db, [customer_id])),  # de query achter de cache
+        ("prijzen voor orders", lambda: calculate_totals_for_orders(
+            db, db.query(ServiceOrder).filter(ServiceOrder.id.in_([1, 2, 3])).all()
+        )),
+        ("contacten klant", lambda: get_contacts_for_customer(customer_id, db)),
+        ("primair contact", lambda: db.query(CustomerContact).filter(
+            CustomerContact.customer_id == customer_id,
+            CustomerContact.is_primary == True,
+        ).first()),
+        ("reset-token", lambda: db.query(User).filter(User.reset_token == "token-7").first()),
+        ("PO bestellen", lambda: collect_po_serviceorders(db, 1)),
+        ("combinatievoorstellen", lambda: suggest_combinations(db)),
+        ("mail-worker claim", lambda: claim_due_mails(db, 20)),
+        ("leveringsbon", lambda: receive_delivery(db, [("P0001", 1), ("P0002", 3)])),
+    ]
+
+
+def explain(statement: str, parameters) -> list[str]:
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute("EXPLAIN QUERY PLAN " + statement, parameters or ())
+        return [row[3] for row in cur.fetchall()]
+    finally:
+        raw.close()
+
+
+def main(verbose: bool = False) -> int:
+    Base.metadata.create_all(engine)
+
+    db = SessionLocal()
+    seed(db)
+
+    captured: list[tuple[str, str, object]] = []
+    current = {"name": None}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if current["name"] and not executemany and statement.lstrip().upper().startswith(
+            ("SELECT", "UPDATE", "DELETE")
+        ):
+            captured.append((current["name"], statement, parameters))
+
+    for name, run in hot_queries(db):
+        current["name"] = name
+        try:
+            run()
+        finally:
+            current["name"] = None
+            # schrijvende paden (leveringsbon) niet echt doorvoeren
+            db.rollback()
+
+    db.close()
+
+    failures = 0
+    for name, statement, parameters in captured:
+        plan = explain(statement, parameters)
+        scans = [
+            m.group(1)
+            for line in plan
+            if (m := _FULL_SCAN.match(line)) and m.group(1) not in ALLOW_FULL_SCAN
+        ]
+        if scans:
+            failures += 1
+        if scans or verbose:
+            flat = " ".join(statement.split())
+            print(f"[{'FULL SCAN' if scans else 'ok'}] {name}: {flat[:160]}")
+            for line in plan:
+                print(f"    {line}")
+
+    print(f"{len(captured)} queries gecontroleerd, {failures} met een full table scan.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(verbose="-v" in sys.argv[1:]))
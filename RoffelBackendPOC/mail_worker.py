@@ -0,0 +1,35 @@
+# mail_worker.py
+#
+# Verstuurt de mails uit mail_outbox (zie app/services/mail/outbox.py).
+# Draait als apart proces naast de API; meerdere workers mag.
+# Gebruik:  python mail_worker.py [--once]
+#   --once  verstuur wat nu aan de beurt is en stop (bv. vanuit cron)
+# MAIL_MISLUKT-events bereiken de change feed van de API alleen met
+# CHANGE_FEED_BACKEND=database (zelfde instelling als de API).
+
+import logging
+import signal
+import sys
+import threading
+
+import app.models  # triggert alle model-registraties
+from app.services.mail.outbox import run_mail_worker
+
+log = logging.getLogger("mail_worker")
+
+
+def main(once: bool = False):
+    logging.basicConfig(level=logging.INFO)
+
+    stop = threading.Event()
+    # nette stop: lopende verzendingen worden afgemaakt en vastgelegd
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    log.info("Mail-worker gestart." if not once else "Mail-worker: één ronde.")
+    run_mail_worker(stop=stop, once=once)
+    log.info("Mail-worker gestopt.")
+
+
+if __name__ == "__main__":
+    main(once="--once" in sys.argv[1:])
@@ -0,0 +1,38 @@
+# rebuild_serviceorder_stats.py
+#
+# Herberekent de dashboard-tellers (serviceorder_stats) vanaf nul.
+# Gebruik:  python rebuild_serviceorder_stats.py [--check]
+#   --check  alleen afwijkingen tonen, niets wijzigen (exit code 1 bij afwijkingen)
+
+import sys
+
+from app.database import SessionLocal
+import app.models  # triggert alle model-registraties
+from app.services.serviceorder_stats import rebuild_serviceorder_stats
+
+
+def main(check_only: bool = False) -> int:
+    db = SessionLocal()
+    try:
+        differences = rebuild_serviceorder_stats(db, commit=not check_only)
+    finally:
+        db.close()
+
+    for d in differences:
+        print(
+            f"{d['status'] or '-'} / supplier {d['supplier_id']} / {d['employee'] or '-'}: "
+            f"verwacht {d['expected']}, was {d['actual']}"
+        )
+
+    if not differences:
+        print("serviceorder_stats klopt.")
+    elif check_only:
+        print(f"{len(differences)} afwijking(en), niets gewijzigd.")
+    else:
+        print(f"{len(differences)} afwijking(en) hersteld.")
+
+    return 1 if differences and check_only else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(check_only="--check" in sys.argv[1:]))
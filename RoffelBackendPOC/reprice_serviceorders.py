@@ -0,0 +1,30 @@
+# reprice_serviceorders.py
+#
+# Vult de bewaarde prijsberekening (pricing_total / pricing_price_type) van
+# serviceorders die nog nooit geprijsd zijn, bv. direct na de migratie.
+# Gebruik:  python reprice_serviceorders.py [--articles]
+#   --articles  neem ook gewijzigde artikelprijzen over op open orders
+#               (zelfde als de job na een Duallist-import)
+
+import sys
+
+from app.database import SessionLocal
+import app.models  # triggert alle model-registraties
+from app.services.order_pricing import refresh_item_prices_from_articles, reprice_stale_orders
+
+
+def main(articles: bool = False):
+    db = SessionLocal()
+    try:
+        count = reprice_stale_orders(db)
+        print(f"{count} serviceorder(s) geprijsd.")
+
+        if articles:
+            order_ids = refresh_item_prices_from_articles(db)
+            print(f"{len(order_ids)} serviceorder(s) met nieuwe artikelprijzen.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main(articles="--articles" in sys.argv[1:])
@@ -19,14 +19,17 @@ export default function CombineServiceOrders() {
   async function loadServiceOrders() {
     setLoading(true);
     try {
-      const res = await axios.get(`${API}/serviceorders/for-po-merge`, {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-
-      // Alleen orders die wachten op combinatie
-      const filtered = res.data.filter(
-        (o) => o.status === "WACHT_OP_COMBINATIE"
-      );
+      // Alleen orders die wachten op combinatie; per pagina tot alles binnen is
+      const pageSize = 1000;
+      const filtered = [];
+      for (let offset = 0; ; offset += pageSize) {
+        const res = await axios.get(`${API}/serviceorders/for-po-merge`, {
+          headers: { Authorization: `Bearer ${token}` },
+          params: { status: "WACHT_OP_COMBINATIE", limit: pageSize, offset },
+        });
+        filtered.push(...res.data);
+        if (res.data.length < pageSize) break;
+      }
 
       setRows(filtered);
     } catch {
@@ -2,10 +2,39 @@ import { useState } from "react";
 import toast from "react-hot-toast";
 import api from "../api";
 
+const POLL_INTERVAL_MS = 1000;
+
+function sleep(ms) {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
 export default function ImportDuallistPage() {
   const [file, setFile] = useState(null);
   const [isImporting, setIsImporting] = useState(false);
   const [importResult, setImportResult] = useState(null);
+  const [job, setJob] = useState(null);
+
+  async function pollJob(jobId) {
+    // import draait op de achtergrond; status opvragen tot hij klaar is
+    while (true) {
+      const res = await api.get(`/admin/import/jobs/${jobId}`);
+      setJob(res.data);
+
+      if (["DONE", "FAILED", "CANCELLED"].includes(res.data.status)) {
+        return res.data;
+      }
+      await sleep(POLL_INTERVAL_MS);
+    }
+  }
+
+  async function handleCancel() {
+    if (!job) return;
+    try {
+      await api.post(`/admin/import/jobs/${job.id}/cancel`);
+    } catch (err) {
+      toast.error(err.response?.data?.detail || "Annuleren mislukt");
+    }
+  }
 
   async function handleUpload() {
     if (!file) {
@@ -25,9 +54,17 @@ export default function ImportDuallistPage() {
         formData
       );
 
-      setImportResult(res.data);
-      toast.success("Duallist succesvol verwerkt");
-      setFile(null);
+      const result = await pollJob(res.data.job_id);
+      setImportResult(result);
+
+      if (result.status === "DONE") {
+        toast.success("Duallist succesvol verwerkt");
+        setFile(null);
+      } else if (result.status === "CANCELLED") {
+        toast("Import geannuleerd");
+      } else {
+        toast.error(result.error || "Import mislukt");
+      }
     } catch (err) {
       console.error("IMPORT ERROR:", err);
 
@@ -36,6 +73,7 @@ export default function ImportDuallistPage() {
       );
     } finally {
       setIsImporting(false);
+      setJob(null);
     }
   }
 
@@ -86,7 +124,20 @@ export default function ImportDuallistPage() {
               d="M4 12a8 8 0 018-8v4a4 4 0 00-4 4H4z"
             />
           </svg>
-          <span>Import wordt verwerkt…</span>
+          <span>
+            Import wordt verwerkt…
+            {job && job.rows_processed > 0 && (
+              <> {job.rows_processed}
+                {job.total_rows ? ` / ${job.total_rows}` : ""} regels</>
+            )}
+          </span>
+          <button
+            onClick={handleCancel}
+            disabled={!job || job.cancel_requested}
+            className="ml-auto text-sm text-red-600 underline"
+          >
+            Annuleren
+          </button>
         </div>
       )}
 
@@ -43,7 +43,13 @@ export default function LoginPage() {
     navigate("/dashboard");
   } catch (err) {
     console.error(err);
-    setError("Login mislukt. Controleer e-mail en wachtwoord.");
+    if (err.response?.status === 429) {
+      setError("Te veel mislukte pogingen. Probeer het later opnieuw.");
+    } else if (err.response?.status === 503) {
+      setError("Inloggen is tijdelijk druk. Probeer het zo opnieuw.");
+    } else {
+      setError("Login mislukt. Controleer e-mail en wachtwoord.");
+    }
   }
 }
 
@@ -10,6 +10,20 @@ import ConfirmSaveModal from "../components/ConfirmSaveModal";
 import { useNavigationGuard } from "../context/NavigationGuardContext";
 
 
+// velden van een regel die de gebruiker kan wijzigen
+const ITEM_FIELDS = [
+  "part_no",
+  "description",
+  "qty",
+  "list_price",
+  "price_bruto",
+  "price_wvk",
+  "price_edmac",
+  "price_purchase",
+  "leadtime",
+  "bestellen",
+];
+
 export default function ServiceorderPage() {
   
   const [searchParams] = useSearchParams();
@@ -78,6 +92,10 @@ export default function ServiceorderPage() {
   const [items, setItems] = useState([]);
   const [newPartNo, setNewPartNo] = useState("");
 
+  // laatst opgeslagen stand van de regels (voor diff-opslaan)
+  const savedItemsRef = useRef([]);
+  const itemsVersionRef = useRef(null);
+
   // =========================
   // Loading states
   // =========================
@@ -211,7 +229,8 @@ export default function ServiceorderPage() {
   // Load status
   // =========================
   useEffect(() => {
-    if (form.so) {
+    // bij openen via url komen de statusopties al mee met /full
+    if (form.so && form.so !== soFromUrl) {
       loadAllowedStatuses(form.so);
     }
   }, [form.so]);
@@ -305,36 +324,46 @@ async function changeStatus(nextStatus) {
   // =========================
   // Load a single service order (from url)
   // =========================
-  async function loadServiceOrder(so) {
-    setLoadingOrder(true);
-    try {
-      const res = await api.get(
-        `/serviceorders/${encodeURIComponent(so)}`);
-
-      const order = res.data;
-
-      setForm({
-        so: order.so || "",
-
-        customer_id: order.customer_id || null,
-        supplier_id: order.supplier_id || 2, // fallback: Sullair
+  function applyServiceOrder(order) {
+    setForm({
+      so: order.so || "",
+
+      customer_id: order.customer_id || null,
+      supplier_id: order.supplier_id || 2, // fallback: Sullair
+
+      customer_ref: order.customer_ref || "",
+      po: order.po || "",
+      status: order.status || "",
+      price_type: order.price_type || "",
+      remarks: order.remarks || "",
+    });
 
-        customer_ref: order.customer_ref || "",
-        po: order.po || "",
-        status: order.status || "",
-        price_type: order.price_type || "",
-        remarks: order.remarks || "",
-      });
+    setSoLocked(true);
 
-      setSoLocked(true);
+    if (order.customer_id) { setSelectedCustomerId(order.customer_id)};
+  }
 
-      if (order.customer_id) { setSelectedCustomerId(order.customer_id)};
+  async function loadServiceOrderFull(so) {
+    setLoadingOrder(true);
+    setLoadingItems(true);
+    try {
+      const res = await api.get(
+        `/serviceorders/${encodeURIComponent(so)}/full`,
+        { params: { include: "order,items,log,transitions" } }
+      );
 
+      applyServiceOrder(res.data.order);
+      setItems(res.data.items || []);
+      savedItemsRef.current = res.data.items || [];
+      itemsVersionRef.current = res.data.order.items_version;
+      setLog(res.data.log?.items || []);
+      setAllowedStatuses(res.data.transitions?.allowed || []);
     } catch (err) {
       console.error(err);
       toast.error("Serviceorder kon niet worden geladen");
     } finally {
       setLoadingOrder(false);
+      setLoadingItems(false);
     }
   }
 
@@ -342,8 +371,12 @@ async function changeStatus(nextStatus) {
     setLoadingItems(true);
     try {
       const res = await api.get(
-        `/serviceorders/${encodeURIComponent(so)}/items`);
-      setItems(res.data || []);
+        `/serviceorders/${encodeURIComponent(so)}/full`,
+        { params: { include: "order,items" } }
+      );
+      setItems(res.data.items || []);
+      savedItemsRef.current = res.data.items || [];
+      itemsVersionRef.current = res.data.order.items_version;
     } catch (err) {
       console.error(err);
       toast.error("Artikelen konden niet worden geladen");
@@ -356,10 +389,8 @@ async function changeStatus(nextStatus) {
   useEffect(() => {
     if (!soFromUrl) return;
 
-    // load order + items
-    loadServiceOrder(soFromUrl);
-    loadItems(soFromUrl);
-    loadLog(soFromUrl);
+    // order, items, log en statusopties in één request
+    loadServiceOrderFull(soFromUrl);
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [soFromUrl]);
 
@@ -452,27 +483,39 @@ async function changeStatus(nextStatus) {
   async function addArticle() {
     if (!newPartNo.trim()) return;
 
+    const toItem = (a) => ({
+      part_no: a.part_no,
+      description: a.description,
+      qty: 1,
+
+      list_price: a.list_price,
+      price_bruto: a.price_bruto,
+      price_wvk: a.price_wvk,
+      price_edmac: a.price_edmac,
+      price_purchase: a.price_purchase,
+
+      bestellen: false,
+    });
+
+    // geplakte lijst (spaties / komma's / regels) → één batch lookup
+    const partNos = newPartNo.split(/[\s,;]+/).filter(Boolean);
+
     try {
-      const res = await api.get(`/articles/${newPartNo}`);
+      if (partNos.length > 1) {
+        const res = await api.post("/articles/lookup", { part_nos: partNos });
 
-      const a = res.data;
+        setItems((prev) => [...prev, ...res.data.items.map(toItem)]);
+        setNewPartNo("");
 
-      setItems((prev) => [
-        ...prev,
-        {
-          part_no: a.part_no,
-          description: a.description,
-          qty: 1,
+        if (res.data.missing.length) {
+          toast.error(`Niet gevonden: ${res.data.missing.join(", ")}`);
+        }
+        return;
+      }
 
-          list_price: a.list_price,
-          price_bruto: a.price_bruto,
-          price_wvk: a.price_wvk,
-          price_edmac: a.price_edmac,
-          price_purchase: a.price_purchase,
+      const res = await api.get(`/articles/${newPartNo}`);
 
-          bestellen: false,
-        },
-      ]);
+      setItems((prev) => [...prev, toItem(res.data)]);
 
       setNewPartNo("");
     } catch (err) {
@@ -516,7 +559,48 @@ async function changeStatus(nextStatus) {
       return;
     }
 
-    await api.post(`/serviceorders/${form.so}/items/replace`, items);
+    // alleen de verschillen t.o.v. de laatst opgeslagen stand versturen
+    const saved = new Map(savedItemsRef.current.map((it) => [it.id, it]));
+    const current = new Set(items.filter((it) => it.id).map((it) => it.id));
+
+    const added = items.filter((it) => !it.id);
+    const removed = savedItemsRef.current
+      .filter((it) => !current.has(it.id))
+      .map((it) => it.id);
+    const changed = items
+      .filter((it) => it.id && saved.has(it.id))
+      .map((it) => {
+        const before = saved.get(it.id);
+        const diff = { id: it.id };
+        for (const field of ITEM_FIELDS) {
+          if (it[field] !== before[field]) diff[field] = it[field];
+        }
+        return diff;
+      })
+      .filter((diff) => Object.keys(diff).length > 1);
+
+    if (!added.length && !removed.length && !changed.length) {
+      toast.success("Geen wijzigingen");
+      return;
+    }
+
+    try {
+      await api.patch(`/serviceorders/${form.so}/items`, {
+        added,
+        changed,
+        removed,
+        expected_version: itemsVersionRef.current,
+      });
+    } catch (err) {
+      if (err.response?.status === 409) {
+        toast.error("Artikelen zijn intussen gewijzigd, ze worden opnieuw geladen");
+        await loadItems(form.so);
+      } else {
+        console.error(err);
+        toast.error(err.response?.data?.detail || "Opslaan mislukt");
+      }
+      return;
+    }
 
     await loadItems(form.so);
 
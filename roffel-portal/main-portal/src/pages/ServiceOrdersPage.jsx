@@ -7,10 +7,16 @@ export default function ServiceOrdersPage() {
   const navigate = useNavigate();
 
   const [orders, setOrders] = useState([]);
+  const [suppliers, setSuppliers] = useState({});
+  const [customers, setCustomers] = useState({});
+  const [nextCursor, setNextCursor] = useState(null);
+
+  const [status, setStatus] = useState("");
+  const [search, setSearch] = useState("");
 
   useEffect(() => {
     loadOrders();
-  }, []);
+  }, [status]);
 
   function statusBadge(status) {
   const map = {
@@ -34,10 +40,22 @@ export default function ServiceOrdersPage() {
 }
 
 
-  async function loadOrders() {
+  // cursor = volgende pagina (aanvullen), anders opnieuw beginnen
+  async function loadOrders(cursor = null) {
     try {
-      const res = await api.get("/serviceorders/overview");
-      setOrders(res.data);
+      const res = await api.get("/serviceorders/overview", {
+        params: {
+          status: status || undefined,
+          q: search.trim() || undefined,
+          cursor: cursor || undefined,
+        },
+      });
+
+      const page = res.data;
+      setOrders((prev) => (cursor ? [...prev, ...page.items] : page.items));
+      setSuppliers((prev) => ({ ...(cursor ? prev : {}), ...page.suppliers }));
+      setCustomers((prev) => ({ ...(cursor ? prev : {}), ...page.customers }));
+      setNextCursor(page.next_cursor);
     } catch (err) {
       console.error(err);
       alert("Kon serviceorders niet laden");
@@ -48,6 +66,34 @@ export default function ServiceOrdersPage() {
     <div className="min-h-screen bg-gray-100 p-8">
       <h1 className="text-2xl font-bold mb-6">Serviceorders</h1>
 
+      <div className="flex gap-2 mb-4">
+        <select
+          className="border rounded p-2"
+          value={status}
+          onChange={(e) => setStatus(e.target.value)}
+        >
+          <option value="">Alle statussen</option>
+          {["OPEN", "AANGEVRAAGD", "OFFERTE", "WACHT_OP_COMBINATIE", "BESTELD", "ONTVANGEN", "AFGEHANDELD"].map((s) => (
+            <option key={s} value={s}>{s}</option>
+          ))}
+        </select>
+
+        <input
+          className="border rounded p-2 flex-1"
+          placeholder="Zoek op SO, PO, referentie, klant of leverancier"
+          value={search}
+          onChange={(e) => setSearch(e.target.value)}
+          onKeyDown={(e) => e.key === "Enter" && loadOrders()}
+        />
+
+        <button
+          className="bg-blue-600 text-white rounded px-4"
+          onClick={() => loadOrders()}
+        >
+          Zoeken
+        </button>
+      </div>
+
       <div className="bg-white rounded-xl shadow p-4">
         <table className="w-full text-sm border">
           <thead className="bg-gray-200">
@@ -74,11 +120,11 @@ export default function ServiceOrdersPage() {
                 </td>
 
                 <td className="border p-2">
-                  {o.customer?.name || "—"}
+                  {customers[o.customer_id]?.name || "—"}
                 </td>
 
                 <td className="border p-2">
-                  {o.supplier?.name || "—"}
+                  {suppliers[o.supplier_id]?.name || "—"}
                 </td>
 
                 <td className="border p-2">
@@ -97,6 +143,17 @@ export default function ServiceOrdersPage() {
           </tbody>
 
         </table>
+
+        {nextCursor && (
+          <div className="text-center mt-4">
+            <button
+              className="border rounded px-4 py-2 hover:bg-gray-100"
+              onClick={() => loadOrders(nextCursor)}
+            >
+              Meer laden
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );